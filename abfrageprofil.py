@@ -0,0 +1,143 @@
+"""
+Abfragen pro Request: Anzahl, DB-Zeit und Wartezeit auf den Pool.
+
+Zählt über die Hooks in db.py (add_query_listener, add_pool_listener) alles,
+was im Thread des Requests an die Datenbank geht, und liefert es als
+Server-Timing-Header (Browser-Devtools → Netzwerk → Timing). Requests über
+dem Abfrage-Budget oder mit derselben Abfrage (SQL-Fingerprint) mehrfach
+im selben Request, dem typischen N+1-Muster, werden als Warnung geloggt.
+
+Mit DB_PANEL=1 hängt zusätzlich ein kleines Panel mit allen Abfragen unten
+an jede HTML-Seite (nur lokal einschalten, es zeigt SQL).
+
+Gezählt wird, bis die Antwort gebaut ist; Abfragen in gestreamten
+Antworten (CSV-Export) fehlen daher.
+"""
+import logging
+import os
+import threading
+import time
+from flask import render_template, request
+import db
+
+logger = logging.getLogger(__name__)
+
+# Mehr Abfragen pro Request gelten als Warnung
+ABFRAGEN_BUDGET = int(os.getenv("DB_ABFRAGEN_BUDGET", "10"))
+# So oft darf derselbe Fingerprint in einem Request vorkommen
+WIEDERHOLUNG_SCHWELLE = int(os.getenv("DB_WIEDERHOLUNG_SCHWELLE", "3"))
+SERVER_TIMING = os.getenv("DB_SERVER_TIMING", "1") == "1"
+PANEL = os.getenv("DB_PANEL", "0") == "1"
+
+_aktiv = threading.local()
+
+
+class Profil:
+    """Abfragen eines Requests, gesammelt über die Listener in db.py."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.abfragen = []
+        self.db_ms = 0.0
+        self.pool_ms = 0.0
+        self.verbindungen = 0
+
+    def abfrage(self, sql, dauer_ms, zeilen):
+        self.abfragen.append((db.fingerprint(sql), dauer_ms, zeilen))
+        self.db_ms += dauer_ms
+
+    def pool_wartezeit(self, wartezeit_ms):
+        self.verbindungen += 1
+        self.pool_ms += wartezeit_ms
+
+    def gesamt_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def nach_fingerprint(self):
+        """[(fingerprint, anzahl, ms gesamt)], häufigste zuerst"""
+        gruppen = {}
+        for fingerprint, dauer_ms, _ in self.abfragen:
+            eintrag = gruppen.setdefault(fingerprint, [0, 0.0])
+            eintrag[0] += 1
+            eintrag[1] += dauer_ms
+        return sorted(
+            ((f, anzahl, ms) for f, (anzahl, ms) in gruppen.items()),
+            key=lambda e: (-e[1], -e[2])
+        )
+
+    def warnungen(self):
+        warnungen = []
+        if len(self.abfragen) > ABFRAGEN_BUDGET:
+            warnungen.append(f"{len(self.abfragen)} Abfragen (Budget {ABFRAGEN_BUDGET})")
+        for fingerprint, anzahl, _ in self.nach_fingerprint():
+            if anzahl >= WIEDERHOLUNG_SCHWELLE:
+                warnungen.append(f"{anzahl}x dieselbe Abfrage (N+1?): {fingerprint}")
+        return warnungen
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{len(self.abfragen)} Abfragen"',
+            f'pool;dur={self.pool_ms:.1f};desc="{self.verbindungen} Verbindungen"',
+            f"app;dur={self.gesamt_ms():.1f}",
+        ])
+
+
+def aktuell():
+    """Profil des laufenden Requests in diesem Thread oder None."""
+    return getattr(_aktiv, "profil", None)
+
+
+def _abfrage(sql, dauer_ms, zeilen):
+    profil = aktuell()
+    if profil is not None:
+        profil.abfrage(sql, dauer_ms, zeilen)
+
+
+def _pool_wartezeit(wartezeit_ms):
+    profil = aktuell()
+    if profil is not None:
+        profil.pool_wartezeit(wartezeit_ms)
+
+
+def _beginnen():
+    _aktiv.profil = Profil()
+
+
+def _auswerten(response):
+    profil = aktuell()
+    if profil is None:
+        return response
+
+    warnungen = profil.warnungen()
+    if warnungen:
+        logger.warning(
+            "%s %s (%s): %s",
+            request.method, request.path, request.endpoint, "; ".join(warnungen)
+        )
+
+    if SERVER_TIMING:
+        response.headers.add("Server-Timing", profil.server_timing())
+
+    if PANEL and response.mimetype == "text/html" and not response.is_streamed:
+        html = response.get_data(as_text=True)
+        if "</body>" in html:
+            panel = render_template(
+                "abfrageprofil.html",
+                profil=profil,
+                gruppen=profil.nach_fingerprint(),
+                warnungen=warnungen,
+            )
+            response.set_data(html.replace("</body>", panel + "</body>", 1))
+    return response
+
+
+def _beenden(exc=None):
+    _aktiv.profil = None
+
+
+def init_app(app):
+    db.add_query_listener(_abfrage)
+    db.add_pool_listener(_pool_wartezeit)
+    app.before_request(_beginnen)
+    app.after_request(_auswerten)
+    app.teardown_request(_beenden)
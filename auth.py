@@ -1,13 +1,39 @@
 import logging
+import os
+import threading
+import time
+from flask import session
 from flask_login import LoginManager, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from cache import TTLCache
 from db import db_read, db_write
+import metriken
 
 # Logger für dieses Modul
 logger = logging.getLogger(__name__)
 
 login_manager = LoginManager()
 
+# User-Cache für load_user(): spart die DB-Abfrage bei jedem @login_required Request
+user_cache = TTLCache(
+    "users",
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("USER_CACHE_TTL", "300")),
+)
+
+# So lange (Sekunden) reicht der signierte User-Snapshot in der Session aus
+USER_SNAPSHOT_MAX_AGE = int(os.getenv("USER_SNAPSHOT_MAX_AGE", "300"))
+
+# Version pro User, steht auch im Snapshot; invalidate_user() erhöht sie und
+# macht damit alle älteren Snapshots dieses Users in diesem Prozess ungültig
+_user_versionen = {}
+_versionen_lock = threading.Lock()
+
+
+def _user_version(user_id):
+    with _versionen_lock:
+        return _user_versionen.get(user_id, 0)
+
 
 class User(UserMixin):
     def __init__(self, id, username, password):
@@ -61,19 +87,69 @@ class User(UserMixin):
 def load_user(user_id):
     logger.debug("load_user() aufgerufen mit user_id=%s", user_id)
     try:
-        user = User.get_by_id(int(user_id))
+        user_id = int(user_id)
     except ValueError:
         logger.error("load_user(): user_id=%r ist keine int", user_id)
         return None
 
+    # 1. Signierter Snapshot in der Session (kein DB-Zugriff, kein Cache)
+    snapshot = session.get("user_snapshot")
+    if (snapshot and snapshot.get("id") == user_id
+            and snapshot.get("v", 0) == _user_version(user_id)
+            and time.time() - snapshot.get("ts", 0) < USER_SNAPSHOT_MAX_AGE):
+        return User(snapshot["id"], snapshot["username"], None)
+
+    # 2. Prozessweiter User-Cache
+    user = user_cache.get(user_id)
+    if user is not None:
+        # Snapshot nicht erneuern: sonst verlängern sich Cache und Snapshot
+        # gegenseitig und ein geänderter User bliebe unbegrenzt angemeldet
+        return user
+
+    # 3. Datenbank, nur danach wird der Snapshot aufgefrischt
+    version = user_cache.version
+    user = User.get_by_id(user_id)
     if user:
         logger.debug("load_user(): User gefunden: %s (id=%s)", user.username, user.id)
+        user_cache.set(user_id, user, version=version)
+        remember_user(user)
     else:
         logger.warning("load_user(): kein User für id=%s gefunden", user_id)
+        forget_user()
 
     return user
 
 
+def remember_user(user):
+    """
+    Minimalen User-Snapshot in die (signierte) Session legen. Nur nach einem
+    Laden aus der DB aufrufen (login_user() nach authenticate(), load_user()).
+    """
+    session["user_snapshot"] = {
+        "id": user.id,
+        "username": user.username,
+        "v": _user_version(user.id),
+        "ts": int(time.time()),
+    }
+
+
+def forget_user():
+    session.pop("user_snapshot", None)
+
+
+def invalidate_user(user_id):
+    """
+    Nach jeder Änderung an einer Zeile in users aufrufen (Passwort, Name,
+    Löschen, neue ID). Verwirft den Cache-Eintrag und erhöht die Version, die
+    im Snapshot steht. Andere Prozesse sehen die Änderung spätestens nach
+    USER_CACHE_TTL + USER_SNAPSHOT_MAX_AGE.
+    """
+    user_id = int(user_id)
+    with _versionen_lock:
+        _user_versionen[user_id] = _user_versionen.get(user_id, 0) + 1
+    user_cache.invalidate(user_id)
+
+
 # Helpers
 def register_user(username, password):
     logger.info("register_user(): versuche neuen User '%s' anzulegen", username)
@@ -85,7 +161,7 @@ def register_user(username, password):
 
     hashed = generate_password_hash(password)
     try:
-        db_write(
+        user_id = db_write(
             "INSERT INTO users (username, password) VALUES (%s, %s)",
             (username, hashed)
         )
@@ -94,6 +170,25 @@ def register_user(username, password):
         logger.exception("Fehler beim Anlegen von User '%s'", username)
         return False
 
+    # Die ID kann die eines gelöschten Users sein (MySQL vor 8.0 setzt AUTO_INCREMENT
+    # beim Neustart auf MAX(id) + 1 zurück)
+    invalidate_user(user_id)
+    return True
+
+
+def change_password(user_id, password):
+    logger.info("change_password(): neues Passwort für user_id=%s", user_id)
+    hashed = generate_password_hash(password)
+    try:
+        db_write(
+            "UPDATE users SET password = %s WHERE id = %s",
+            (hashed, user_id)
+        )
+    except Exception:
+        logger.exception("Fehler beim Ändern des Passworts für user_id=%s", user_id)
+        return False
+
+    invalidate_user(user_id)
     return True
 
 
@@ -103,11 +198,14 @@ def authenticate(username, password):
 
     if not user:
         logger.warning("authenticate(): kein User mit username='%s' gefunden", username)
+        metriken.login(False, "unbekannter_user")
         return None
 
     if check_password_hash(user.password, password):
         logger.info("authenticate(): Passwort korrekt für '%s'", username)
+        metriken.login(True)
         return user
 
     logger.warning("authenticate(): falsches Passwort für '%s'", username)
+    metriken.login(False, "falsches_passwort")
     return None
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+Bestätigungs-E-Mails über eine Outbox (Tabelle benachrichtigung).
+
+buchungen.py schreibt die Nachricht in derselben Transaktion wie die Buchung
+bzw. Stornierung; gesendet wird außerhalb des Requests von einem
+Hintergrund-Worker, in Blöcken, mit Wiederholung und wachsender Wartezeit.
+Mehrere Worker teilen sich die Outbox (FOR UPDATE SKIP LOCKED).
+
+Transport über .env: BENACHRICHTIGUNG_TRANSPORT=datei (Standard, schreibt in
+BENACHRICHTIGUNG_DATEI) oder smtp (SMTP_HOST, SMTP_PORT, ...). Zum Testen mit
+SMTP reicht ein lokaler Debug-Server, z.B. python -m aiosmtpd -n -l localhost:1025.
+
+    python benachrichtigungen.py           Worker im Vordergrund (eigener Prozess, empfohlen)
+    python benachrichtigungen.py --einmal  einen Block abarbeiten und beenden
+"""
+import logging
+import os
+import random
+import smtplib
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+from db import db_read, db_transaction
+import verfuegbarkeit
+
+logger = logging.getLogger(__name__)
+
+BENACHRICHTIGUNG_TRANSPORT = os.getenv("BENACHRICHTIGUNG_TRANSPORT", "datei")
+# thread: zusätzlich ein Versand-Thread in jedem Web-Prozess (nur für kleine Installationen)
+BENACHRICHTIGUNG_WORKER = os.getenv("BENACHRICHTIGUNG_WORKER", "aus")
+BATCH = int(os.getenv("BENACHRICHTIGUNG_BATCH", "20"))
+INTERVALL = float(os.getenv("BENACHRICHTIGUNG_INTERVALL", "5"))
+MAX_VERSUCHE = int(os.getenv("BENACHRICHTIGUNG_MAX_VERSUCHE", "8"))
+# Wartezeit nach dem n-ten Fehlversuch: BACKOFF * 2^(n-1), höchstens BACKOFF_MAX Sekunden
+BACKOFF = int(os.getenv("BENACHRICHTIGUNG_BACKOFF", "30"))
+BACKOFF_MAX = 6 * 3600
+# So lange gehört ein abgeholter Eintrag einem Worker; danach darf ihn ein anderer übernehmen
+LEASE = 300
+
+
+# ---------- Nachrichten vormerken (innerhalb der Buchungs-Transaktion) ----------
+
+def _uhrzeit(wert):
+    minuten = verfuegbarkeit.zeit_in_minuten(wert)
+    return f"{minuten // 60:02d}:{minuten % 60:02d}"
+
+
+def _datum(wert):
+    # aus dem Formular kommt das Spieldatum als "YYYY-MM-DD"
+    if isinstance(wert, str):
+        wert = date.fromisoformat(wert)
+    return wert.strftime("%d.%m.%Y")
+
+
+def vormerken(tx, art, empfaenger, betreff, inhalt):
+    if not empfaenger:
+        return None
+    jetzt = datetime.now()
+    return tx.write(
+        """INSERT INTO benachrichtigung (art, empfaenger, betreff, inhalt, status, versuche, naechster_versuch, erstellt)
+           VALUES (%s, %s, %s, %s, 'offen', 0, %s, %s)""",
+        (art, empfaenger, betreff, inhalt, jetzt, jetzt)
+    )
+
+
+def _empfaenger(tx, nid, tid):
+    return tx.read(
+        """SELECT n.vorname, n.nachname, n.email, t.tennisanlage, t.platznummer
+           FROM nutzer n, tennisplatz t
+           WHERE n.nid = %s AND t.tid = %s""",
+        (nid, tid),
+        single=True
+    )
+
+
+def buchung_vormerken(tx, buchungsnummer, nid, tid, spieldatum, beginn, ende, empfaenger=None):
+    """empfaenger: vorname, nachname, email, tennisanlage, platznummer, falls schon bekannt (spart die Abfrage)"""
+    daten = empfaenger or _empfaenger(tx, nid, tid)
+    if not daten:
+        return None
+    return vormerken(
+        tx, "buchung", daten["email"],
+        f"Buchungsbestätigung Nr. {buchungsnummer}",
+        f"Hallo {daten['vorname']} {daten['nachname']},\n\n"
+        f"Ihre Buchung ist bestätigt:\n\n"
+        f"Buchungsnummer: {buchungsnummer}\n"
+        f"Platz: {daten['tennisanlage']} – Platz {daten['platznummer']}\n"
+        f"Datum: {_datum(spieldatum)}\n"
+        f"Zeit: {_uhrzeit(beginn)} – {_uhrzeit(ende)} Uhr\n\n"
+        f"Tennisverein Musterstadt\n"
+    )
+
+
+def serie_vormerken(tx, nid, tid, bericht, beginn, ende):
+    gebucht = [(datum, e["buchungsnummer"]) for datum, e in sorted(bericht.items()) if e["status"] == "gebucht"]
+    if not gebucht:
+        return None
+    daten = _empfaenger(tx, nid, tid)
+    if not daten:
+        return None
+    termine = "\n".join(f"  {datum}  (Nr. {nummer})" for datum, nummer in gebucht)
+    return vormerken(
+        tx, "serie", daten["email"],
+        f"Bestätigung Ihrer Serienbuchung ({len(gebucht)} Termine)",
+        f"Hallo {daten['vorname']} {daten['nachname']},\n\n"
+        f"Ihre Serienbuchung ist bestätigt:\n\n"
+        f"Platz: {daten['tennisanlage']} – Platz {daten['platznummer']}\n"
+        f"Zeit: {_uhrzeit(beginn)} – {_uhrzeit(ende)} Uhr\n"
+        f"Termine:\n{termine}\n\n"
+        f"Tennisverein Musterstadt\n"
+    )
+
+
+def stornierung_vormerken(tx, buchung):
+    """buchung: Zeile aus buchungen._storniere (mit Nutzer- und Platzangaben)"""
+    return vormerken(
+        tx, "stornierung", buchung["email"],
+        f"Stornierungsbestätigung Nr. {buchung['buchungsnummer']}",
+        f"Hallo {buchung['vorname']} {buchung['nachname']},\n\n"
+        f"Ihre Buchung wurde storniert:\n\n"
+        f"Buchungsnummer: {buchung['buchungsnummer']}\n"
+        f"Platz: {buchung['tennisanlage']} – Platz {buchung['platznummer']}\n"
+        f"Datum: {_datum(buchung['spieldatum'])}\n"
+        f"Zeit: {_uhrzeit(buchung['spielbeginn'])} – {_uhrzeit(buchung['spielende'])} Uhr\n\n"
+        f"Tennisverein Musterstadt\n"
+    )
+
+
+# ---------- Transporte ----------
+
+class DateiTransport:
+    """Hängt jede Nachricht an eine Textdatei an (Entwicklung, Tests)."""
+
+    def __init__(self):
+        self.pfad = os.getenv("BENACHRICHTIGUNG_DATEI", "benachrichtigungen.log")
+        self._lock = threading.Lock()
+
+    def senden(self, nachrichten):
+        with self._lock, open(self.pfad, "a", encoding="utf-8") as f:
+            for n in nachrichten:
+                f.write(f"To: {n['empfaenger']}\nSubject: {n['betreff']}\nDate: {datetime.now():%Y-%m-%d %H:%M:%S}\n\n")
+                f.write(n["inhalt"])
+                f.write("\n" + "-" * 72 + "\n")
+        return {n["id"]: None for n in nachrichten}
+
+
+class SMTPTransport:
+    """Eine SMTP-Verbindung pro Block, Fehler werden pro Nachricht gemeldet."""
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST", "localhost")
+        self.port = int(os.getenv("SMTP_PORT", "25"))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASSWORD")
+        self.absender = os.getenv("SMTP_ABSENDER", "noreply@localhost")
+        self.starttls = os.getenv("SMTP_STARTTLS", "0") == "1"
+
+    def senden(self, nachrichten):
+        ergebnis = {}
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            for n in nachrichten:
+                msg = EmailMessage()
+                msg["From"] = self.absender
+                msg["To"] = n["empfaenger"]
+                msg["Subject"] = n["betreff"]
+                msg.set_content(n["inhalt"])
+                try:
+                    smtp.send_message(msg)
+                    ergebnis[n["id"]] = None
+                except smtplib.SMTPException as e:
+                    ergebnis[n["id"]] = str(e)
+        return ergebnis
+
+
+# Eigene Transporte: Klasse mit senden(nachrichten) -> {id: None | Fehlertext}
+TRANSPORTE = {
+    "datei": DateiTransport,
+    "smtp": SMTPTransport,
+}
+
+_transport = None
+
+
+def transport():
+    global _transport
+    if _transport is None:
+        _transport = TRANSPORTE[BENACHRICHTIGUNG_TRANSPORT]()
+    return _transport
+
+
+# ---------- Abarbeiten ----------
+
+def wartezeit(versuche):
+    """Sekunden bis zum nächsten Versuch nach versuche Fehlversuchen (mit etwas Streuung)."""
+    basis = min(BACKOFF * 2 ** (versuche - 1), BACKOFF_MAX)
+    return basis * random.uniform(0.8, 1.2)
+
+
+def _platzhalter(anzahl):
+    return ",".join(["%s"] * anzahl)
+
+
+def _abholen(anzahl):
+    """
+    Fällige Einträge holen und für LEASE Sekunden als in_arbeit markieren.
+
+    Ein Eintrag, der noch in_arbeit ist, wurde abgeholt, aber nie abgeschlossen
+    (z.B. Absturz beim Senden): das zählt als Fehlversuch, damit eine Nachricht,
+    die den Sender jedes Mal abstürzen lässt, nach MAX_VERSUCHE auf fehler geht.
+    """
+    jetzt = datetime.now()
+    with db_transaction() as tx:
+        # SKIP LOCKED: parallele Worker nehmen sich andere Einträge, statt zu warten
+        rows = tx.read(
+            """SELECT id, empfaenger, betreff, inhalt, versuche, status FROM benachrichtigung
+               WHERE status IN ('offen', 'in_arbeit') AND naechster_versuch <= %s
+               ORDER BY naechster_versuch, id
+               LIMIT %s
+               FOR UPDATE SKIP LOCKED""",
+            (jetzt, anzahl)
+        )
+        abgelaufen = [row for row in rows if row["status"] == "in_arbeit"]
+        for row in abgelaufen:
+            row["versuche"] += 1
+        aufgegeben = [row for row in abgelaufen if row["versuche"] >= MAX_VERSUCHE]
+        rows = [row for row in rows if row not in aufgegeben]
+
+        if abgelaufen:
+            tx.write(
+                f"UPDATE benachrichtigung SET versuche = versuche + 1 WHERE id IN ({_platzhalter(len(abgelaufen))})",
+                [row["id"] for row in abgelaufen]
+            )
+        if aufgegeben:
+            tx.write(
+                f"""UPDATE benachrichtigung SET status = 'fehler', letzter_fehler = %s
+                    WHERE id IN ({_platzhalter(len(aufgegeben))})""",
+                ("Senden nicht abgeschlossen (Lease abgelaufen)", *[row["id"] for row in aufgegeben])
+            )
+            for row in aufgegeben:
+                logger.error("Benachrichtigung %s nach %s Versuchen aufgegeben: Lease abgelaufen",
+                             row["id"], row["versuche"])
+        if rows:
+            tx.write(
+                f"""UPDATE benachrichtigung SET status = 'in_arbeit', naechster_versuch = %s
+                    WHERE id IN ({_platzhalter(len(rows))})""",
+                (jetzt + timedelta(seconds=LEASE), *[row["id"] for row in rows])
+            )
+    return rows
+
+
+def abarbeiten(anzahl=BATCH):
+    """Einen Block senden. Rückgabe: Anzahl abgeholter Nachrichten."""
+    nachrichten = _abholen(anzahl)
+    if not nachrichten:
+        return 0
+
+    try:
+        ergebnis = transport().senden(nachrichten)
+    except Exception as e:
+        # z.B. SMTP-Server nicht erreichbar: der ganze Block ist fehlgeschlagen
+        logger.warning("Benachrichtigungen: Transport fehlgeschlagen: %s", e)
+        ergebnis = {n["id"]: str(e) or e.__class__.__name__ for n in nachrichten}
+
+    jetzt = datetime.now()
+    gesendet = []
+    wiederholen = []
+    aufgegeben = []
+    for n in nachrichten:
+        fehler = ergebnis.get(n["id"], "keine Rückmeldung vom Transport")
+        if fehler is None:
+            gesendet.append((jetzt, n["id"]))
+            continue
+        versuche = n["versuche"] + 1
+        if versuche >= MAX_VERSUCHE:
+            aufgegeben.append((versuche, fehler, n["id"]))
+            logger.error("Benachrichtigung %s nach %s Versuchen aufgegeben: %s", n["id"], versuche, fehler)
+        else:
+            wiederholen.append((versuche, fehler, jetzt + timedelta(seconds=wartezeit(versuche)), n["id"]))
+
+    with db_transaction() as tx:
+        tx.write_many(
+            "UPDATE benachrichtigung SET status = 'gesendet', gesendet = %s WHERE id = %s",
+            gesendet
+        )
+        tx.write_many(
+            """UPDATE benachrichtigung SET status = 'offen', versuche = %s, letzter_fehler = %s, naechster_versuch = %s
+               WHERE id = %s""",
+            wiederholen
+        )
+        tx.write_many(
+            "UPDATE benachrichtigung SET status = 'fehler', versuche = %s, letzter_fehler = %s WHERE id = %s",
+            aufgegeben
+        )
+    return len(nachrichten)
+
+
+def stats():
+    """Anzahl Einträge pro Status, z.B. für /metrics"""
+    rows = db_read("SELECT status, COUNT(*) AS anzahl FROM benachrichtigung GROUP BY status") or []
+    return {row["status"]: row["anzahl"] for row in rows}
+
+
+def schleife(stop=None):
+    """Arbeitet die Outbox ab, bis stop gesetzt wird. Volle Blöcke ohne Pause."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            anzahl = abarbeiten()
+        except Exception:
+            logger.exception("Fehler beim Abarbeiten der Benachrichtigungen")
+            anzahl = 0
+        if anzahl < BATCH:
+            stop.wait(INTERVALL)
+
+
+_worker = None
+
+
+def starte_worker():
+    """Startet den Hintergrund-Thread (einmal pro Prozess), wenn BENACHRICHTIGUNG_WORKER=thread."""
+    global _worker
+    if BENACHRICHTIGUNG_WORKER != "thread" or _worker is not None:
+        return None
+    _worker = threading.Thread(target=schleife, name="benachrichtigungen", daemon=True)
+    _worker.start()
+    return _worker
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if "--einmal" in sys.argv[1:]:
+        print(f"{abarbeiten()} Benachrichtigung(en) verarbeitet")
+    else:
+        schleife()
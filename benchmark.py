@@ -0,0 +1,420 @@
+"""
+Last- und Benchmark-Suite für die wichtigsten Seiten.
+
+    python benchmark.py                          # Test-Client und echter Server
+    python benchmark.py --modus server --clients 16 --anfragen 500
+    python benchmark.py --szenarien buchen_post,stornieren_post
+
+Läuft gegen die in .env konfigurierte Datenbank (am besten eine lokale,
+mit testdaten.py gefüllte), ohne Server z.B. mit DB_BACKEND=sqlite. Jedes Szenario wird nacheinander mit `--clients`
+gleichzeitigen, angemeldeten Clients ausgeführt, einmal über Flasks
+Test-Client (ohne HTTP) und einmal über einen echten WSGI-Server mit
+Threads. Gemessen werden p50/p95/p99, Durchsatz und DB-Abfragen pro Request
+(über db.add_query_listener).
+
+Buchungen landen weit in der Zukunft (BENCH_TAGE_VORAUS) für einen eigenen
+Nutzer und werden von stornieren_post bzw. am Ende wieder storniert.
+
+Das Ergebnis steht in bench_output.txt: Kommentarzeilen mit #, danach eine
+Zeile pro Modus und Szenario mit festen Spalten, damit sich zwei Läufe mit
+diff vergleichen lassen.
+"""
+import os
+
+# Kein Versand-Thread während der Messung, die Outbox-Abfragen würden mitgezählt
+os.environ.setdefault("BENACHRICHTIGUNG_WORKER", "aus")
+
+import argparse
+import http.client
+import logging
+import math
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+from werkzeug.serving import make_server
+import db
+import buchungen
+import katalog
+from auth import User, register_user
+from flask_app import app
+
+BENCH_USER = os.getenv("BENCH_USER", "bench")
+BENCH_PASSWORT = os.getenv("BENCH_PASSWORT", "bench-passwort")
+BENCH_EMAIL = os.getenv("BENCH_EMAIL", "bench@example.org")
+# Buchungen so weit in der Zukunft, dass sie echte Buchungen nicht stören
+BENCH_TAGE_VORAUS = int(os.getenv("BENCH_TAGE_VORAUS", "400"))
+
+logger = logging.getLogger(__name__)
+
+
+# Clients
+class TestClient:
+    """Flask-Test-Client: misst Routen, Templates und DB ohne HTTP."""
+
+    def __init__(self):
+        self._client = app.test_client()
+
+    def anfrage(self, methode, pfad, daten=None):
+        antwort = self._client.open(pfad, method=methode, data=daten)
+        antwort.close()
+        return antwort.status_code
+
+
+class HttpClient:
+    """Eine Keep-Alive-Verbindung zum WSGI-Server, Cookies wie ein Browser."""
+
+    def __init__(self, host, port):
+        self._host = host
+        self._port = port
+        self._conn = None
+        self._cookies = {}
+
+    def anfrage(self, methode, pfad, daten=None):
+        kopf = {}
+        body = None
+        if self._cookies:
+            kopf["Cookie"] = "; ".join(f"{k}={v}" for k, v in self._cookies.items())
+        if daten is not None:
+            body = urlencode(daten)
+            kopf["Content-Type"] = "application/x-www-form-urlencoded"
+        for versuch in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=30)
+            try:
+                self._conn.request(methode, pfad, body=body, headers=kopf)
+                antwort = self._conn.getresponse()
+                antwort.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Server hat die Keep-Alive-Verbindung geschlossen: einmal neu verbinden
+                self._conn.close()
+                self._conn = None
+                if versuch:
+                    raise
+        for zeile in antwort.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(zeile).items():
+                if morsel.value:
+                    self._cookies[name] = morsel.value
+                else:
+                    self._cookies.pop(name, None)
+        if antwort.will_close:
+            self._conn.close()
+            self._conn = None
+        return antwort.status
+
+    def schliessen(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+# Testdaten
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unbekannt"
+
+
+def bench_user_anlegen():
+    if not User.get_by_username(BENCH_USER):
+        register_user(BENCH_USER, BENCH_PASSWORT)
+
+
+def bench_nutzer():
+    """nid des Nutzers, für den gebucht wird (wird bei Bedarf angelegt)."""
+    row = db.db_read("SELECT nid FROM nutzer WHERE email = %s", (BENCH_EMAIL,), single=True)
+    if row:
+        return row["nid"]
+    return db.db_write(
+        "INSERT INTO nutzer (vorname, nachname, geburtsdatum, email) VALUES (%s, %s, %s, %s)",
+        ("Bench", "Mark", date(1990, 1, 1), BENCH_EMAIL)
+    )
+
+
+class Testdaten:
+    """Gemeinsamer Zustand der Clients: freie Zeitfenster und gebuchte Nummern."""
+
+    def __init__(self):
+        self.nid = bench_nutzer()
+        self.plaetze = katalog.get_katalog()["plaetze"]
+        if not self.plaetze:
+            raise SystemExit("Keine Tennisplätze in der Datenbank, bitte zuerst Testdaten anlegen.")
+        nids = db.db_read("SELECT nid FROM nutzer ORDER BY nid LIMIT 1000") or []
+        self.nids = [row["nid"] for row in nids]
+        self._lock = threading.Lock()
+        self._slots = self._zeitfenster()
+        self._nutzer_index = 0
+        self.buchungsnummern = []
+
+    def _zeitfenster(self):
+        # Tag für Tag, Platz für Platz, jede volle Stunde von 7 bis 19 Uhr
+        tag = date.today() + timedelta(days=BENCH_TAGE_VORAUS)
+        while True:
+            for platz in self.plaetze:
+                for stunde in range(7, 20):
+                    yield platz, tag, stunde
+            tag += timedelta(days=1)
+
+    def buchung(self):
+        with self._lock:
+            platz, tag, stunde = next(self._slots)
+        return {
+            "nid": self.nid,
+            "tennisanlage": platz["tennisanlage"],
+            "platznummer": platz["platznummer"],
+            "spieldatum": tag.isoformat(),
+            "beginn": f"{stunde:02d}:00",
+            "ende": f"{stunde + 1:02d}:00",
+        }
+
+    def gebuchte_laden(self):
+        """Buchungsnummern des Bench-Nutzers, die noch storniert werden müssen."""
+        rows = db.db_read(
+            "SELECT buchungsnummer FROM buchung WHERE nid = %s AND spieldatum >= %s ORDER BY buchungsnummer",
+            (self.nid, date.today() + timedelta(days=BENCH_TAGE_VORAUS))
+        ) or []
+        with self._lock:
+            self.buchungsnummern = [row["buchungsnummer"] for row in rows]
+
+    def stornierung(self):
+        with self._lock:
+            nummer = self.buchungsnummern.pop() if self.buchungsnummern else 0
+        return {"buchungsnummer": nummer, "email": BENCH_EMAIL}
+
+    def naechste_nid(self):
+        with self._lock:
+            nid = self.nids[self._nutzer_index % len(self.nids)]
+            self._nutzer_index += 1
+        return nid
+
+    def aufraeumen(self):
+        self.gebuchte_laden()
+        for nummer in self.buchungsnummern:
+            buchungen.storniere_nach_buchungsnummer(nummer, BENCH_EMAIL)
+        self.buchungsnummern = []
+        db.db_write("DELETE FROM benachrichtigung WHERE empfaenger = %s", (BENCH_EMAIL,))
+
+
+# Szenarien: (name, methode, pfad, daten, erwartete Status)
+# pfad und daten sind Funktionen von Testdaten, damit jeder Request eigene Werte bekommt
+def szenarien():
+    with app.test_request_context():
+        from flask import url_for
+        pfade = {
+            name: url_for(name)
+            for name in ["login", "buchen", "stornieren", "tennisplätze", "wartungsarbeiter",
+                         "buchungsuebersicht", "api_tennisplaetze_liste", "api_wartungsarbeiter_liste"]
+        }
+    login = {"username": BENCH_USER, "password": BENCH_PASSWORT}
+    return [
+        ("login_get", "GET", lambda d: pfade["login"], None, {200}),
+        ("login_post", "POST", lambda d: pfade["login"], lambda d: login, {302}),
+        ("buchen_get", "GET", lambda d: pfade["buchen"], None, {200}),
+        ("buchen_post", "POST", lambda d: pfade["buchen"], lambda d: d.buchung(), {302}),
+        ("stornieren_get", "GET", lambda d: pfade["stornieren"], None, {200}),
+        ("stornieren_post", "POST", lambda d: pfade["stornieren"], lambda d: d.stornierung(), {302}),
+        ("get_nutzer", "GET", lambda d: f"/get_nutzer/{d.naechste_nid()}", None, {200}),
+        ("admin_tennisplaetze", "GET", lambda d: pfade["tennisplätze"], None, {200}),
+        ("admin_wartungsarbeiter", "GET", lambda d: pfade["wartungsarbeiter"], None, {200}),
+        ("admin_buchungen", "GET", lambda d: pfade["buchungsuebersicht"], None, {200}),
+        ("api_tennisplaetze_liste", "GET", lambda d: pfade["api_tennisplaetze_liste"], None, {200}),
+        ("api_wartungsarbeiter_liste", "GET", lambda d: pfade["api_wartungsarbeiter_liste"], None, {200}),
+    ]
+
+
+# Messung
+class Abfragezaehler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.anzahl = 0
+
+    def __call__(self, sql, dauer_ms, zeilen):
+        with self._lock:
+            self.anzahl += 1
+
+    def zuruecksetzen(self):
+        with self._lock:
+            anzahl, self.anzahl = self.anzahl, 0
+        return anzahl
+
+
+def perzentil(werte, p):
+    """Nearest-Rank-Perzentil einer sortierten Liste"""
+    if not werte:
+        return 0.0
+    return werte[max(0, math.ceil(p / 100 * len(werte)) - 1)]
+
+
+def _ausfuehren(client, szenario, daten):
+    _, methode, pfad, formular, erwartet = szenario
+    form = formular(daten) if formular else None
+    start = time.perf_counter()
+    try:
+        status = client.anfrage(methode, pfad(daten), form)
+    except Exception as e:
+        logger.warning("%s: %s", szenario[0], e)
+        status = None
+    return (time.perf_counter() - start) * 1000, status in erwartet
+
+
+def messen(clients, szenario, daten, anfragen, aufwaermen, zaehler):
+    """Führt `anfragen` Requests verteilt auf alle Clients aus."""
+    for client in clients[:1]:
+        for _ in range(aufwaermen):
+            _ausfuehren(client, szenario, daten)
+
+    dauern = []
+    fehler = [0]
+    lock = threading.Lock()
+    rest = [anfragen]
+
+    def arbeiten(client):
+        while True:
+            with lock:
+                if rest[0] <= 0:
+                    return
+                rest[0] -= 1
+            dauer, ok = _ausfuehren(client, szenario, daten)
+            with lock:
+                dauern.append(dauer)
+                if not ok:
+                    fehler[0] += 1
+
+    zaehler.zuruecksetzen()
+    threads = [threading.Thread(target=arbeiten, args=(c,)) for c in clients]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gesamt = time.perf_counter() - start
+    abfragen = zaehler.zuruecksetzen()
+
+    dauern.sort()
+    return {
+        "n": len(dauern),
+        "fehler": fehler[0],
+        "p50_ms": perzentil(dauern, 50),
+        "p95_ms": perzentil(dauern, 95),
+        "p99_ms": perzentil(dauern, 99),
+        "req_s": len(dauern) / gesamt if gesamt else 0.0,
+        "queries": abfragen / len(dauern) if dauern else 0.0,
+    }
+
+
+def anmelden(client):
+    status = client.anfrage("POST", "/login", {"username": BENCH_USER, "password": BENCH_PASSWORT})
+    if status != 302:
+        raise SystemExit(f"Anmeldung als '{BENCH_USER}' fehlgeschlagen (Status {status}).")
+
+
+def lauf(modus, clients, auswahl, daten, anfragen, aufwaermen, zaehler):
+    for client in clients:
+        anmelden(client)
+    ergebnisse = []
+    for szenario in auswahl:
+        if szenario[0] == "stornieren_post":
+            daten.gebuchte_laden()
+        werte = messen(clients, szenario, daten, anfragen, aufwaermen, zaehler)
+        werte.update(modus=modus, szenario=szenario[0])
+        ergebnisse.append(werte)
+        print(zeile(werte), flush=True)
+    return ergebnisse
+
+
+def testclient_lauf(auswahl, daten, args, zaehler):
+    clients = [TestClient() for _ in range(args.clients)]
+    return lauf("testclient", clients, auswahl, daten, args.anfragen, args.aufwaermen, zaehler)
+
+
+def server_lauf(auswahl, daten, args, zaehler):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    clients = [HttpClient("127.0.0.1", server.server_port) for _ in range(args.clients)]
+    try:
+        return lauf("server", clients, auswahl, daten, args.anfragen, args.aufwaermen, zaehler)
+    finally:
+        for client in clients:
+            client.schliessen()
+        server.shutdown()
+        thread.join()
+
+
+# Ausgabe
+def zeile(werte):
+    return (
+        f"{werte['modus']:<11}{werte['szenario']:<28}{werte['n']:>6}{werte['fehler']:>8}"
+        f"{werte['p50_ms']:>10.2f}{werte['p95_ms']:>10.2f}{werte['p99_ms']:>10.2f}"
+        f"{werte['req_s']:>10.1f}{werte['queries']:>9.2f}"
+    )
+
+
+def kopfzeile():
+    return (
+        f"{'modus':<11}{'szenario':<28}{'n':>6}{'fehler':>8}"
+        f"{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}{'req_s':>10}{'queries':>9}"
+    )
+
+
+def schreiben(pfad, ergebnisse, args, pool):
+    with open(pfad, "w", encoding="utf-8") as f:
+        f.write(f"# benchmark {datetime.now():%Y-%m-%d %H:%M:%S} commit={_git_commit()}\n")
+        f.write(f"# anfragen={args.anfragen} clients={args.clients} aufwaermen={args.aufwaermen} "
+                f"pool_size={pool['size']}\n")
+        f.write(f"# pool acquired={pool['acquired']} exhausted={pool['exhausted']} "
+                f"wait_avg_ms={pool['wait_time_avg'] * 1000:.2f} wait_max_ms={pool['wait_time_max'] * 1000:.2f}\n")
+        f.write(kopfzeile() + "\n")
+        for werte in ergebnisse:
+            f.write(zeile(werte) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Buchungs- und Verwaltungsseiten")
+    parser.add_argument("--modus", choices=["testclient", "server", "beide"], default="beide")
+    parser.add_argument("--anfragen", type=int, default=200, help="Requests pro Szenario")
+    parser.add_argument("--clients", type=int, default=4, help="gleichzeitige Clients")
+    parser.add_argument("--aufwaermen", type=int, default=5, help="ungemessene Requests vorab")
+    parser.add_argument("--szenarien", default="", help="kommagetrennt, leer = alle")
+    parser.add_argument("--ausgabe", default="bench_output.txt")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    auswahl = szenarien()
+    if args.szenarien:
+        namen = set(args.szenarien.split(","))
+        unbekannt = namen - {s[0] for s in auswahl}
+        if unbekannt:
+            parser.error(f"unbekannte Szenarien: {', '.join(sorted(unbekannt))}")
+        auswahl = [s for s in auswahl if s[0] in namen]
+
+    bench_user_anlegen()
+    daten = Testdaten()
+    zaehler = Abfragezaehler()
+    db.add_query_listener(zaehler)
+
+    print(kopfzeile())
+    ergebnisse = []
+    try:
+        if args.modus in ("testclient", "beide"):
+            ergebnisse += testclient_lauf(auswahl, daten, args, zaehler)
+        if args.modus in ("server", "beide"):
+            ergebnisse += server_lauf(auswahl, daten, args, zaehler)
+    finally:
+        db.remove_query_listener(zaehler)
+        daten.aufraeumen()
+
+    schreiben(args.ausgabe, ergebnisse, args, db.pool_stats())
+    print(f"Ergebnis in {args.ausgabe}")
+
+
+if __name__ == "__main__":
+    main()
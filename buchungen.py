@@ -0,0 +1,203 @@
+from datetime import date, datetime, timedelta
+from db import db_transaction
+import benachrichtigungen
+import pdf
+import sperren
+import statistik
+import verfuegbarkeit
+
+
+def buche(nid, tid, spieldatum, beginn, ende, empfaenger=None):
+    """
+    Legt eine Buchung an, wenn der Platz zur gewählten Zeit frei ist.
+    Sperren, Prüfen und Speichern laufen in einer Transaktion auf einer Verbindung.
+    empfaenger: Angaben für die Bestätigung (siehe benachrichtigungen.buchung_vormerken).
+    Rückgabe: (buchungsnummer, None) oder (None, konflikt_row)
+    """
+    beginn, ende = verfuegbarkeit.als_uhrzeit(beginn), verfuegbarkeit.als_uhrzeit(ende)
+    with db_transaction() as tx:
+        # Platzzeile sperren: parallele Buchungen für denselben Platz warten hier
+        tx.read("SELECT tid FROM tennisplatz WHERE tid=%s FOR UPDATE", (tid,), single=True)
+
+        # Zwei Zeiträume überschneiden sich, wenn: Start1 < Ende2 UND Start2 < Ende1
+        konflikt = tx.read(
+            """SELECT * FROM buchung
+               WHERE tid = %s
+               AND spieldatum = %s
+               AND NOT (spielende <= %s OR spielbeginn >= %s)""",
+            (tid, spieldatum, beginn, ende),
+            single=True
+        )
+        if konflikt:
+            return None, konflikt
+
+        buchungsnummer = tx.write(
+            "INSERT INTO buchung (nid, tid, spieldatum, spielbeginn, spielende) VALUES (%s,%s,%s,%s,%s)",
+            (nid, tid, spieldatum, beginn, ende)
+        )
+        statistik.erfasse(tx, tid, [spieldatum], beginn, ende)
+        # Bestätigung in die Outbox, gesendet wird im Hintergrund
+        benachrichtigungen.buchung_vormerken(tx, buchungsnummer, nid, tid, spieldatum, beginn, ende, empfaenger)
+
+    verfuegbarkeit.invalidiere(tid, spieldatum)
+    return buchungsnummer, None
+
+
+# Serienbuchungen: maximaler Zeitraum und Wochentage (Montag = 0)
+SERIE_MAX_TAGE = 366
+WOCHENTAGE = ["mo", "di", "mi", "do", "fr", "sa", "so"]
+
+
+def pruefe_zeitfenster(beginn, ende):
+    """Gleiche Regeln wie in buchen(): halbe Stunden, 7-20 Uhr, höchstens 60 Minuten."""
+    beginn_min = verfuegbarkeit.zeit_in_minuten(beginn)
+    ende_min = verfuegbarkeit.zeit_in_minuten(ende)
+    if beginn_min % 30 or ende_min % 30:
+        return "Buchungen sind nur zu vollen oder halben Stunden möglich (z.B. 14:00 oder 14:30)."
+    if beginn_min < verfuegbarkeit.OEFFNUNG_MINUTEN or ende_min > verfuegbarkeit.SCHLIESSUNG_MINUTEN:
+        return "Buchungen sind nur zwischen 7:00 und 20:00 Uhr möglich."
+    if beginn_min >= ende_min:
+        return "Die Endzeit muss nach der Startzeit liegen."
+    if ende_min - beginn_min > 60:
+        return "Die maximale Buchungsdauer beträgt 1 Stunde (60 Minuten)."
+    return None
+
+
+def serien_termine(wochentag, von, bis):
+    """Alle Daten von..bis (inklusive), die auf den Wochentag (Montag = 0) fallen."""
+    erster = von + timedelta(days=(wochentag - von.weekday()) % 7)
+    return [erster + timedelta(weeks=i) for i in range((bis - erster).days // 7 + 1)] if erster <= bis else []
+
+
+def buche_serie(nid, tid, termine, beginn, ende):
+    """
+    Bucht denselben Platz und dieselbe Zeit an allen termine (sortierte Liste von date).
+    Konflikte werden mit einer Bereichsabfrage gesucht, die freien Termine mit einem
+    mehrzeiligen INSERT gespeichert, alles in einer Transaktion.
+    Termine in einer Wartungssperre werden ausgelassen.
+    Rückgabe: {"YYYY-MM-DD": {"status": "gebucht"|"konflikt"|"gesperrt", "buchungsnummer": ...}}
+    """
+    if not termine:
+        return {}
+    beginn, ende = verfuegbarkeit.als_uhrzeit(beginn), verfuegbarkeit.als_uhrzeit(ende)
+
+    gesperrt = {}
+    for t in termine:
+        sperre = sperren.sperre_fuer(tid, t, beginn, ende)
+        if sperre:
+            gesperrt[t.isoformat()] = {"status": "gesperrt", "buchungsnummer": None, "grund": sperre["grund"] or ""}
+
+    with db_transaction() as tx:
+        tx.read("SELECT tid FROM tennisplatz WHERE tid=%s FOR UPDATE", (tid,), single=True)
+
+        konflikte = tx.read(
+            """SELECT buchungsnummer, spieldatum FROM buchung
+               WHERE tid = %s
+               AND spieldatum BETWEEN %s AND %s
+               AND NOT (spielende <= %s OR spielbeginn >= %s)""",
+            (tid, termine[0], termine[-1], beginn, ende)
+        )
+        bericht = dict(gesperrt)
+        for row in konflikte:
+            bericht[str(row["spieldatum"])] = {"status": "konflikt", "buchungsnummer": row["buchungsnummer"]}
+
+        frei = [t for t in termine if t.isoformat() not in bericht]
+        tx.write_many(
+            "INSERT INTO buchung (nid, tid, spieldatum, spielbeginn, spielende) VALUES (%s,%s,%s,%s,%s)",
+            [(nid, tid, t, beginn, ende) for t in frei]
+        )
+        statistik.erfasse(tx, tid, frei, beginn, ende)
+
+        # Buchungsnummern der neuen Zeilen (der Platz ist gesperrt, es kann nichts dazwischenkommen)
+        if frei:
+            neue = tx.read(
+                """SELECT buchungsnummer, spieldatum FROM buchung
+                   WHERE tid = %s AND nid = %s AND spielbeginn = %s
+                   AND spieldatum BETWEEN %s AND %s""",
+                (tid, nid, beginn, frei[0], frei[-1])
+            )
+            frei_iso = {t.isoformat() for t in frei}
+            for row in neue:
+                datum = str(row["spieldatum"])
+                if datum in frei_iso:
+                    bericht[datum] = {"status": "gebucht", "buchungsnummer": row["buchungsnummer"]}
+            benachrichtigungen.serie_vormerken(tx, nid, tid, bericht, beginn, ende)
+
+    for t in frei:
+        verfuegbarkeit.invalidiere(tid, t)
+    return bericht
+
+
+def pruefe_stornierbar(buchung):
+    """Fehlermeldung, wenn die Buchung schon begonnen hat, sonst None."""
+    spieldatum = buchung['spieldatum']
+    if isinstance(spieldatum, str):
+        spieldatum = date.fromisoformat(spieldatum)
+
+    heute = date.today()
+    if spieldatum < heute:
+        return "Diese Buchung liegt in der Vergangenheit und kann nicht mehr storniert werden."
+
+    # Wenn Spieldatum heute ist, prüfen ob Spielbeginn schon vorbei ist
+    if spieldatum == heute:
+        jetzt = datetime.now()
+        if verfuegbarkeit.zeit_in_minuten(buchung['spielbeginn']) <= jetzt.hour * 60 + jetzt.minute:
+            return "Der Spielbeginn liegt in der Vergangenheit. Diese Buchung kann nicht mehr storniert werden."
+    return None
+
+
+def _storniere(bedingung, params):
+    """
+    Sucht die Buchung, sperrt sie und löscht sie in einer Transaktion.
+    Rückgabe: (buchung, fehler)
+      (None, None)       keine passende Buchung
+      (buchung, fehler)  gefunden, aber nicht stornierbar (nichts gelöscht)
+      (buchung, None)    gelöscht, buchung enthält die gelöschte Zeile
+    """
+    with db_transaction() as tx:
+        # FOR UPDATE sperrt über den JOIN auch die Platzzeile (wie in buche(), siehe statistik._aendern)
+        buchung = tx.read(
+            f"""SELECT b.*, n.vorname, n.nachname, n.email, t.tennisanlage, t.platznummer
+                FROM buchung b
+                JOIN nutzer n ON b.nid = n.nid
+                JOIN tennisplatz t ON b.tid = t.tid
+                WHERE {bedingung}
+                FOR UPDATE""",
+            params,
+            single=True
+        )
+        if not buchung:
+            return None, None
+
+        fehler = pruefe_stornierbar(buchung)
+        if fehler:
+            return buchung, fehler
+
+        tx.write("DELETE FROM buchung WHERE buchungsnummer = %s", (buchung['buchungsnummer'],))
+        statistik.entferne(tx, buchung['tid'], buchung['spieldatum'], buchung['spielbeginn'], buchung['spielende'])
+        benachrichtigungen.stornierung_vormerken(tx, buchung)
+
+    verfuegbarkeit.invalidiere(buchung['tid'], buchung['spieldatum'])
+    pdf.invalidiere(buchung['buchungsnummer'])
+    return buchung, None
+
+
+def storniere_nach_buchungsnummer(buchungsnummer, email):
+    return _storniere(
+        "b.buchungsnummer = %s AND n.email = %s",
+        (buchungsnummer, email)
+    )
+
+
+def storniere_nach_nid(nid, email, tid, spieldatum, beginn):
+    return _storniere(
+        "b.nid = %s AND n.email = %s AND b.tid = %s AND b.spieldatum = %s AND b.spielbeginn = %s",
+        (nid, email, tid, spieldatum, verfuegbarkeit.als_uhrzeit(beginn))
+    )
+
+
+def storniere_nach_personalien(vorname, nachname, email, tid, spieldatum, beginn):
+    return _storniere(
+        "n.vorname = %s AND n.nachname = %s AND n.email = %s AND b.tid = %s AND b.spieldatum = %s AND b.spielbeginn = %s",
+        (vorname, nachname, email, tid, spieldatum, verfuegbarkeit.als_uhrzeit(beginn))
+    )
@@ -0,0 +1,114 @@
+"""
+Buchungsübersicht für die Verwaltung: Filter, Keyset-Pagination und Anzahl.
+
+Sortiert wird nach (spieldatum, buchungsnummer), die nächste Seite beginnt
+hinter dem letzten Paar der vorigen Seite (?nach=YYYY-MM-DD:nummer). Die
+Anzahl der Treffer wird pro Filter kurz im Prozess gemerkt, damit nicht jede
+Seite ein COUNT(*) über den ganzen Bereich braucht.
+"""
+import os
+from datetime import date
+from cache import TTLCache
+from db import db_read
+import katalog
+import listen
+
+_anzahl = TTLCache(
+    "buchungen_anzahl",
+    maxsize=256,
+    ttl=int(os.getenv("BUCHUNGEN_ANZAHL_TTL", "60")),
+)
+
+FILTER = ["anlage", "tid", "von", "bis", "email"]
+
+
+def parse_filter(args):
+    """Filter aus den Query-Parametern; ValueError bei ungültigen Werten."""
+    f = {name: args.get(name, "").strip() for name in FILTER}
+    f["tid"] = int(f["tid"]) if f["tid"] else None
+    f["von"] = date.fromisoformat(f["von"]) if f["von"] else None
+    f["bis"] = date.fromisoformat(f["bis"]) if f["bis"] else None
+    if f["von"] and f["bis"] and f["von"] > f["bis"]:
+        raise ValueError("Das Von-Datum muss vor dem Bis-Datum liegen.")
+    return f
+
+
+def parse_nach(text):
+    """"2025-05-01:123" -> (date, 123), leer -> None"""
+    if not text:
+        return None
+    datum, nummer = text.split(":", 1)
+    return date.fromisoformat(datum), int(nummer)
+
+
+def als_url_parameter(f):
+    """Filter zurück in Query-Parameter (leere weglassen), z.B. für url_for()."""
+    return {k: str(v) for k, v in f.items() if v not in (None, "")}
+
+
+def bedingungen(f):
+    """WHERE-Bedingungen und Parameter für die Filter (Alias b, n, t wie in der Abfrage)."""
+    bed = []
+    params = []
+    if f["tid"] is not None:
+        bed.append("b.tid = %s")
+        params.append(f["tid"])
+    elif f["anlage"]:
+        # Anlage über den Katalog in Platz-IDs auflösen, dann reicht der Index auf buchung
+        tids = [p["tid"] for p in katalog.get_katalog()["plaetze"] if p["tennisanlage"] == f["anlage"]]
+        if not tids:
+            bed.append("1 = 0")
+        else:
+            bed.append(f"b.tid IN ({','.join(['%s'] * len(tids))})")
+            params.extend(tids)
+    if f["von"]:
+        bed.append("b.spieldatum >= %s")
+        params.append(f["von"])
+    if f["bis"]:
+        bed.append("b.spieldatum <= %s")
+        params.append(f["bis"])
+    if f["email"]:
+        bed.append("n.email = %s")
+        params.append(f["email"])
+    return bed, params
+
+
+def seite(f, nach=None, limit=listen.SEITE_STANDARD):
+    """(rows, naechste) wie listen._seite, naechste im Format für parse_nach()."""
+    bed, params = bedingungen(f)
+    if nach is not None:
+        bed.append("(b.spieldatum > %s OR (b.spieldatum = %s AND b.buchungsnummer > %s))")
+        params.extend([nach[0], nach[0], nach[1]])
+    where = " WHERE " + " AND ".join(bed) if bed else ""
+
+    rows = db_read(
+        f"""SELECT b.buchungsnummer, b.spieldatum, b.spielbeginn, b.spielende,
+                   b.tid, t.tennisanlage, t.platznummer,
+                   b.nid, n.vorname, n.nachname, n.email
+            FROM buchung b
+            JOIN tennisplatz t ON b.tid = t.tid
+            JOIN nutzer n ON b.nid = n.nid{where}
+            ORDER BY b.spieldatum, b.buchungsnummer
+            LIMIT %s""",
+        (*params, limit + 1)
+    ) or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        letzte = rows[-1]
+        return rows, f"{letzte['spieldatum']}:{letzte['buchungsnummer']}"
+    return rows, None
+
+
+def _zaehle(f):
+    bed, params = bedingungen(f)
+    where = " WHERE " + " AND ".join(bed) if bed else ""
+    # nutzer nur joinen, wenn nach E-Mail gefiltert wird
+    join = " JOIN nutzer n ON b.nid = n.nid" if f["email"] else ""
+    row = db_read(f"SELECT COUNT(*) AS anzahl FROM buchung b{join}{where}", tuple(params), single=True)
+    return row["anzahl"] if row else 0
+
+
+def anzahl(f):
+    """Anzahl der Buchungen für die Filter, bis zu BUCHUNGEN_ANZAHL_TTL Sekunden alt."""
+    key = tuple(sorted(als_url_parameter(f).items()))
+    return _anzahl.get_or_load(key, lambda: _zaehle(f))
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Alle angelegten Caches nach Name (z.B. für Trefferquoten)
+CACHES = {}
+
+_FEHLT = object()
+
+
+class TTLCache:
+    """Thread-sicherer LRU-Cache, Einträge verfallen nach ttl Sekunden."""
+
+    def __init__(self, name, maxsize=1024, ttl=60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._daten = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            eintrag = self._daten.get(key)
+            if eintrag is not None:
+                wert, ablauf = eintrag
+                if ablauf > time.monotonic():
+                    self._daten.move_to_end(key)
+                    self.hits += 1
+                    return wert
+                del self._daten[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            # Wurde während dem Laden invalidiert, ist der Wert schon veraltet
+            if version is not None and version != self.version:
+                return
+            self._daten[key] = (value, time.monotonic() + self.ttl)
+            self._daten.move_to_end(key)
+            while len(self._daten) > self.maxsize:
+                self._daten.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        wert = self.get(key, _FEHLT)
+        if wert is not _FEHLT:
+            return wert
+        version = self.version
+        wert = loader()
+        self.set(key, wert, version=version)
+        return wert
+
+    def invalidate(self, key=_FEHLT):
+        """Einen Eintrag oder (ohne key) den ganzen Cache verwerfen."""
+        with self._lock:
+            self.version += 1
+            if key is _FEHLT:
+                self._daten.clear()
+            else:
+                self._daten.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._daten),
+                "hits": self.hits,
+                "misses": self.misses,
+                "version": self.version,
+            }
@@ -0,0 +1,255 @@
+"""
+CSV-Import (Tennisplätze, Wartungsarbeiter) und CSV-Export (Buchungen u.a.).
+
+Importe werden zeilenweise aus der hochgeladenen Datei gelesen und in Blöcken
+von IMPORT_BATCH Zeilen geschrieben: pro Block eine Abfrage für die
+Duplikatprüfung und ein mehrzeiliges INSERT, alles in einer Transaktion.
+Exporte laufen über einen ungepufferten Cursor und werden als Text-Stücke
+geliefert, die Flask direkt an den Client streamt.
+"""
+import csv
+import io
+import os
+from datetime import date, timedelta
+from db import db_stream, db_transaction
+import verfuegbarkeit
+
+IMPORT_BATCH = int(os.getenv("CSV_IMPORT_BATCH", "500"))
+EXPORT_BATCH = int(os.getenv("CSV_EXPORT_BATCH", "500"))
+
+# Höchstens so viele Fehlermeldungen werden gesammelt
+MAX_FEHLER = 20
+
+TENNISPLATZ_SPALTEN = ["tennisanlage", "platznummer", "belag", "wid", "datum_der_wartung"]
+WARTUNGSARBEITER_SPALTEN = ["vorname", "nachname", "geburtsdatum"]
+
+
+class ImportBericht:
+    def __init__(self):
+        self.eingefuegt = 0
+        self.duplikate = 0
+        self.fehler = []
+
+    def fehler_melden(self, zeile, text):
+        if len(self.fehler) < MAX_FEHLER:
+            self.fehler.append(f"Zeile {zeile}: {text}")
+        elif len(self.fehler) == MAX_FEHLER:
+            self.fehler.append("... weitere Fehler nicht angezeigt")
+
+
+def _zeilen(datei, spalten):
+    """
+    Liefert (zeilennummer, dict) für jede Datenzeile der hochgeladenen Datei.
+    Trennzeichen ; oder , (Excel speichert mit ;), erste Zeile = Spaltennamen.
+    """
+    text = io.TextIOWrapper(datei.stream, encoding="utf-8-sig", newline="")
+    kopf = text.readline()
+    trenner = ";" if kopf.count(";") > kopf.count(",") else ","
+    namen = [n.strip().lower() for n in next(csv.reader([kopf], delimiter=trenner), [])]
+    fehlend = [s for s in spalten if s not in namen]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten in der CSV-Datei: {', '.join(fehlend)}")
+
+    reader = csv.DictReader(text, fieldnames=namen, delimiter=trenner)
+    for row in reader:
+        # line_num zählt ab der zweiten Zeile (Kopf wurde schon gelesen)
+        if not any((wert or "").strip() for wert in row.values() if isinstance(wert, str)):
+            continue
+        yield reader.line_num + 1, {s: (row.get(s) or "").strip() for s in spalten}
+
+
+def _bloecke(zeilen, groesse):
+    block = []
+    for zeile in zeilen:
+        block.append(zeile)
+        if len(block) >= groesse:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _platzhalter(werte):
+    return ",".join(["%s"] * len(werte))
+
+
+def importiere_tennisplaetze(datei):
+    """
+    Tennisplätze aus CSV (Spalten wie TENNISPLATZ_SPALTEN) anlegen.
+    Vorhandene Plätze (gleiche Anlage und Platznummer) werden übersprungen.
+    """
+    bericht = ImportBericht()
+    heute = date.today()
+    gesehen = set()
+
+    with db_transaction() as tx:
+        for block in _bloecke(_zeilen(datei, TENNISPLATZ_SPALTEN), IMPORT_BATCH):
+            gueltig = []
+            for nr, row in block:
+                try:
+                    platznummer = int(row["platznummer"])
+                    wid = int(row["wid"])
+                    wartung = date.fromisoformat(row["datum_der_wartung"])
+                except ValueError:
+                    bericht.fehler_melden(nr, "Platznummer und wid müssen Zahlen sein, Datum als JJJJ-MM-TT.")
+                    continue
+                if not row["tennisanlage"] or not row["belag"]:
+                    bericht.fehler_melden(nr, "Tennisanlage und Belag dürfen nicht leer sein.")
+                elif wartung > heute:
+                    bericht.fehler_melden(nr, "Das Datum der letzten Wartung darf nicht in der Zukunft liegen.")
+                else:
+                    gueltig.append((nr, (row["tennisanlage"], platznummer, row["belag"], wartung, wid)))
+            if not gueltig:
+                continue
+
+            # Duplikate und Wartungsarbeiter für den ganzen Block mit je einer Abfrage prüfen.
+            # Namen vergleichen wir in SQL und Python gleich: LOWER() bzw. str.lower()
+            anlagen = sorted({werte[0].lower() for _, werte in gueltig})
+            vorhanden = {
+                (row["tennisanlage"].lower(), row["platznummer"])
+                for row in tx.read(
+                    f"""SELECT tennisanlage, platznummer FROM tennisplatz
+                        WHERE LOWER(tennisanlage) IN ({_platzhalter(anlagen)})""",
+                    tuple(anlagen)
+                )
+            }
+            wids = sorted({werte[4] for _, werte in gueltig})
+            arbeiter = {
+                row["wid"]
+                for row in tx.read(
+                    f"SELECT wid FROM wartungsarbeiter WHERE wid IN ({_platzhalter(wids)})",
+                    tuple(wids)
+                )
+            }
+
+            neu = []
+            for nr, werte in gueltig:
+                key = (werte[0].lower(), werte[1])
+                if key in vorhanden or key in gesehen:
+                    bericht.duplikate += 1
+                elif werte[4] not in arbeiter:
+                    bericht.fehler_melden(nr, f"Wartungsarbeiter mit ID {werte[4]} existiert nicht.")
+                else:
+                    gesehen.add(key)
+                    neu.append(werte)
+
+            bericht.eingefuegt += tx.write_many(
+                "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, datum_der_wartung, wid) VALUES (%s,%s,%s,%s,%s)",
+                neu
+            )
+    return bericht
+
+
+def importiere_wartungsarbeiter(datei):
+    """
+    Wartungsarbeiter aus CSV (Spalten wie WARTUNGSARBEITER_SPALTEN) anlegen.
+    Vorhandene Personen (gleicher Name und Geburtsdatum) werden übersprungen.
+    """
+    bericht = ImportBericht()
+    gesehen = set()
+
+    with db_transaction() as tx:
+        for block in _bloecke(_zeilen(datei, WARTUNGSARBEITER_SPALTEN), IMPORT_BATCH):
+            gueltig = []
+            for nr, row in block:
+                try:
+                    geburtsdatum = date.fromisoformat(row["geburtsdatum"])
+                except ValueError:
+                    bericht.fehler_melden(nr, "Geburtsdatum bitte als JJJJ-MM-TT angeben.")
+                    continue
+                if not row["vorname"] or not row["nachname"]:
+                    bericht.fehler_melden(nr, "Vorname und Nachname dürfen nicht leer sein.")
+                else:
+                    gueltig.append((row["vorname"], row["nachname"], geburtsdatum))
+            if not gueltig:
+                continue
+
+            nachnamen = sorted({werte[1].lower() for werte in gueltig})
+            vorhanden = {
+                (row["vorname"].lower(), row["nachname"].lower(), str(row["geburtsdatum"]))
+                for row in tx.read(
+                    f"""SELECT vorname, nachname, geburtsdatum FROM wartungsarbeiter
+                        WHERE LOWER(nachname) IN ({_platzhalter(nachnamen)})""",
+                    tuple(nachnamen)
+                )
+            }
+
+            neu = []
+            for werte in gueltig:
+                key = (werte[0].lower(), werte[1].lower(), werte[2].isoformat())
+                if key in vorhanden or key in gesehen:
+                    bericht.duplikate += 1
+                else:
+                    gesehen.add(key)
+                    neu.append(werte)
+
+            bericht.eingefuegt += tx.write_many(
+                "INSERT INTO wartungsarbeiter (vorname, nachname, geburtsdatum) VALUES (%s,%s,%s)",
+                neu
+            )
+    return bericht
+
+
+def _wert(wert):
+    if wert is None:
+        return ""
+    if isinstance(wert, timedelta):
+        minuten = verfuegbarkeit.zeit_in_minuten(wert)
+        return f"{minuten // 60:02d}:{minuten % 60:02d}"
+    return wert
+
+
+def exportiere(sql, params, spalten):
+    """
+    Generator mit CSV-Text für alle Zeilen der Abfrage, in Stücken zu EXPORT_BATCH
+    Zeilen. Es liegt nie mehr als ein Stück im Speicher.
+    """
+    puffer = io.StringIO()
+    writer = csv.writer(puffer)
+    writer.writerow(spalten)
+    for i, row in enumerate(db_stream(sql, params, batch=EXPORT_BATCH), 1):
+        writer.writerow([_wert(row[s]) for s in spalten])
+        if i % EXPORT_BATCH == 0:
+            yield puffer.getvalue()
+            puffer.seek(0)
+            puffer.truncate()
+    yield puffer.getvalue()
+
+
+BUCHUNG_SPALTEN = [
+    "buchungsnummer", "spieldatum", "spielbeginn", "spielende",
+    "tid", "tennisanlage", "platznummer", "nid", "vorname", "nachname", "email",
+]
+
+
+def exportiere_buchungen(bedingungen=(), params=()):
+    """bedingungen/params wie in buchungsliste.bedingungen() (Filter der Übersicht)"""
+    where = " WHERE " + " AND ".join(bedingungen) if bedingungen else ""
+    return exportiere(
+        f"""SELECT b.buchungsnummer, b.spieldatum, b.spielbeginn, b.spielende,
+                   b.tid, t.tennisanlage, t.platznummer,
+                   b.nid, n.vorname, n.nachname, n.email
+            FROM buchung b
+            JOIN tennisplatz t ON b.tid = t.tid
+            JOIN nutzer n ON b.nid = n.nid{where}
+            ORDER BY b.spieldatum, b.buchungsnummer""",
+        tuple(params),
+        BUCHUNG_SPALTEN
+    )
+
+
+def exportiere_tennisplaetze():
+    # gleiche Spalten wie der Import, dazu tid
+    return exportiere(
+        "SELECT tid, tennisanlage, platznummer, belag, wid, datum_der_wartung FROM tennisplatz ORDER BY tid",
+        None,
+        ["tid"] + TENNISPLATZ_SPALTEN
+    )
+
+
+def exportiere_wartungsarbeiter():
+    return exportiere(
+        "SELECT wid, vorname, nachname, geburtsdatum FROM wartungsarbeiter ORDER BY wid",
+        None,
+        ["wid"] + WARTUNGSARBEITER_SPALTEN
+    )
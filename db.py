@@ -1,10 +1,23 @@
+from contextlib import contextmanager
+from datetime import date, datetime, time as uhrzeit, timedelta
+from functools import lru_cache
 from dotenv import load_dotenv
+import atexit
+import logging
 import os
-from mysql.connector import pooling
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
 
 # Load .env variables
 load_dotenv()
 
+# mysql (Standard) oder sqlite (lokal, ohne Server, z.B. für Benchmarks)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "user": os.getenv("DB_USER"),
@@ -12,16 +25,428 @@ DB_CONFIG = {
     "database": os.getenv("DB_DATABASE")
 }
 
-# Init db
-pool = pooling.MySQLConnectionPool(pool_name="pool", pool_size=5, **DB_CONFIG)
+# Datei oder :memory: (nur für Tests: temporäre Datei, lebt so lange wie der Prozess)
+SQLITE_PFAD = os.getenv("DB_SQLITE_PFAD", "tennis.sqlite3")
+SQLITE_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "sqlite.sql")
+
+# Pool-Einstellungen (Sekunden)
+POOL_CONFIG = {
+    "size": int(os.getenv("DB_POOL_SIZE", "5")),
+    # so lange wartet ein Request auf eine freie Verbindung
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    # Verbindung vor der Ausgabe mit ping prüfen
+    "ping": os.getenv("DB_POOL_PING", "1") == "1",
+    # Verbindungen werden nach dieser Zeit ersetzt, egal ob aktiv
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+    # länger unbenutzte Verbindungen werden ersetzt (MySQL wait_timeout)
+    "recycle": float(os.getenv("DB_POOL_RECYCLE", "280")),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Innerhalb von DB_POOL_TIMEOUT wurde keine Verbindung frei."""
+
+
+class PooledConnection:
+    """Leitet alles an die echte Verbindung weiter, close() gibt sie an den Pool zurück."""
+
+    def __init__(self, pool, eintrag):
+        self._pool = pool
+        self._eintrag = eintrag
+
+    def __getattr__(self, name):
+        return getattr(self._eintrag["conn"], name)
+
+    def close(self):
+        if self._eintrag is not None:
+            eintrag, self._eintrag = self._eintrag, None
+            self._pool.release(eintrag)
+
+
+# Pool-Instrumentierung
+# Listener werden in acquire() mit der Wartezeit auf die Verbindung (ms) aufgerufen.
+_pool_listeners = []
+
+def add_pool_listener(listener):
+    _pool_listeners.append(listener)
+
+def remove_pool_listener(listener):
+    if listener in _pool_listeners:
+        _pool_listeners.remove(listener)
+
+
+class ConnectionPool:
+    """
+    Blockierender Pool: wartet bis zu `timeout` Sekunden auf eine freie Verbindung,
+    statt wie MySQLConnectionPool sofort einen PoolError zu werfen.
+    Kaputte, zu alte und zu lange unbenutzte Verbindungen werden ersetzt.
+    `connect` öffnet eine neue Verbindung des Backends.
+    """
+
+    def __init__(self, connect, size, timeout, ping, max_lifetime, recycle):
+        self.size = size
+        self.timeout = timeout
+        self.ping = ping
+        self.max_lifetime = max_lifetime
+        self.recycle = recycle
+        self._connect_neu = connect
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._metrics = {
+            "in_use": 0,
+            "acquired": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "replaced": 0,
+        }
+
+    def _connect(self):
+        conn = self._connect_neu()
+        with self._lock:
+            self._metrics["created"] += 1
+        jetzt = time.monotonic()
+        return {"conn": conn, "erstellt": jetzt, "benutzt": jetzt}
+
+    def _verwerfen(self, eintrag):
+        try:
+            eintrag["conn"].close()
+        except Exception:
+            pass
+        with self._lock:
+            self._metrics["replaced"] += 1
+
+    def _ist_brauchbar(self, eintrag):
+        jetzt = time.monotonic()
+        if self.max_lifetime and jetzt - eintrag["erstellt"] > self.max_lifetime:
+            return False
+        if self.recycle and jetzt - eintrag["benutzt"] > self.recycle:
+            return False
+        if self.ping:
+            try:
+                eintrag["conn"].ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def acquire(self, timeout=None):
+        start = time.perf_counter()
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._metrics["exhausted"] += 1
+            logger.warning("DB-Pool erschöpft: keine Verbindung innerhalb von %.1f s", timeout)
+            raise PoolTimeout("Keine freie Datenbankverbindung im Pool")
+        wartezeit = time.perf_counter() - start
+
+        try:
+            while True:
+                with self._lock:
+                    eintrag = self._idle.pop() if self._idle else None
+                if eintrag is None:
+                    eintrag = self._connect()
+                    break
+                if self._ist_brauchbar(eintrag):
+                    break
+                self._verwerfen(eintrag)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._metrics["in_use"] += 1
+            self._metrics["acquired"] += 1
+            self._metrics["wait_time_total"] += wartezeit
+            self._metrics["wait_time_max"] = max(self._metrics["wait_time_max"], wartezeit)
+        for listener in _pool_listeners:
+            listener(wartezeit * 1000)
+        return PooledConnection(self, eintrag)
+
+    def release(self, eintrag):
+        try:
+            conn = eintrag["conn"]
+            try:
+                # offene Transaktion (z.B. nach Exception) nicht weiterreichen
+                if conn.in_transaction:
+                    conn.rollback()
+                eintrag["benutzt"] = time.monotonic()
+                with self._lock:
+                    self._idle.append(eintrag)
+            except Exception:
+                self._verwerfen(eintrag)
+        finally:
+            with self._lock:
+                self._metrics["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["idle"] = len(self._idle)
+        stats["size"] = self.size
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+
+# Backends
+class MySQLBackend:
+    """MySQL über mysql-connector, Verbindungen aus dem blockierenden Pool."""
+
+    def __init__(self):
+        import mysql.connector
+        from mysql.connector import errors, errorcode
+        self._errors = errors
+        self._errorcode = errorcode
+        self.pool = ConnectionPool(lambda: mysql.connector.connect(**DB_CONFIG), **POOL_CONFIG)
+
+    def ist_duplikat(self, exc):
+        return isinstance(exc, self._errors.IntegrityError) and exc.errno == self._errorcode.ER_DUP_ENTRY
+
+
+def _sqlite_zeit(wert):
+    stunden, minuten, *sekunden = (int(teil) for teil in wert.decode().split(":"))
+    return timedelta(hours=stunden, minutes=minuten, seconds=sekunden[0] if sekunden else 0)
+
+
+def _sqlite_datum(wert):
+    return date.fromisoformat(wert.decode()[:10])
+
+
+def _sqlite_zeitpunkt(wert):
+    return datetime.fromisoformat(wert.decode())
+
+
+def _sqlite_wert(wert):
+    """Parameter so speichern, wie MySQL sie in DATE/DATETIME/TIME-Spalten ablegt (ISO-Text)."""
+    if isinstance(wert, datetime):
+        return wert.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(wert, date):
+        return wert.isoformat()
+    if isinstance(wert, uhrzeit):
+        return wert.strftime("%H:%M:%S")
+    if isinstance(wert, timedelta):
+        sekunden = int(wert.total_seconds())
+        return f"{sekunden // 3600:02d}:{sekunden % 3600 // 60:02d}:{sekunden % 60:02d}"
+    return wert
+
+
+def _sqlite_lower(wert):
+    return wert.lower() if isinstance(wert, str) else wert
+
+
+@lru_cache(maxsize=1024)
+def _sqlite_sql(sql):
+    # FOR UPDATE [SKIP LOCKED] gibt es nicht; BEGIN IMMEDIATE in start_transaction() sperrt stattdessen die Datenbank
+    sql = re.sub(r"\s+FOR\s+UPDATE(?:\s+SKIP\s+LOCKED)?\s*$", "", sql, flags=re.IGNORECASE)
+    return sql.replace("%s", "?")
+
+
+def _dict_zeile(cursor, row):
+    return {spalte[0]: wert for spalte, wert in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """Cursor mit der Schnittstelle von mysql-connector (%s, dictionary=True)."""
+
+    def __init__(self, conn, dictionary):
+        self._conn = conn
+        self._cur = conn._conn.cursor()
+        if dictionary:
+            self._cur.row_factory = _dict_zeile
+
+    def execute(self, sql, params=()):
+        self._cur.execute(_sqlite_sql(sql), [_sqlite_wert(p) for p in params])
+
+    def executemany(self, sql, seq_params):
+        self._cur.executemany(_sqlite_sql(sql), ([_sqlite_wert(p) for p in params] for params in seq_params))
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size):
+        return self._cur.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """sqlite3-Verbindung mit den Methoden, die db.py von mysql-connector benutzt."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=True):
+        return SQLiteCursor(self, dictionary)
+
+    def start_transaction(self):
+        # Schreibsperre gleich zu Beginn, entspricht den FOR UPDATE-Sperren unter MySQL
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    """
+    Eingebettete SQLite-Datenbank als Datei im WAL-Modus (bei :memory: eine
+    temporäre Datei, die beim Beenden gelöscht wird).
+    Jede Verbindung gehört, solange sie ausgeliehen ist, genau einem Thread;
+    der Pool begrenzt die Anzahl wie bei MySQL. Das Schema aus db/sqlite.sql
+    wird beim Start angelegt.
+    """
+
+    def __init__(self):
+        for typ, umwandeln in (("DATE", _sqlite_datum), ("DATETIME", _sqlite_zeitpunkt), ("TIME", _sqlite_zeit)):
+            sqlite3.register_converter(typ, umwandeln)
+        self.pfad = SQLITE_PFAD
+        if SQLITE_PFAD == ":memory:":
+            # Temporäre Datei statt Shared-Cache-Speicher: dort sehen Leser entweder
+            # nicht festgeschriebene Daten (read_uncommitted) oder scheitern an Tabellensperren
+            fd, self.pfad = tempfile.mkstemp(prefix="tennis-", suffix=".sqlite3")
+            os.close(fd)
+            atexit.register(self._aufraeumen)
+        schema = self._verbinden()
+        try:
+            with open(SQLITE_SCHEMA, encoding="utf-8") as f:
+                schema._conn.executescript(f.read())
+        finally:
+            schema.close()
+        self.pool = ConnectionPool(
+            self._verbinden, size=POOL_CONFIG["size"], timeout=POOL_CONFIG["timeout"],
+            ping=False, max_lifetime=0, recycle=0,
+        )
+
+    def _verbinden(self):
+        conn = sqlite3.connect(
+            self.pfad,
+            timeout=POOL_CONFIG["timeout"],
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # LOWER() von SQLite kennt nur ASCII, MySQL auch Umlaute
+        conn.create_function("LOWER", 1, _sqlite_lower, deterministic=True)
+        return SQLiteConnection(conn)
+
+    def _aufraeumen(self):
+        for endung in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.pfad + endung)
+            except OSError:
+                pass
+
+    def ist_duplikat(self, exc):
+        # entspricht ER_DUP_ENTRY (1062) unter MySQL
+        return isinstance(exc, sqlite3.IntegrityError) and "UNIQUE constraint failed" in str(exc)
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+# Init db (Verbindungen werden erst bei Bedarf geöffnet)
+backend = BACKENDS[DB_BACKEND]()
+pool = backend.pool
 
 def get_conn():
-    return pool.get_connection()
+    return pool.acquire()
+
+def pool_stats():
+    return pool.stats()
+
+# Query-Instrumentierung
+# Listener werden mit (sql, dauer_ms, zeilen) aufgerufen. Ohne Listener wird
+# nichts formatiert; die Startzeit wird immer genommen, da sich Listener zur
+# Laufzeit anmelden können.
+query_logger = logging.getLogger("db.queries")
+QUERY_LOG = os.getenv("DB_QUERY_LOG", "0") == "1"
+QUERY_LOG_SAMPLE = float(os.getenv("DB_QUERY_LOG_SAMPLE", "1.0"))
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "0"))
+
+_query_listeners = []
+
+def add_query_listener(listener):
+    _query_listeners.append(listener)
+
+def remove_query_listener(listener):
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """SQL ohne Literale und überflüssige Leerzeichen, z.B. zum Gruppieren."""
+    sql = re.sub(r"'(?:[^'\\]|\\.)*'", "?", sql)
+    sql = re.sub(r"\b\d+\b", "?", sql)
+    sql = re.sub(r"%s", "?", sql)
+    sql = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?+)", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+def _notify(sql, start, zeilen):
+    dauer_ms = (time.perf_counter() - start) * 1000
+    for listener in _query_listeners:
+        listener(sql, dauer_ms, zeilen)
+
+def _log_query(sql, dauer_ms, zeilen):
+    if SLOW_QUERY_MS and dauer_ms >= SLOW_QUERY_MS:
+        level = logging.WARNING
+    elif QUERY_LOG and random.random() < QUERY_LOG_SAMPLE:
+        level = logging.INFO
+    else:
+        return
+    if query_logger.isEnabledFor(level):
+        query_logger.log(
+            level,
+            "query %.1f ms rows=%s sql=%s",
+            dauer_ms, zeilen, fingerprint(sql),
+            extra={"dauer_ms": dauer_ms, "zeilen": zeilen, "fingerprint": fingerprint(sql)}
+        )
+
+if QUERY_LOG or SLOW_QUERY_MS:
+    add_query_listener(_log_query)
 
 # DB-Helper
 def db_read(sql, params=None, single=False):
     conn = get_conn()
     try:
+        start = time.perf_counter()
         # buffered=True verhindert "Unread result found" Fehler
         cur = conn.cursor(dictionary=True, buffered=True)
         cur.execute(sql, params or ())
@@ -29,12 +454,14 @@ def db_read(sql, params=None, single=False):
         if single:
             # liefert EIN Dict oder None
             row = cur.fetchone()
-            print("db_read(single=True) ->", row)   # DEBUG
+            if _query_listeners:
+                _notify(sql, start, 0 if row is None else 1)
             return row
         else:
             # liefert Liste von Dicts (evtl. [])
             rows = cur.fetchall()
-            print("db_read(single=False) ->", rows)  # DEBUG
+            if _query_listeners:
+                _notify(sql, start, len(rows))
             return rows
     finally:
         try:
@@ -46,13 +473,128 @@ def db_read(sql, params=None, single=False):
 def db_write(sql, params=None):
     conn = get_conn()
     try:
+        start = time.perf_counter()
         cur = conn.cursor()
         cur.execute(sql, params or ())
         conn.commit()
-        print("db_write OK:", sql, params)  # DEBUG
+        if _query_listeners:
+            _notify(sql, start, cur.rowcount)
+        # ID der neuen Zeile bei INSERT (AUTO_INCREMENT), sonst 0/None
+        return cur.lastrowid
     finally:
         try:
             cur.close()
         except:
             pass
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+def db_stream(sql, params=None, batch=500):
+    """
+    Liefert die Zeilen (Dicts) einzeln als Generator, ohne das Ergebnis zu puffern.
+    Der Server schickt die Zeilen, während sie gelesen werden (ungepufferter Cursor);
+    die Verbindung bleibt belegt, bis der Generator erschöpft oder geschlossen ist.
+    """
+    conn = get_conn()
+    cur = None
+    zeilen = 0
+    try:
+        start = time.perf_counter()
+        cur = conn.cursor(dictionary=True, buffered=False)
+        cur.execute(sql, params or ())
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            zeilen += len(rows)
+            yield from rows
+        if _query_listeners:
+            _notify(sql, start, zeilen)
+    finally:
+        # Bei Abbruch (z.B. Client trennt) Restzeilen verwerfen, sonst ist die Verbindung unbrauchbar
+        try:
+            conn.consume_results()
+        except:
+            pass
+        if cur is not None:
+            try:
+                cur.close()
+            except:
+                pass
+        conn.close()
+
+
+def ist_duplikat(exc):
+    """True, wenn exc eine verletzte UNIQUE-/PRIMARY-KEY-Bedingung ist."""
+    return backend.ist_duplikat(exc)
+
+
+class Transaktion:
+    """Eine Verbindung und ein Cursor für mehrere Statements in einer Transaktion."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor(dictionary=True, buffered=True)
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def read(self, sql, params=None, single=False):
+        start = time.perf_counter()
+        self.cur.execute(sql, params or ())
+        if single:
+            row = self.cur.fetchone()
+            if _query_listeners:
+                _notify(sql, start, 0 if row is None else 1)
+            return row
+        rows = self.cur.fetchall()
+        if _query_listeners:
+            _notify(sql, start, len(rows))
+        return rows
+
+    def write(self, sql, params=None):
+        # liefert die ID der neuen Zeile (AUTO_INCREMENT) oder None
+        start = time.perf_counter()
+        self.cur.execute(sql, params or ())
+        self.lastrowid = self.cur.lastrowid
+        self.rowcount = self.cur.rowcount
+        if _query_listeners:
+            _notify(sql, start, self.rowcount)
+        return self.lastrowid
+
+    def write_many(self, sql, seq_params):
+        # INSERT mit vielen Zeilen: mysql-connector macht daraus ein mehrzeiliges INSERT
+        seq_params = list(seq_params)
+        if not seq_params:
+            self.rowcount = 0
+            return 0
+        start = time.perf_counter()
+        self.cur.executemany(sql, seq_params)
+        self.rowcount = self.cur.rowcount
+        if _query_listeners:
+            _notify(sql, start, self.rowcount)
+        return self.rowcount
+
+
+@contextmanager
+def db_transaction():
+    """
+    with db_transaction() as tx:
+        tx.read(...) / tx.write(...)
+    Commit am Ende des Blocks, Rollback bei jeder Exception.
+    """
+    conn = get_conn()
+    tx = None
+    try:
+        conn.start_transaction()
+        tx = Transaktion(conn)
+        yield tx
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if tx is not None:
+            try:
+                tx.cur.close()
+            except:
+                pass
+        conn.close()
@@ -1,3 +1,8 @@
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS session_store;
+DROP TABLE IF EXISTS benachrichtigung;
+DROP TABLE IF EXISTS buchung_tagesstatistik;
+DROP TABLE IF EXISTS wartungssperre;
 DROP TABLE buchung;
 DROP TABLE tennisplatz;
 DROP TABLE wartungsarbeiter;
@@ -0,0 +1,6 @@
+-- Index für die Konfliktprüfung in buchen():
+-- WHERE tid = ? AND spieldatum = ? AND NOT (spielende <= ? OR spielbeginn >= ?)
+-- Mit (tid, spieldatum) als Präfix wird nur noch der eine Platz an einem Tag
+-- gelesen, spielbeginn/spielende kommen direkt aus dem Index.
+CREATE INDEX idx_buchung_verfuegbarkeit
+    ON buchung (tid, spieldatum, spielbeginn, spielende);
@@ -0,0 +1,19 @@
+-- Indizes und Eindeutigkeit für die Spalten, nach denen die Routen suchen.
+-- Achtung: Die UNIQUE-Indizes schlagen fehl, wenn bereits Duplikate in der
+-- Tabelle stehen. Diese zuerst bereinigen.
+
+-- buchen(), stornieren(): WHERE email=... bzw. WHERE vorname=... AND nachname=... AND email=...
+-- Der eindeutige Index auf email deckt beide Abfragen ab.
+ALTER TABLE nutzer ADD UNIQUE INDEX uq_nutzer_email (email);
+
+-- buchen(), stornieren(), tennisplätze(): WHERE tennisanlage=... AND platznummer=...
+ALTER TABLE tennisplatz ADD UNIQUE INDEX uq_tennisplatz_anlage_platz (tennisanlage, platznummer);
+
+-- stornieren(): Buchungen eines Nutzers
+CREATE INDEX idx_buchung_nutzer ON buchung (nid, spieldatum);
+
+-- wartungsarbeiter(): WHERE vorname=... AND nachname=... AND geburtsdatum=...
+ALTER TABLE wartungsarbeiter ADD UNIQUE INDEX uq_wartungsarbeiter_person (vorname, nachname, geburtsdatum);
+
+-- auth.User.get_by_username(): WHERE username=...
+ALTER TABLE users ADD UNIQUE INDEX uq_users_username (username);
@@ -0,0 +1,8 @@
+-- Serverseitige Bestätigungsdaten für bbestätigt()/sbestätigt() (SESSION_STORE=mysql).
+-- In der Cookie-Session steht nur noch das Token.
+CREATE TABLE session_store (
+    token VARCHAR(64) PRIMARY KEY,
+    daten TEXT NOT NULL,
+    ablauf DATETIME NOT NULL,
+    INDEX idx_session_store_ablauf (ablauf)
+);
@@ -0,0 +1,4 @@
+-- buchungsuebersicht(): Bereichsabfrage über spieldatum, sortiert nach
+-- (spieldatum, buchungsnummer). InnoDB hängt den Primärschlüssel an jeden
+-- Sekundärindex an, damit ist die Keyset-Sortierung bereits im Index enthalten.
+CREATE INDEX idx_buchung_spieldatum ON buchung (spieldatum);
@@ -0,0 +1,12 @@
+-- Voraggregierte Belegung pro Platz, Tag und Stunde für die Statistikseite.
+-- Wird in buchungen.py in derselben Transaktion wie die Buchung gepflegt;
+-- für vorhandene Buchungen einmalig: python statistik.py --neu-aufbauen
+CREATE TABLE buchung_tagesstatistik (
+    tid INT NOT NULL,
+    spieldatum DATE NOT NULL,
+    stunde TINYINT NOT NULL,
+    buchungen INT NOT NULL DEFAULT 0,
+    minuten INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tid, spieldatum, stunde),
+    INDEX idx_tagesstatistik_datum (spieldatum)
+);
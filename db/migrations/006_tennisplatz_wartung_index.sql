@@ -0,0 +1,8 @@
+-- wartungsplanung(): Plätze und Wartungsstand pro Wartungsarbeiter in einer
+-- gruppierten Abfrage; Übertragen aller Plätze eines Arbeiters (WHERE wid=...).
+-- Der Index deckt beides ab und ersetzt für den Fremdschlüssel den Index auf wid.
+CREATE INDEX idx_tennisplatz_wartung ON tennisplatz (wid, datum_der_wartung);
+-- Den von MySQL für FOREIGN KEY (wid) implizit angelegten Index (Name "wid")
+-- entfernen. MySQL lehnt das ab (Fehler 1553), solange kein anderer Index mit
+-- wid vorne den Fremdschlüssel abdeckt, deshalb erst nach dem CREATE.
+DROP INDEX wid ON tennisplatz;
@@ -0,0 +1,11 @@
+-- Wartungssperren: in diesen Zeiträumen kann der Platz nicht gebucht werden.
+-- Wird von sperren.py pro Platz in den Speicher geladen (Intervall-Index).
+CREATE TABLE wartungssperre (
+    sid INT AUTO_INCREMENT PRIMARY KEY,
+    tid INT NOT NULL,
+    von DATETIME NOT NULL,
+    bis DATETIME NOT NULL,
+    grund VARCHAR(250),
+    INDEX idx_wartungssperre_bis (bis),
+    FOREIGN KEY (tid) REFERENCES tennisplatz(tid) ON DELETE CASCADE
+);
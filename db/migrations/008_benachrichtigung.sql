@@ -0,0 +1,17 @@
+-- Outbox für Bestätigungs-E-Mails: wird in derselben Transaktion wie die
+-- Buchung bzw. Stornierung geschrieben und von benachrichtigungen.py im
+-- Hintergrund abgearbeitet (status offen -> in_arbeit -> gesendet | fehler).
+CREATE TABLE benachrichtigung (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    art VARCHAR(30) NOT NULL,
+    empfaenger VARCHAR(100) NOT NULL,
+    betreff VARCHAR(250) NOT NULL,
+    inhalt TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'offen',
+    versuche INT NOT NULL DEFAULT 0,
+    naechster_versuch DATETIME NOT NULL,
+    erstellt DATETIME NOT NULL,
+    gesendet DATETIME NULL,
+    letzter_fehler TEXT NULL,
+    INDEX idx_benachrichtigung_faellig (status, naechster_versuch)
+);
@@ -0,0 +1,108 @@
+-- Vollständiges Schema für DB_BACKEND=sqlite: entspricht db/TODOS.sql plus
+-- allen Migrationen in db/migrations/ (bis 008). Wird beim Start von db.py
+-- ausgeführt und ist wiederholbar (IF NOT EXISTS).
+-- Neue Migrationen hier nachziehen.
+--
+-- Unterschiede zu MySQL:
+-- * AUTOINCREMENT, damit gelöschte IDs (z.B. Buchungsnummern) wie bei
+--   AUTO_INCREMENT nicht wiederverwendet werden
+-- * COLLATE NOCASE auf Textspalten wie die _ci-Kollation von MySQL
+-- * DATE/DATETIME/TIME werden als ISO-Text gespeichert, db.py wandelt sie
+--   beim Lesen in date/datetime/timedelta um (wie mysql-connector)
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(250) NOT NULL COLLATE NOCASE,
+    password VARCHAR(500) NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_username ON users (username);
+
+CREATE TABLE IF NOT EXISTS nutzer (
+    nid INTEGER PRIMARY KEY AUTOINCREMENT,
+    vorname VARCHAR(250) COLLATE NOCASE,
+    nachname VARCHAR(250) COLLATE NOCASE,
+    geburtsdatum DATE,
+    email VARCHAR(100) COLLATE NOCASE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_nutzer_email ON nutzer (email);
+
+CREATE TABLE IF NOT EXISTS wartungsarbeiter (
+    wid INTEGER PRIMARY KEY AUTOINCREMENT,
+    vorname VARCHAR(250) COLLATE NOCASE,
+    nachname VARCHAR(250) COLLATE NOCASE,
+    geburtsdatum DATE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_wartungsarbeiter_person ON wartungsarbeiter (vorname, nachname, geburtsdatum);
+
+CREATE TABLE IF NOT EXISTS tennisplatz (
+    tid INTEGER PRIMARY KEY AUTOINCREMENT,
+    tennisanlage VARCHAR(250) COLLATE NOCASE,
+    platznummer INT,
+    belag VARCHAR(50) COLLATE NOCASE,
+    wid INT NOT NULL,
+    datum_der_wartung DATE,
+    FOREIGN KEY (wid) REFERENCES wartungsarbeiter(wid)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tennisplatz_anlage_platz ON tennisplatz (tennisanlage, platznummer);
+CREATE INDEX IF NOT EXISTS idx_tennisplatz_wartung ON tennisplatz (wid, datum_der_wartung);
+
+CREATE TABLE IF NOT EXISTS buchung (
+    buchungsnummer INTEGER PRIMARY KEY AUTOINCREMENT,
+    nid INT NOT NULL,
+    tid INT NOT NULL,
+    spieldatum DATE,
+    spielbeginn TIME,
+    spielende TIME,
+    FOREIGN KEY (nid) REFERENCES nutzer(nid),
+    FOREIGN KEY (tid) REFERENCES tennisplatz(tid)
+);
+CREATE INDEX IF NOT EXISTS idx_buchung_verfuegbarkeit ON buchung (tid, spieldatum, spielbeginn, spielende);
+CREATE INDEX IF NOT EXISTS idx_buchung_nutzer ON buchung (nid, spieldatum);
+CREATE INDEX IF NOT EXISTS idx_buchung_spieldatum ON buchung (spieldatum);
+
+CREATE TABLE IF NOT EXISTS session_store (
+    token VARCHAR(64) PRIMARY KEY,
+    daten TEXT NOT NULL,
+    ablauf DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_store_ablauf ON session_store (ablauf);
+
+CREATE TABLE IF NOT EXISTS buchung_tagesstatistik (
+    tid INT NOT NULL,
+    spieldatum DATE NOT NULL,
+    stunde TINYINT NOT NULL,
+    buchungen INT NOT NULL DEFAULT 0,
+    minuten INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tid, spieldatum, stunde)
+);
+CREATE INDEX IF NOT EXISTS idx_tagesstatistik_datum ON buchung_tagesstatistik (spieldatum);
+
+CREATE TABLE IF NOT EXISTS wartungssperre (
+    sid INTEGER PRIMARY KEY AUTOINCREMENT,
+    tid INT NOT NULL,
+    von DATETIME NOT NULL,
+    bis DATETIME NOT NULL,
+    grund VARCHAR(250),
+    FOREIGN KEY (tid) REFERENCES tennisplatz(tid) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_wartungssperre_bis ON wartungssperre (bis);
+
+CREATE TABLE IF NOT EXISTS benachrichtigung (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    art VARCHAR(30) NOT NULL,
+    empfaenger VARCHAR(100) NOT NULL,
+    betreff VARCHAR(250) NOT NULL,
+    inhalt TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'offen',
+    versuche INT NOT NULL DEFAULT 0,
+    naechster_versuch DATETIME NOT NULL,
+    erstellt DATETIME NOT NULL,
+    gesendet DATETIME NULL,
+    letzter_fehler TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_benachrichtigung_faellig ON benachrichtigung (status, naechster_versuch);
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(50) PRIMARY KEY,
+    angewendet_am DATETIME NOT NULL
+);
@@ -1,11 +1,26 @@
-from flask import Flask, redirect, render_template, request, url_for, jsonify, session
+from flask import Flask, Response, redirect, render_template, request, url_for, jsonify, session
 from dotenv import load_dotenv
 import os
 import git
 import hmac
 import hashlib
-from db import db_read, db_write
-from auth import login_manager, authenticate, register_user
+from db import db_read, db_write, pool_stats, ist_duplikat
+from auth import login_manager, authenticate, register_user, remember_user, forget_user
+import verfuegbarkeit
+import buchungen
+import katalog
+import session_store
+import nachschlagen
+import csv_daten
+import listen
+import buchungsliste
+import statistik
+import wartung
+import sperren
+import benachrichtigungen
+import pdf
+import abfrageprofil
+import metriken
 from flask_login import login_user, logout_user, login_required, current_user
 import logging
 
@@ -27,6 +42,16 @@ app.secret_key = "supersecret"
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+# Abfragen pro Request zählen (Server-Timing, Warnungen bei N+1)
+abfrageprofil.init_app(app)
+
+# Request-, DB-, Pool- und Cache-Metriken für /metrics (alle Worker zusammen)
+metriken.init_app(app)
+
+# Bestätigungs-E-Mails: nur mit BENACHRICHTIGUNG_WORKER=thread im Web-Prozess senden,
+# sonst übernimmt das `python benachrichtigungen.py`
+benachrichtigungen.starte_worker()
+
 # DON'T CHANGE
 def is_valid_signature(x_hub_signature, data, private_key):
     hash_algorithm, github_signature = x_hub_signature.split('=', 1)
@@ -59,6 +84,7 @@ def login():
 
         if user:
             login_user(user)
+            remember_user(user)
             return redirect(url_for("index"))
 
         error = "Benutzername oder Passwort ist falsch."
@@ -104,6 +130,7 @@ def register():
 @login_required
 def logout():
     logout_user()
+    forget_user()
     return redirect(url_for("login"))
 
 @app.route("/")
@@ -119,13 +146,11 @@ def buchen():
     fehler = None
     form_data = {}  # Speichert Formulardaten bei Fehler
 
-    # Alle Plätze aus DB holen
+    # Alle Plätze und Tennisanlagen aus dem Katalog-Cache holen
     try:
-        alle_plaetze = db_read("SELECT * FROM tennisplatz ORDER BY tennisanlage, platznummer")
-        if not alle_plaetze:
-            alle_plaetze = []
-        # Alle Tennisanlagen extrahieren (ohne Duplikate)
-        anlagen = sorted(list(set([p["tennisanlage"] for p in alle_plaetze])))
+        platz_katalog = katalog.get_katalog()
+        alle_plaetze = platz_katalog["plaetze"]
+        anlagen = platz_katalog["anlagen"]
     except Exception as e:
         logging.error(f"Fehler beim Laden der Tennisplätze: {e}")
         alle_plaetze = []
@@ -225,26 +250,31 @@ def buchen():
                         form_data=form_data
                     )
             
-            # Prüfen ob Email bereits existiert (anderer Nutzer mit gleicher Email)
-            bestehender_nutzer = db_read("SELECT * FROM nutzer WHERE email=%s", (email,), single=True)
-            if bestehender_nutzer:
-                # Email existiert bereits - Nutzer hat seine NID vergessen
-                nutzer = bestehender_nutzer
-            else:
-                # Neuen Nutzer erstellen
-                # Leeres Geburtsdatum auf None setzen
-                if not geburtsdatum:
-                    geburtsdatum = None
-                
-                # Nutzer in DB speichern
-                try:
-                    db_write(
-                        "INSERT INTO nutzer (vorname, nachname, geburtsdatum, email) VALUES (%s,%s,%s,%s)",
-                        (vorname, nachname, geburtsdatum, email)
-                    )
-                    # Neu erstellten Nutzer abrufen
+            # Neuen Nutzer erstellen
+            # Leeres Geburtsdatum auf None setzen
+            if not geburtsdatum:
+                geburtsdatum = None
+
+            # Nutzer in DB speichern, die E-Mail ist eindeutig (uq_nutzer_email)
+            try:
+                neue_nid = db_write(
+                    "INSERT INTO nutzer (vorname, nachname, geburtsdatum, email) VALUES (%s,%s,%s,%s)",
+                    (vorname, nachname, geburtsdatum, email)
+                )
+                # Evtl. als "existiert nicht" gemerkt, z.B. nach einer Eingabe im Formular
+                nachschlagen.invalidiere("nutzer", neue_nid)
+                nutzer = {
+                    "nid": neue_nid,
+                    "vorname": vorname,
+                    "nachname": nachname,
+                    "geburtsdatum": geburtsdatum,
+                    "email": email
+                }
+            except Exception as e:
+                if ist_duplikat(e):
+                    # Email existiert bereits - Nutzer hat seine NID vergessen
                     nutzer = db_read("SELECT * FROM nutzer WHERE email=%s", (email,), single=True)
-                except Exception as e:
+                else:
                     logging.error(f"Fehler beim Erstellen des Nutzers: {e}")
                     fehler = "Fehler beim Erstellen des Nutzers."
                     return render_template(
@@ -384,11 +414,7 @@ def buchen():
                 )
 
             # Tennisplatz aus DB suchen
-            platz = db_read(
-                "SELECT * FROM tennisplatz WHERE tennisanlage=%s AND platznummer=%s",
-                (tennisanlage, platznummer),
-                single=True
-            )
+            platz = katalog.finde_platz(tennisanlage, platznummer)
 
             if not platz:
                 fehler = f"Tennisplatz '{tennisanlage}' mit Platznummer {platznummer} existiert nicht in der Datenbank!"
@@ -401,24 +427,12 @@ def buchen():
                     form_data=form_data
                 )
 
-            # Prüfen ob der Platz zur gewählten Zeit bereits gebucht ist
-            # Zwei Zeiträume überschneiden sich, wenn: Start1 < Ende2 UND Start2 < Ende1
-            konflikt = db_read(
-                """SELECT * FROM buchung 
-                   WHERE tid = %s 
-                   AND spieldatum = %s 
-                   AND NOT (spielende <= %s OR spielbeginn >= %s)""",
-                (platz["tid"], spieldatum, beginn, ende),
-                single=True
-            )
-
-            if konflikt:
-                # Prüfen ob es der gleiche Nutzer ist
-                if konflikt["nid"] == nutzer["nid"]:
-                    fehler = "Sie haben für diesen Platz am gewählten Datum bereits eine Buchung."
-                else:
-                    fehler = "Dieser Platz ist zum gewählten Zeitpunkt nicht mehr verfügbar. Bitte wählen Sie einen anderen Zeitraum."
-                # Zeitfelder löschen bei Konflikt
+            # Wartungssperren prüfen (Kalender im Speicher, keine Abfrage pro Buchung)
+            sperre = sperren.sperre_fuer(platz["tid"], spieldatum, beginn_time, ende_time)
+            if sperre:
+                fehler = f"Der Platz ist vom {sperre['von']:%d.%m.%Y %H:%M} bis {sperre['bis']:%d.%m.%Y %H:%M} wegen Wartung gesperrt."
+                if sperre["grund"]:
+                    fehler += f" ({sperre['grund']})"
                 form_data['beginn'] = ''
                 form_data['ende'] = ''
                 return render_template(
@@ -430,37 +444,19 @@ def buchen():
                     form_data=form_data
                 )
 
-            # Buchung speichern
+            # Platz sperren, auf Überschneidungen prüfen und speichern in einer Transaktion;
+            # ist der Platz schon gebucht, liefert buche() die Buchung, die im Weg ist
+            empfaenger = {
+                "vorname": nutzer["vorname"],
+                "nachname": nutzer["nachname"],
+                "email": nutzer.get("email"),
+                "tennisanlage": platz["tennisanlage"],
+                "platznummer": platz["platznummer"],
+            }
             try:
-                db_write(
-                    "INSERT INTO buchung (nid, tid, spieldatum, spielbeginn, spielende) VALUES (%s,%s,%s,%s,%s)",
-                    (nutzer["nid"], platz["tid"], spieldatum, beginn, ende)
-                )
-                
-                # Buchungsnummer abrufen
-                letzte_buchung = db_read(
-                    "SELECT buchungsnummer FROM buchung WHERE nid=%s ORDER BY buchungsnummer DESC LIMIT 1",
-                    (nutzer["nid"],),
-                    single=True
+                buchungsnummer, konflikt = buchungen.buche(
+                    nutzer["nid"], platz["tid"], spieldatum, beginn, ende, empfaenger
                 )
-                
-                # Daten DIREKT speichern ohne Formatierung
-                session['buchungs_nr'] = letzte_buchung['buchungsnummer']
-                session['nutzer_nid'] = nutzer["nid"]
-                session['nutzer_vorname'] = nutzer["vorname"]
-                session['nutzer_nachname'] = nutzer["nachname"]
-                session['nutzer_email'] = nutzer.get("email", "")
-                session['nutzer_geburtsdatum'] = str(nutzer.get("geburtsdatum", "")) if nutzer.get("geburtsdatum") else ""
-                session['buchung_anlage'] = tennisanlage
-                session['buchung_platz'] = platznummer
-                session['buchung_datum'] = spieldatum  # Format: YYYY-MM-DD
-                session['buchung_beginn'] = beginn  # Format: HH:MM
-                session['buchung_ende'] = ende  # Format: HH:MM
-                
-                from datetime import datetime
-                session['buchung_zeitpunkt'] = datetime.now().strftime("%d.%m.%Y um %H:%M Uhr")
-                
-                return redirect(url_for("bbestätigt"))
             except Exception as e:
                 logging.error(f"Fehler beim Speichern der Buchung: {e}")
                 fehler = "Fehler beim Speichern der Buchung."
@@ -473,6 +469,42 @@ def buchen():
                     form_data=form_data
                 )
 
+            if konflikt:
+                # Prüfen ob es der gleiche Nutzer ist
+                if konflikt["nid"] == nutzer["nid"]:
+                    fehler = "Sie haben für diesen Platz am gewählten Datum bereits eine Buchung."
+                else:
+                    fehler = "Dieser Platz ist zum gewählten Zeitpunkt nicht mehr verfügbar. Bitte wählen Sie einen anderen Zeitraum."
+                # Zeitfelder löschen bei Konflikt
+                form_data['beginn'] = ''
+                form_data['ende'] = ''
+                return render_template(
+                    "buchen.html",
+                    nutzer=nutzer,
+                    fehler=fehler,
+                    anlagen=anlagen,
+                    alle_plaetze=alle_plaetze,
+                    form_data=form_data
+                )
+
+            # Bestätigungsdaten serverseitig speichern, in der Session nur das Token
+            session['buchung_token'] = session_store.speichern({
+                'buchungsnummer': buchungsnummer,
+                'nid': nutzer["nid"],
+                'vorname': nutzer["vorname"],
+                'nachname': nutzer["nachname"],
+                'email': nutzer.get("email", ""),
+                'geburtsdatum': str(nutzer.get("geburtsdatum", "")) if nutzer.get("geburtsdatum") else "",
+                'anlage': tennisanlage,
+                'platz': platznummer,
+                'datum': spieldatum,  # Format: YYYY-MM-DD
+                'beginn': beginn,  # Format: HH:MM
+                'ende': ende,  # Format: HH:MM
+                'zeitpunkt': datetime.now().strftime("%d.%m.%Y um %H:%M Uhr")
+            })
+
+            return redirect(url_for("bbestätigt"))
+
     return render_template(
         "buchen.html",
         nutzer=nutzer,
@@ -486,19 +518,20 @@ def buchen():
 @app.route("/bbestätigt")
 @login_required
 def bbestätigt():
-    # Daten aus Session holen
-    buchungsnummer = session.get('buchungs_nr', '')
-    nid = session.get('nutzer_nid', '')
-    vorname = session.get('nutzer_vorname', '')
-    nachname = session.get('nutzer_nachname', '')
-    email = session.get('nutzer_email', '')
-    geburtsdatum_raw = session.get('nutzer_geburtsdatum', '')
-    tennisanlage = session.get('buchung_anlage', '')
-    platznummer = session.get('buchung_platz', '')
-    spieldatum_raw = session.get('buchung_datum', '')
-    spielbeginn = session.get('buchung_beginn', '')
-    spielende = session.get('buchung_ende', '')
-    buchungszeitpunkt = session.get('buchung_zeitpunkt', '')
+    # Daten über das Token aus dem Session-Store holen
+    daten = session_store.laden(session.get('buchung_token')) or {}
+    buchungsnummer = daten.get('buchungsnummer', '')
+    nid = daten.get('nid', '')
+    vorname = daten.get('vorname', '')
+    nachname = daten.get('nachname', '')
+    email = daten.get('email', '')
+    geburtsdatum_raw = daten.get('geburtsdatum', '')
+    tennisanlage = daten.get('anlage', '')
+    platznummer = daten.get('platz', '')
+    spieldatum_raw = daten.get('datum', '')
+    spielbeginn = daten.get('beginn', '')
+    spielende = daten.get('ende', '')
+    buchungszeitpunkt = daten.get('zeitpunkt', '')
 
     if not buchungsnummer:
         return redirect(url_for("buchen"))
@@ -537,33 +570,133 @@ def bbestätigt():
 @login_required
 def get_nutzer(nid):
     try:
-        user = db_read("SELECT * FROM nutzer WHERE nid=%s", (nid,), single=True)
-        if not user:
-            return jsonify({"exists": False})
-        return jsonify({
-            "exists": True,
-            "vorname": user["vorname"] or "",
-            "nachname": user["nachname"] or "",
-            "geburtsdatum": str(user["geburtsdatum"]) if user.get("geburtsdatum") else "",
-            "email": user["email"] or ""
-        })
+        return jsonify(nachschlagen.lade("nutzer", [nid])[nid])
     except Exception as e:
         logging.error(f"Fehler bei get_nutzer: {e}")
         return jsonify({"exists": False, "error": str(e)})
 
 
+# Belegung aller Plätze einer Anlage in 30-Minuten-Slots über einen Datumsbereich
+@app.route("/api/verfuegbarkeit")
+@login_required
+def api_verfuegbarkeit():
+    from datetime import date
+    anlage = request.args.get("anlage", "").strip()
+    try:
+        von = date.fromisoformat(request.args.get("von") or date.today().isoformat())
+        bis = date.fromisoformat(request.args.get("bis") or von.isoformat())
+    except ValueError:
+        return jsonify({"error": "Ungültiges Datum, erwartet wird YYYY-MM-DD."}), 400
+    if bis < von or (bis - von).days >= verfuegbarkeit.MAX_TAGE:
+        return jsonify({"error": f"Der Zeitraum muss zwischen 1 und {verfuegbarkeit.MAX_TAGE} Tagen liegen."}), 400
+
+    try:
+        plaetze = [p for p in katalog.get_katalog()["plaetze"] if p["tennisanlage"] == anlage]
+        if not plaetze:
+            return jsonify({"error": f"Tennisanlage '{anlage}' existiert nicht."}), 404
+        belegung = verfuegbarkeit.belegung_bereich([p["tid"] for p in plaetze], von, bis)
+    except Exception as e:
+        logging.error(f"Fehler bei api_verfuegbarkeit: {e}")
+        return jsonify({"error": "Fehler beim Laden der Verfügbarkeit."}), 500
+
+    # Pro Platz und Tag ein Text mit einem Zeichen pro Slot: 0 = frei, 1 = belegt oder gesperrt
+    tage = sorted({tag for _, tag in belegung})
+    response = jsonify({
+        "anlage": anlage,
+        "von": von.isoformat(),
+        "bis": bis.isoformat(),
+        "slot_minuten": verfuegbarkeit.SLOT_MINUTEN,
+        "slots": verfuegbarkeit.slot_zeiten(),
+        "plaetze": [
+            {
+                "tid": p["tid"],
+                "platznummer": p["platznummer"],
+                "belag": p["belag"] or "",
+                "belegung": {
+                    # Wartungssperren zählen wie belegte Slots
+                    tag: verfuegbarkeit.maske_als_text(belegung[(p["tid"], tag)] | sperren.maske(p["tid"], tag))
+                    for tag in tage
+                }
+            }
+            for p in plaetze
+        ]
+    })
+    # ETag aus dem Inhalt: unveränderte Belegung wird mit 304 beantwortet
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+# Serienbuchung: gleicher Platz, Wochentag und Zeit über einen Datumsbereich
+# JSON: {"nid", "tennisanlage", "platznummer", "wochentag" (0-6 oder "mo".."so"),
+#        "beginn", "ende", "von", "bis"}
+@app.route("/api/buchungen/serie", methods=["POST"])
+@login_required
+def api_buchungen_serie():
+    from datetime import date
+    daten = request.get_json(silent=True) or {}
+
+    try:
+        nid = int(daten.get("nid"))
+        platznummer = int(daten.get("platznummer"))
+        wochentag = daten.get("wochentag")
+        if isinstance(wochentag, str) and not wochentag.isdigit():
+            wochentag = buchungen.WOCHENTAGE.index(wochentag.strip().lower()[:2])
+        wochentag = int(wochentag)
+        if not 0 <= wochentag <= 6:
+            raise ValueError
+        von = date.fromisoformat(daten.get("von", ""))
+        bis = date.fromisoformat(daten.get("bis", ""))
+        beginn = daten.get("beginn", "")
+        ende = daten.get("ende", "")
+        zeit_fehler = buchungen.pruefe_zeitfenster(beginn, ende)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültige Angaben. Erwartet: nid, tennisanlage, platznummer, wochentag, beginn, ende, von, bis."}), 400
+
+    if zeit_fehler:
+        return jsonify({"error": zeit_fehler}), 400
+    if bis < von or (bis - von).days >= buchungen.SERIE_MAX_TAGE:
+        return jsonify({"error": f"Der Zeitraum muss zwischen 1 und {buchungen.SERIE_MAX_TAGE} Tagen liegen."}), 400
+
+    tennisanlage = (daten.get("tennisanlage") or "").strip()
+    platz = katalog.finde_platz(tennisanlage, platznummer)
+    if not platz:
+        return jsonify({"error": f"Tennisplatz '{tennisanlage}' mit Platznummer {platznummer} existiert nicht."}), 404
+    nutzer = db_read("SELECT nid FROM nutzer WHERE nid=%s", (nid,), single=True)
+    if not nutzer:
+        return jsonify({"error": f"Nutzer mit ID {nid} existiert nicht."}), 404
+
+    # Vergangene Termine werden nicht gebucht, aber im Bericht aufgeführt
+    heute = date.today()
+    termine = buchungen.serien_termine(wochentag, von, bis)
+    bericht = {t.isoformat(): {"status": "vergangen"} for t in termine if t <= heute}
+    try:
+        bericht.update(buchungen.buche_serie(nid, platz["tid"], [t for t in termine if t > heute], beginn, ende))
+    except Exception as e:
+        logging.error(f"Fehler bei der Serienbuchung: {e}")
+        return jsonify({"error": "Fehler beim Speichern der Serienbuchung."}), 500
+
+    ergebnis = [dict(datum=datum, **bericht[datum]) for datum in sorted(bericht)]
+    return jsonify({
+        "tid": platz["tid"],
+        "gebucht": sum(1 for e in ergebnis if e["status"] == "gebucht"),
+        "konflikte": sum(1 for e in ergebnis if e["status"] == "konflikt"),
+        "gesperrt": sum(1 for e in ergebnis if e["status"] == "gesperrt"),
+        "termine": ergebnis
+    })
+
+
 @app.route("/stornieren", methods=["GET", "POST"])
 @login_required
 def stornieren():
     fehler = None
     form_data = {}
 
-    # Alle Plätze aus DB holen
+    # Alle Plätze und Tennisanlagen aus dem Katalog-Cache holen
     try:
-        alle_plaetze = db_read("SELECT * FROM tennisplatz ORDER BY tennisanlage, platznummer")
-        if not alle_plaetze:
-            alle_plaetze = []
-        anlagen = sorted(list(set([p["tennisanlage"] for p in alle_plaetze])))
+        platz_katalog = katalog.get_katalog()
+        alle_plaetze = platz_katalog["plaetze"]
+        anlagen = platz_katalog["anlagen"]
     except Exception as e:
         logging.error(f"Fehler beim Laden der Tennisplätze: {e}")
         alle_plaetze = []
@@ -587,13 +720,14 @@ def stornieren():
 
         buchungsnummer = form_data['buchungsnummer'].strip()
         nid = form_data['nid'].strip()
-        
+        email = form_data['email'].strip()
+
+        # Suchen, sperren und löschen passiert in buchungen.storniere_*() in einer Transaktion
         buchung = None
+        storno_fehler = None
 
         # Fall 1: Suche über Buchungsnummer + E-Mail
         if buchungsnummer:
-            email = form_data['email'].strip()
-            
             # E-Mail Validierung
             if not email:
                 fehler = "Bitte geben Sie Ihre E-Mail-Adresse zur Bestätigung ein."
@@ -604,106 +738,12 @@ def stornieren():
                     alle_plaetze=alle_plaetze,
                     form_data=form_data
                 )
-            
-            try:
-                buchung = db_read(
-                    """SELECT b.*, n.vorname, n.nachname, n.email, t.tennisanlage, t.platznummer
-                       FROM buchung b
-                       JOIN nutzer n ON b.nid = n.nid
-                       JOIN tennisplatz t ON b.tid = t.tid
-                       WHERE b.buchungsnummer = %s AND n.email = %s""",
-                    (buchungsnummer, email),
-                    single=True
-                )
-                
-                if not buchung:
-                    fehler = "Buchung mit dieser Buchungsnummer und E-Mail-Adresse wurde nicht gefunden. Bitte überprüfen Sie Ihre Angaben."
-                    form_data['buchungsnummer'] = ''
-                    form_data['email'] = ''
-                    return render_template(
-                        "stornieren.html",
-                        fehler=fehler,
-                        anlagen=anlagen,
-                        alle_plaetze=alle_plaetze,
-                        form_data=form_data
-                    )
-            except Exception as e:
-                logging.error(f"Fehler bei Buchungssuche: {e}")
-                fehler = "Fehler bei der Suche nach der Buchung."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
 
-        # Fall 2: Suche über NID + E-Mail + Buchungsdetails
-        elif nid:
-            email = form_data['email'].strip()
-            
-            # E-Mail Validierung
-            if not email:
-                fehler = "Bitte geben Sie Ihre E-Mail-Adresse zur Bestätigung ein."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
-            
-            # Nutzer über NID + Email finden
             try:
-                nutzer = db_read(
-                    "SELECT * FROM nutzer WHERE nid=%s AND email=%s",
-                    (nid, email),
-                    single=True
-                )
-                
-                if not nutzer:
-                    fehler = "Kein Nutzer mit dieser Nutzer-ID und E-Mail-Adresse gefunden."
-                    form_data['nid'] = ''
-                    form_data['email'] = ''
-                    return render_template(
-                        "stornieren.html",
-                        fehler=fehler,
-                        anlagen=anlagen,
-                        alle_plaetze=alle_plaetze,
-                        form_data=form_data
-                    )
+                buchung, storno_fehler = buchungen.storniere_nach_buchungsnummer(buchungsnummer, email)
             except Exception as e:
-                logging.error(f"Fehler bei Nutzersuche: {e}")
-                fehler = "Fehler bei der Suche nach dem Nutzer."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
-
-            # Buchungsdetails validieren
-            tennisanlage = form_data['tennisanlage'].strip()
-            platznummer = form_data['platznummer'].strip()
-            spieldatum = form_data['spieldatum']
-            beginn = form_data['beginn']
-
-            if not tennisanlage or not platznummer or not spieldatum or not beginn:
-                fehler = "Bitte alle Buchungsdetails ausfüllen."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
-
-            # Tennisplatz finden
-            try:
-                platznummer_int = int(platznummer)
-            except ValueError:
-                fehler = "Ungültige Platznummer."
+                logging.error(f"Fehler beim Stornieren der Buchung: {e}")
+                fehler = "Fehler beim Stornieren der Buchung."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -712,14 +752,10 @@ def stornieren():
                     form_data=form_data
                 )
 
-            platz = db_read(
-                "SELECT * FROM tennisplatz WHERE tennisanlage=%s AND platznummer=%s",
-                (tennisanlage, platznummer_int),
-                single=True
-            )
-
-            if not platz:
-                fehler = f"Tennisplatz '{tennisanlage}' mit Platznummer {platznummer_int} existiert nicht."
+            if not buchung:
+                fehler = "Buchung mit dieser Buchungsnummer und E-Mail-Adresse wurde nicht gefunden. Bitte überprüfen Sie Ihre Angaben."
+                form_data['buchungsnummer'] = ''
+                form_data['email'] = ''
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -728,51 +764,18 @@ def stornieren():
                     form_data=form_data
                 )
 
-            # Buchung finden
-            try:
-                buchung = db_read(
-                    """SELECT b.*, n.vorname, n.nachname, n.email, t.tennisanlage, t.platznummer
-                       FROM buchung b
-                       JOIN nutzer n ON b.nid = n.nid
-                       JOIN tennisplatz t ON b.tid = t.tid
-                       WHERE b.nid = %s AND b.tid = %s AND b.spieldatum = %s AND b.spielbeginn = %s""",
-                    (nutzer["nid"], platz["tid"], spieldatum, beginn),
-                    single=True
-                )
-
-                if not buchung:
-                    fehler = "Keine Buchung mit diesen Angaben gefunden."
-                    return render_template(
-                        "stornieren.html",
-                        fehler=fehler,
-                        anlagen=anlagen,
-                        alle_plaetze=alle_plaetze,
-                        form_data=form_data
-                    )
-            except Exception as e:
-                logging.error(f"Fehler bei Buchungssuche: {e}")
-                fehler = "Fehler bei der Suche nach der Buchung."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
-
-        # Fall 3: Suche über Personalien + Buchungsdetails
+        # Fall 2 und 3: Suche über NID oder Personalien + E-Mail + Buchungsdetails
         else:
             vorname = form_data['vorname'].strip()
             nachname = form_data['nachname'].strip()
-            email = form_data['email'].strip()
             tennisanlage = form_data['tennisanlage'].strip()
             platznummer = form_data['platznummer'].strip()
             spieldatum = form_data['spieldatum']
             beginn = form_data['beginn']
 
-            # Validierung: Alle Felder müssen ausgefüllt sein
-            if not vorname or not nachname or not email:
-                fehler = "Bitte geben Sie Vorname, Nachname und E-Mail-Adresse ein."
+            # Validierung der Personalien
+            if nid and not email:
+                fehler = "Bitte geben Sie Ihre E-Mail-Adresse zur Bestätigung ein."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -781,9 +784,8 @@ def stornieren():
                     form_data=form_data
                 )
 
-            # Validierung der Buchungsdetails
-            if not tennisanlage or not platznummer or not spieldatum or not beginn:
-                fehler = "Bitte alle Buchungsdetails ausfüllen."
+            if not nid and (not vorname or not nachname or not email):
+                fehler = "Bitte geben Sie Vorname, Nachname und E-Mail-Adresse ein."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -792,15 +794,9 @@ def stornieren():
                     form_data=form_data
                 )
 
-            # Nutzer über Name und Email finden
-            nutzer = db_read(
-                "SELECT * FROM nutzer WHERE vorname=%s AND nachname=%s AND email=%s",
-                (vorname, nachname, email),
-                single=True
-            )
-            
-            if not nutzer:
-                fehler = "Kein Nutzer mit diesen Personalien gefunden."
+            # Validierung der Buchungsdetails
+            if not tennisanlage or not platznummer or not spieldatum or not beginn:
+                fehler = "Bitte alle Buchungsdetails ausfüllen."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -809,7 +805,7 @@ def stornieren():
                     form_data=form_data
                 )
 
-            # Tennisplatz finden
+            # Tennisplatz finden (aus dem Katalog-Cache)
             try:
                 platznummer_int = int(platznummer)
             except ValueError:
@@ -822,11 +818,7 @@ def stornieren():
                     form_data=form_data
                 )
 
-            platz = db_read(
-                "SELECT * FROM tennisplatz WHERE tennisanlage=%s AND platznummer=%s",
-                (tennisanlage, platznummer_int),
-                single=True
-            )
+            platz = katalog.finde_platz(tennisanlage, platznummer_int)
 
             if not platz:
                 fehler = f"Tennisplatz '{tennisanlage}' mit Platznummer {platznummer_int} existiert nicht."
@@ -838,30 +830,18 @@ def stornieren():
                     form_data=form_data
                 )
 
-            # Buchung finden
             try:
-                buchung = db_read(
-                    """SELECT b.*, n.vorname, n.nachname, n.email, t.tennisanlage, t.platznummer
-                       FROM buchung b
-                       JOIN nutzer n ON b.nid = n.nid
-                       JOIN tennisplatz t ON b.tid = t.tid
-                       WHERE b.nid = %s AND b.tid = %s AND b.spieldatum = %s AND b.spielbeginn = %s""",
-                    (nutzer["nid"], platz["tid"], spieldatum, beginn),
-                    single=True
-                )
-
-                if not buchung:
-                    fehler = "Keine Buchung mit diesen Angaben gefunden."
-                    return render_template(
-                        "stornieren.html",
-                        fehler=fehler,
-                        anlagen=anlagen,
-                        alle_plaetze=alle_plaetze,
-                        form_data=form_data
+                if nid:
+                    buchung, storno_fehler = buchungen.storniere_nach_nid(
+                        nid, email, platz["tid"], spieldatum, beginn
+                    )
+                else:
+                    buchung, storno_fehler = buchungen.storniere_nach_personalien(
+                        vorname, nachname, email, platz["tid"], spieldatum, beginn
                     )
             except Exception as e:
-                logging.error(f"Fehler bei Buchungssuche: {e}")
-                fehler = "Fehler bei der Suche nach der Buchung."
+                logging.error(f"Fehler beim Stornieren der Buchung: {e}")
+                fehler = "Fehler beim Stornieren der Buchung."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -870,20 +850,24 @@ def stornieren():
                     form_data=form_data
                 )
 
-        # Buchung gefunden - Stornierung durchführen
-        if buchung:
-            # Prüfen ob Buchung in der Vergangenheit liegt
-            from datetime import date, datetime
-            heute = date.today()
-            jetzt = datetime.now()
-            
-            spieldatum_date = buchung['spieldatum']
-            if isinstance(spieldatum_date, str):
-                spieldatum_date = date.fromisoformat(spieldatum_date)
-            
-            # Wenn Spieldatum in der Vergangenheit liegt
-            if spieldatum_date < heute:
-                fehler = "Diese Buchung liegt in der Vergangenheit und kann nicht mehr storniert werden."
+            if not buchung:
+                # Nur im Fehlerfall nachsehen, ob schon der Nutzer nicht stimmt
+                if nid:
+                    nutzer = db_read("SELECT nid FROM nutzer WHERE nid=%s AND email=%s", (nid, email), single=True)
+                else:
+                    nutzer = db_read(
+                        "SELECT nid FROM nutzer WHERE vorname=%s AND nachname=%s AND email=%s",
+                        (vorname, nachname, email),
+                        single=True
+                    )
+                if not nutzer and nid:
+                    fehler = "Kein Nutzer mit dieser Nutzer-ID und E-Mail-Adresse gefunden."
+                    form_data['nid'] = ''
+                    form_data['email'] = ''
+                elif not nutzer:
+                    fehler = "Kein Nutzer mit diesen Personalien gefunden."
+                else:
+                    fehler = "Keine Buchung mit diesen Angaben gefunden."
                 return render_template(
                     "stornieren.html",
                     fehler=fehler,
@@ -891,57 +875,35 @@ def stornieren():
                     alle_plaetze=alle_plaetze,
                     form_data=form_data
                 )
-            
-            # Wenn Spieldatum heute ist, prüfen ob Spielbeginn schon vorbei ist
-            if spieldatum_date == heute:
-                from datetime import time
-                spielbeginn_time = buchung['spielbeginn']
-                if isinstance(spielbeginn_time, str):
-                    spielbeginn_time = time.fromisoformat(spielbeginn_time)
-                
-                aktuelle_zeit = jetzt.time()
-                if spielbeginn_time <= aktuelle_zeit:
-                    fehler = "Der Spielbeginn liegt in der Vergangenheit. Diese Buchung kann nicht mehr storniert werden."
-                    return render_template(
-                        "stornieren.html",
-                        fehler=fehler,
-                        anlagen=anlagen,
-                        alle_plaetze=alle_plaetze,
-                        form_data=form_data
-                    )
 
-            # Buchung löschen
-            try:
-                db_write(
-                    "DELETE FROM buchung WHERE buchungsnummer = %s",
-                    (buchung['buchungsnummer'],)
-                )
+        # Buchung gefunden, aber Spielbeginn schon vorbei
+        if storno_fehler:
+            fehler = storno_fehler
+            return render_template(
+                "stornieren.html",
+                fehler=fehler,
+                anlagen=anlagen,
+                alle_plaetze=alle_plaetze,
+                form_data=form_data
+            )
 
-                # Daten für Bestätigungsseite in Session speichern
-                session['stornierung_buchungsnummer'] = buchung['buchungsnummer']
-                session['stornierung_nid'] = buchung['nid']
-                session['stornierung_vorname'] = buchung['vorname']
-                session['stornierung_nachname'] = buchung['nachname']
-                session['stornierung_email'] = buchung['email']
-                session['stornierung_tennisanlage'] = buchung['tennisanlage']
-                session['stornierung_platznummer'] = buchung['platznummer']
-                session['stornierung_spieldatum'] = str(buchung['spieldatum'])
-                session['stornierung_spielbeginn'] = str(buchung['spielbeginn'])
-                session['stornierung_spielende'] = str(buchung['spielende'])
-                session['stornierung_zeitpunkt'] = datetime.now().strftime("%d.%m.%Y um %H:%M Uhr")
-
-                return redirect(url_for("sbestätigt"))
+        # Daten für Bestätigungsseite serverseitig speichern, in der Session nur das Token
+        from datetime import datetime
+        session['stornierung_token'] = session_store.speichern({
+            'buchungsnummer': buchung['buchungsnummer'],
+            'nid': buchung['nid'],
+            'vorname': buchung['vorname'],
+            'nachname': buchung['nachname'],
+            'email': buchung['email'],
+            'tennisanlage': buchung['tennisanlage'],
+            'platznummer': buchung['platznummer'],
+            'spieldatum': str(buchung['spieldatum']),
+            'spielbeginn': str(buchung['spielbeginn']),
+            'spielende': str(buchung['spielende']),
+            'zeitpunkt': datetime.now().strftime("%d.%m.%Y um %H:%M Uhr")
+        })
 
-            except Exception as e:
-                logging.error(f"Fehler beim Stornieren der Buchung: {e}")
-                fehler = "Fehler beim Stornieren der Buchung."
-                return render_template(
-                    "stornieren.html",
-                    fehler=fehler,
-                    anlagen=anlagen,
-                    alle_plaetze=alle_plaetze,
-                    form_data=form_data
-                )
+        return redirect(url_for("sbestätigt"))
 
     return render_template(
         "stornieren.html",
@@ -955,18 +917,19 @@ def stornieren():
 @app.route("/sbestätigt")
 @login_required
 def sbestätigt():
-    # Daten aus Session holen
-    buchungsnummer = session.get('stornierung_buchungsnummer', '')
-    nid = session.get('stornierung_nid', '')
-    vorname = session.get('stornierung_vorname', '')
-    nachname = session.get('stornierung_nachname', '')
-    email = session.get('stornierung_email', '')
-    tennisanlage = session.get('stornierung_tennisanlage', '')
-    platznummer = session.get('stornierung_platznummer', '')
-    spieldatum_raw = session.get('stornierung_spieldatum', '')
-    spielbeginn = session.get('stornierung_spielbeginn', '')
-    spielende = session.get('stornierung_spielende', '')
-    stornierungszeitpunkt = session.get('stornierung_zeitpunkt', '')
+    # Daten über das Token aus dem Session-Store holen
+    daten = session_store.laden(session.get('stornierung_token')) or {}
+    buchungsnummer = daten.get('buchungsnummer', '')
+    nid = daten.get('nid', '')
+    vorname = daten.get('vorname', '')
+    nachname = daten.get('nachname', '')
+    email = daten.get('email', '')
+    tennisanlage = daten.get('tennisanlage', '')
+    platznummer = daten.get('platznummer', '')
+    spieldatum_raw = daten.get('spieldatum', '')
+    spielbeginn = daten.get('spielbeginn', '')
+    spielende = daten.get('spielende', '')
+    stornierungszeitpunkt = daten.get('zeitpunkt', '')
 
     if not buchungsnummer:
         return redirect(url_for("stornieren"))
@@ -992,28 +955,79 @@ def sbestätigt():
         stornierungszeitpunkt=stornierungszeitpunkt
     )
 
+# Bestätigungen als PDF (serverseitig erzeugt)
+@app.route("/buchung/<int:buchungsnummer>/pdf")
+@login_required
+def buchung_pdf(buchungsnummer):
+    try:
+        buchung = db_read(
+            """SELECT b.buchungsnummer, b.nid, n.vorname, n.nachname, n.email, n.geburtsdatum,
+                      t.tennisanlage, t.platznummer, b.spieldatum, b.spielbeginn, b.spielende
+               FROM buchung b
+               JOIN nutzer n ON b.nid = n.nid
+               JOIN tennisplatz t ON b.tid = t.tid
+               WHERE b.buchungsnummer = %s""",
+            (buchungsnummer,),
+            single=True
+        )
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Buchung für das PDF: {e}")
+        return "Fehler beim Laden der Buchung.", 500
+    if not buchung:
+        return f"Buchung {buchungsnummer} existiert nicht (mehr).", 404
+
+    # Zeitpunkt der Buchung wie auf der Bestätigungsseite (nur direkt nach dem Buchen bekannt)
+    bestaetigung = session_store.laden(session.get('buchung_token')) or {}
+    buchung["zeitpunkt"] = bestaetigung.get('zeitpunkt') if bestaetigung.get('buchungsnummer') == buchungsnummer else None
+    
+    # Unverändertes PDF nicht neu erzeugen oder senden (starkes ETag aus der Version)
+    etag = f"{buchungsnummer}-{pdf.version(buchung)}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        daten, _ = pdf.buchungsbestaetigung(buchung)
+        response = Response(daten, mimetype="application/pdf")
+        response.headers["Content-Disposition"] = f"inline; filename=Buchungsbestaetigung_{buchungsnummer}.pdf"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route("/stornierung/pdf")
+@login_required
+def stornierung_pdf():
+    daten = session_store.laden(session.get('stornierung_token'))
+    if not daten:
+        return redirect(url_for("stornieren"))
+    response = Response(pdf.stornierungsbestaetigung(daten, daten.get('zeitpunkt')), mimetype="application/pdf")
+    response.headers["Content-Disposition"] = f"inline; filename=Stornierungsbestaetigung_{daten['buchungsnummer']}.pdf"
+    response.headers["Cache-Control"] = "private, no-store"
+    return response
+
+
 @app.route("/verwaltung")
 @login_required
 def verwaltung():
     return render_template("verwaltung.html")
 
+# Pool-Metriken (in_use, idle, Wartezeiten, Erschöpfungen) als JSON
+@app.route("/api/pool")
+@login_required
+def api_pool():
+    return jsonify(pool_stats())
+
+
+@app.route("/metrics")
+def metrics():
+    # Für Prometheus ohne Login, optional mit METRIKEN_TOKEN geschützt
+    return metriken.antwort()
+
 # get_tennisplatz
 @app.route("/get_tennisplatz/<int:tid>")
 @login_required
 def get_tennisplatz(tid):
     try:
-        platz = db_read("SELECT * FROM tennisplatz WHERE tid=%s", (tid,), single=True)
-        if not platz:
-            return jsonify({"exists": False})
-        return jsonify({
-            "exists": True,
-            "tid": platz["tid"],
-            "tennisanlage": platz["tennisanlage"] or "",
-            "platznummer": platz["platznummer"] or "",
-            "belag": platz["belag"] or "",
-            "wid": platz["wid"] or "",
-            "wartung": str(platz["datum_der_wartung"]) if platz.get("datum_der_wartung") else ""
-        })
+        return jsonify(nachschlagen.lade("tennisplatz", [tid])[tid])
     except Exception as e:
         logging.error(f"Fehler bei get_tennisplatz: {e}")
         return jsonify({"exists": False, "error": str(e)})
@@ -1069,27 +1083,23 @@ def tennisplätze():
                         if not arbeiter_existiert:
                             fehler = f"Wartungsarbeiter mit ID {wid_int} existiert nicht."
                         else:
-                            # Prüfen ob Platz bereits existiert
-                            existiert = db_read(
-                                "SELECT * FROM tennisplatz WHERE tennisanlage=%s AND platznummer=%s",
-                                (anlage, platznummer_int),
-                                single=True
+                            # Doppelte Plätze verhindert uq_tennisplatz_anlage_platz
+                            db_write(
+                                "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, datum_der_wartung, wid) VALUES (%s,%s,%s,%s,%s)",
+                                (anlage, platznummer_int, belag, wartung, wid_int)
                             )
-                            
-                            if existiert:
-                                fehler = f"Tennisplatz '{anlage}' mit Platznummer {platznummer_int} existiert bereits."
-                            else:
-                                db_write(
-                                    "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, datum_der_wartung, wid) VALUES (%s,%s,%s,%s,%s)",
-                                    (anlage, platznummer_int, belag, wartung, wid_int)
-                                )
-                                erfolg = f"Tennisplatz '{anlage}' - Platz {platznummer_int} wurde erfolgreich hinzugefügt."
+                            katalog.invalidiere()
+                            nachschlagen.invalidiere("tennisplatz")
+                            erfolg = f"Tennisplatz '{anlage}' - Platz {platznummer_int} wurde erfolgreich hinzugefügt."
                         
                 except ValueError:
                     fehler = "Platznummer und Wartungsarbeiter-ID müssen Zahlen sein."
                 except Exception as e:
-                    logging.error(f"Fehler beim Hinzufügen des Tennisplatzes: {e}")
-                    fehler = f"Fehler beim Hinzufügen des Tennisplatzes: {str(e)}"
+                    if ist_duplikat(e):
+                        fehler = f"Tennisplatz '{anlage}' mit Platznummer {platznummer_int} existiert bereits."
+                    else:
+                        logging.error(f"Fehler beim Hinzufügen des Tennisplatzes: {e}")
+                        fehler = f"Fehler beim Hinzufügen des Tennisplatzes: {str(e)}"
         
         # Tennisplatz ändern
         elif aktion == "aendern":
@@ -1135,14 +1145,20 @@ def tennisplätze():
                                     "UPDATE tennisplatz SET tennisanlage=%s, platznummer=%s, belag=%s, datum_der_wartung=%s, wid=%s WHERE tid=%s",
                                     (anlage, platznummer_int, belag, wartung, wid_int, tid)
                                 )
+                                katalog.invalidiere()
+                                nachschlagen.invalidiere("tennisplatz")
+                                sperren.invalidiere()
                                 
                                 erfolg = f"Tennisplatz mit ID {tid} wurde erfolgreich aktualisiert."
                         
                 except ValueError:
                     fehler = "Tennisplatz-ID, Platznummer und Wartungsarbeiter-ID müssen Zahlen sein."
                 except Exception as e:
-                    logging.error(f"Fehler beim Ändern des Tennisplatzes: {e}")
-                    fehler = f"Fehler beim Ändern des Tennisplatzes: {str(e)}"
+                    if ist_duplikat(e):
+                        fehler = f"Tennisplatz '{anlage}' mit Platznummer {platznummer_int} existiert bereits."
+                    else:
+                        logging.error(f"Fehler beim Ändern des Tennisplatzes: {e}")
+                        fehler = f"Fehler beim Ändern des Tennisplatzes: {str(e)}"
         
         # Tennisplatz löschen
         elif aktion == "loeschen":
@@ -1167,6 +1183,10 @@ def tennisplätze():
                             fehler = f"Tennisplatz mit ID {tid} kann nicht gelöscht werden, da noch {len(buchungen)} Buchung(en) vorhanden sind. Bitte erst alle Buchungen stornieren."
                         else:
                             db_write("DELETE FROM tennisplatz WHERE tid=%s", (tid,))
+                            katalog.invalidiere()
+                            nachschlagen.invalidiere("tennisplatz")
+                            # Sperren des Platzes werden per ON DELETE CASCADE mitgelöscht
+                            sperren.invalidiere()
                             erfolg = f"Tennisplatz '{platz['tennisanlage']}' - Platz {platz['platznummer']} (ID: {tid}) wurde erfolgreich gelöscht."
                             
                 except ValueError:
@@ -1174,55 +1194,454 @@ def tennisplätze():
                 except Exception as e:
                     logging.error(f"Fehler beim Löschen des Tennisplatzes: {e}")
                     fehler = f"Fehler beim Löschen des Tennisplatzes: {str(e)}"
+        
+        # Platz für Wartung sperren
+        elif aktion == "sperren":
+            platz_id = request.form.get("platz_id", "").strip()
+            von = request.form.get("von", "").strip()
+            bis = request.form.get("bis", "").strip()
+            grund = request.form.get("grund", "").strip()
+            
+            if not platz_id or not von or not bis:
+                fehler = "Bitte Tennisplatz-ID, Beginn und Ende der Sperre angeben."
+            else:
+                try:
+                    from datetime import datetime
+                    tid = int(platz_id)
+                    von_dt = datetime.fromisoformat(von)
+                    bis_dt = datetime.fromisoformat(bis)
+                    
+                    if bis_dt <= von_dt:
+                        fehler = "Das Ende der Sperre muss nach dem Beginn liegen."
+                    elif tid not in katalog.get_katalog()["nach_tid"] and not db_read("SELECT tid FROM tennisplatz WHERE tid=%s", (tid,), single=True):
+                        fehler = f"Tennisplatz mit ID {tid} existiert nicht."
+                    else:
+                        sperren.anlegen(tid, von_dt, bis_dt, grund)
+                        erfolg = f"Tennisplatz mit ID {tid} ist vom {von_dt:%d.%m.%Y %H:%M} bis {bis_dt:%d.%m.%Y %H:%M} gesperrt."
+                        betroffen = sperren.betroffene_buchungen(tid, von_dt, bis_dt)
+                        if betroffen:
+                            nummern = ", ".join(str(b["buchungsnummer"]) for b in betroffen)
+                            erfolg += f" Achtung: {len(betroffen)} bestehende Buchung(en) liegen im gesperrten Zeitraum (Nr. {nummern})."
+                        
+                except ValueError:
+                    fehler = "Tennisplatz-ID muss eine Zahl sein, Beginn und Ende ein gültiger Zeitpunkt."
+                except Exception as e:
+                    logging.error(f"Fehler beim Anlegen der Sperre: {e}")
+                    fehler = f"Fehler beim Anlegen der Sperre: {str(e)}"
+        
+        # Sperre aufheben
+        elif aktion == "sperre_aufheben":
+            sperre_id = request.form.get("sperre_id", "").strip()
+            
+            if not sperre_id:
+                fehler = "Bitte Sperren-ID eingeben."
+            else:
+                try:
+                    sid = int(sperre_id)
+                    if sperren.aufheben(sid):
+                        erfolg = f"Sperre mit ID {sid} wurde aufgehoben."
+                    else:
+                        fehler = f"Sperre mit ID {sid} existiert nicht."
+                except ValueError:
+                    fehler = "Sperren-ID muss eine Zahl sein."
+                except Exception as e:
+                    logging.error(f"Fehler beim Aufheben der Sperre: {e}")
+                    fehler = f"Fehler beim Aufheben der Sperre: {str(e)}"
+        
+        # Tennisplätze aus CSV-Datei importieren
+        elif aktion == "importieren":
+            datei = request.files.get("datei")
+            
+            if not datei or not datei.filename:
+                fehler = "Bitte eine CSV-Datei auswählen."
+            else:
+                try:
+                    bericht = csv_daten.importiere_tennisplaetze(datei)
+                    if bericht.eingefuegt:
+                        katalog.invalidiere()
+                        nachschlagen.invalidiere("tennisplatz")
+                    erfolg = f"{bericht.eingefuegt} Tennisplatz/Tennisplätze importiert, {bericht.duplikate} bereits vorhanden (übersprungen)."
+                    if bericht.fehler:
+                        fehler = "Nicht importiert: " + "; ".join(bericht.fehler)
+                except ValueError as e:
+                    # fehlende Spalten oder Datei nicht UTF-8
+                    fehler = f"Die CSV-Datei konnte nicht gelesen werden: {str(e)}"
+                except Exception as e:
+                    if ist_duplikat(e):
+                        fehler = "Import abgebrochen: Die Datei enthält einen Tennisplatz, der bereits existiert (Schreibweise prüfen). Es wurde nichts importiert."
+                    else:
+                        logging.error(f"Fehler beim Import der Tennisplätze: {e}")
+                        fehler = f"Fehler beim Import der Tennisplätze: {str(e)}"
     
-    # Alle Tennisplätze für die Übersicht laden - sortiert nach ID
-    # Mit JOIN um Wartungsarbeiter-Namen anzuzeigen
+    # Tennisplätze für die Übersicht seitenweise laden - sortiert nach ID
+    # Filter und Seite kommen aus der URL (?anlage=...&belag=...&nach=<tid>)
+    anlage_filter = request.args.get("anlage", "").strip()
+    belag_filter = request.args.get("belag", "").strip()
+    naechste_url = None
+    try:
+        nach, limit = listen.parse_seite(request.args)
+    except ValueError:
+        fehler = fehler or "Ungültige Seitenangabe."
+        nach, limit = None, listen.SEITE_STANDARD
     try:
-        alle_plaetze = db_read("""
-            SELECT 
-                t.tid, 
-                t.tennisanlage, 
-                t.platznummer, 
-                t.belag, 
-                t.datum_der_wartung as wartung, 
-                t.wid,
-                CONCAT(w.vorname, ' ', w.nachname) as wartungsarbeiter_name
-            FROM tennisplatz t
-            LEFT JOIN wartungsarbeiter w ON t.wid = w.wid
-            ORDER BY t.tid
-        """)
-        if not alle_plaetze:
-            alle_plaetze = []
+        alle_plaetze, naechste = listen.tennisplaetze(nach, limit, anlage_filter, belag_filter)
+        if naechste is not None:
+            naechste_url = url_for("tennisplätze", anlage=anlage_filter or None, belag=belag_filter or None,
+                                   limit=request.args.get("limit") or None, nach=naechste)
     except Exception as e:
         logging.error(f"Fehler beim Laden der Tennisplätze: {e}")
         alle_plaetze = []
     
+    try:
+        anlagen = katalog.get_katalog()["anlagen"]
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Tennisanlagen: {e}")
+        anlagen = []
+    
+    try:
+        sperren_liste = sperren.liste()
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Sperren: {e}")
+        sperren_liste = []
+    
     return render_template("tennisplätze.html", 
                          fehler=fehler, 
                          erfolg=erfolg, 
                          alle_plaetze=alle_plaetze,
-                         alle_arbeiter=alle_arbeiter)   
+                         alle_arbeiter=alle_arbeiter,
+                         anlagen=anlagen,
+                         belaege=listen.BELAEGE,
+                         anlage_filter=anlage_filter,
+                         belag_filter=belag_filter,
+                         erste_seite=nach is None,
+                         naechste_url=naechste_url,
+                         sperren_liste=sperren_liste)   
+
+# JSON-Varianten der Verwaltungslisten, gleiche Parameter wie die Seiten
+@app.route("/api/tennisplaetze/liste")
+@login_required
+def api_tennisplaetze_liste():
+    try:
+        nach, limit = listen.parse_seite(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        rows, naechste = listen.tennisplaetze(
+            nach, limit,
+            request.args.get("anlage", "").strip(),
+            request.args.get("belag", "").strip()
+        )
+    except Exception as e:
+        logging.error(f"Fehler bei api_tennisplaetze_liste: {e}")
+        return jsonify({"error": "Fehler beim Laden der Tennisplätze."}), 500
+    return jsonify({"eintraege": listen.als_json(rows), "naechste": naechste})
+
+
+@app.route("/api/wartungsarbeiter/liste")
+@login_required
+def api_wartungsarbeiter_liste():
+    try:
+        nach, limit = listen.parse_seite(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        rows, naechste = listen.wartungsarbeiter(nach, limit, request.args.get("name", "").strip())
+    except Exception as e:
+        logging.error(f"Fehler bei api_wartungsarbeiter_liste: {e}")
+        return jsonify({"error": "Fehler beim Laden der Wartungsarbeiter."}), 500
+    return jsonify({"eintraege": listen.als_json(rows), "naechste": naechste})
+
+
+# CSV-Exporte: werden beim Lesen gestreamt, nie komplett im Speicher
+def csv_antwort(stuecke, dateiname):
+    return Response(
+        stuecke,
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={dateiname}"}
+    )
+
+
+@app.route("/tennisplaetze.csv")
+@login_required
+def tennisplaetze_csv():
+    return csv_antwort(csv_daten.exportiere_tennisplaetze(), "tennisplaetze.csv")
+
+
+@app.route("/wartungsarbeiter.csv")
+@login_required
+def wartungsarbeiter_csv():
+    return csv_antwort(csv_daten.exportiere_wartungsarbeiter(), "wartungsarbeiter.csv")
+
+
+@app.route("/buchungen.csv")
+@login_required
+def buchungen_csv():
+    # gleiche Filter wie die Buchungsübersicht
+    try:
+        bed, params = buchungsliste.bedingungen(buchungsliste.parse_filter(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return csv_antwort(csv_daten.exportiere_buchungen(bed, params), "buchungen.csv")
+
+
+# Buchungsübersicht für die Verwaltung
+@app.route("/buchungen")
+@login_required
+def buchungsuebersicht():
+    from datetime import date
+    fehler = None
+    eintraege = []
+    anzahl = None
+    naechste_url = None
+    
+    # Ohne Parameter: ab heute
+    args = request.args if request.args else {"von": date.today().isoformat()}
+    try:
+        filter_ = buchungsliste.parse_filter(args)
+        nach = buchungsliste.parse_nach(request.args.get("nach", "").strip())
+        limit = listen.parse_limit(request.args)
+    except ValueError as e:
+        fehler = f"Ungültige Eingabe: {str(e)}"
+        filter_ = buchungsliste.parse_filter({})
+        nach, limit = None, listen.SEITE_STANDARD
+    
+    try:
+        eintraege, naechste = buchungsliste.seite(filter_, nach, limit)
+        anzahl = buchungsliste.anzahl(filter_)
+        if naechste is not None:
+            naechste_url = url_for("buchungsuebersicht", nach=naechste,
+                                   limit=request.args.get("limit") or None,
+                                   **buchungsliste.als_url_parameter(filter_))
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Buchungen: {e}")
+        fehler = "Fehler beim Laden der Buchungen."
+    
+    try:
+        kat = katalog.get_katalog()
+        anlagen = kat["anlagen"]
+        plaetze = kat["plaetze"]
+    except Exception as e:
+        logging.error(f"Fehler beim Laden des Katalogs: {e}")
+        anlagen, plaetze = [], []
+    
+    url_parameter = buchungsliste.als_url_parameter(filter_)
+    return render_template("buchungen.html",
+                           fehler=fehler,
+                           eintraege=eintraege,
+                           anzahl=anzahl,
+                           filter=filter_,
+                           anlagen=anlagen,
+                           plaetze=plaetze,
+                           erste_seite=nach is None,
+                           erste_url=url_for("buchungsuebersicht", **url_parameter),
+                           naechste_url=naechste_url,
+                           csv_url=url_for("buchungen_csv", **url_parameter))
+
+
+# Wartungsplanung: überfällige Plätze, Arbeitslast, Massenänderungen
+@app.route("/wartungsplanung", methods=["GET", "POST"])
+@login_required
+def wartungsplanung():
+    from datetime import date
+    fehler = None
+    erfolg = None
+    
+    if request.method == "POST":
+        aktion = request.form.get("aktion")
+        
+        # Plätze eines Wartungsarbeiters an einen anderen übertragen
+        if aktion == "uebertragen":
+            von_id = request.form.get("von_wid", "").strip()
+            nach_id = request.form.get("nach_wid", "").strip()
+            nur_ueberfaellig = request.form.get("nur_ueberfaellig") == "1"
+            
+            if not von_id or not nach_id:
+                fehler = "Bitte beide Wartungsarbeiter auswählen."
+            else:
+                try:
+                    anzahl, fehler = wartung.uebertragen(int(von_id), int(nach_id), nur_ueberfaellig)
+                    if not fehler:
+                        katalog.invalidiere()
+                        nachschlagen.invalidiere("tennisplatz")
+                        erfolg = f"{anzahl} Tennisplatz/Tennisplätze wurde(n) an Wartungsarbeiter {nach_id} übertragen."
+                except ValueError:
+                    fehler = "Wartungsarbeiter-IDs müssen Zahlen sein."
+                except Exception as e:
+                    logging.error(f"Fehler beim Übertragen der Tennisplätze: {e}")
+                    fehler = f"Fehler beim Übertragen der Tennisplätze: {str(e)}"
+        
+        # Wartung für die ausgewählten Plätze eintragen
+        elif aktion == "erledigt":
+            tids = request.form.getlist("tid")
+            datum = request.form.get("datum", "").strip()
+            
+            if not tids or not datum:
+                fehler = "Bitte Plätze und Datum der Wartung auswählen."
+            else:
+                try:
+                    wartungsdatum = date.fromisoformat(datum)
+                    if wartungsdatum > date.today():
+                        fehler = "Das Datum der Wartung darf nicht in der Zukunft liegen."
+                    else:
+                        anzahl = wartung.wartung_erledigt([int(t) for t in tids], wartungsdatum)
+                        katalog.invalidiere()
+                        nachschlagen.invalidiere("tennisplatz")
+                        erfolg = f"Wartung für {anzahl} Tennisplatz/Tennisplätze eingetragen."
+                except ValueError:
+                    fehler = "Ungültige Platz-ID oder ungültiges Datum."
+                except Exception as e:
+                    logging.error(f"Fehler beim Eintragen der Wartung: {e}")
+                    fehler = f"Fehler beim Eintragen der Wartung: {str(e)}"
+    
+    try:
+        arbeitslast = wartung.arbeitslast()
+        ueberfaellig = wartung.ueberfaellige_plaetze()
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Wartungsplanung: {e}")
+        fehler = fehler or "Fehler beim Laden der Wartungsplanung."
+        arbeitslast, ueberfaellig = [], []
+    
+    return render_template("wartungsplanung.html",
+                           fehler=fehler,
+                           erfolg=erfolg,
+                           arbeitslast=arbeitslast,
+                           ueberfaellig=ueberfaellig,
+                           faellig_vor=wartung.faellig_vor(),
+                           intervall=wartung.WARTUNG_INTERVALL_TAGE,
+                           heute=date.today())
+
+
+# Auslastung aus den voraggregierten Tageswerten (statistik.py)
+def statistik_parameter():
+    """(von, bis, anlage) aus der URL, Standard: die letzten 4 Wochen bis heute"""
+    from datetime import date, timedelta
+    bis = request.args.get("bis", "").strip()
+    von = request.args.get("von", "").strip()
+    bis = date.fromisoformat(bis) if bis else date.today()
+    von = date.fromisoformat(von) if von else bis - timedelta(days=27)
+    if von > bis:
+        raise ValueError("Das Von-Datum muss vor dem Bis-Datum liegen.")
+    if (bis - von).days + 1 > statistik.MAX_TAGE:
+        raise ValueError(f"Der Zeitraum darf höchstens {statistik.MAX_TAGE} Tage umfassen.")
+    return von, bis, request.args.get("anlage", "").strip()
+
+
+@app.route("/statistik")
+@login_required
+def statistik_seite():
+    from datetime import date, timedelta
+    fehler = None
+    daten = None
+    try:
+        von, bis, anlage = statistik_parameter()
+    except ValueError as e:
+        fehler = f"Ungültige Eingabe: {str(e)}"
+        bis = date.today()
+        von, anlage = bis - timedelta(days=27), ""
+    
+    try:
+        daten = statistik.auswertung(von, bis, anlage)
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Statistik: {e}")
+        fehler = "Fehler beim Laden der Statistik."
+    
+    try:
+        anlagen = katalog.get_katalog()["anlagen"]
+    except Exception as e:
+        logging.error(f"Fehler beim Laden der Tennisanlagen: {e}")
+        anlagen = []
+    
+    return render_template("statistik.html",
+                           fehler=fehler,
+                           daten=daten,
+                           von=von,
+                           bis=bis,
+                           anlage=anlage,
+                           anlagen=anlagen,
+                           stunden=statistik.STUNDEN,
+                           wochentage=["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"])
+
+
+@app.route("/api/statistik")
+@login_required
+def api_statistik():
+    try:
+        von, bis, anlage = statistik_parameter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(statistik.auswertung(von, bis, anlage))
+    except Exception as e:
+        logging.error(f"Fehler bei api_statistik: {e}")
+        return jsonify({"error": "Fehler beim Laden der Statistik."}), 500
+
+
+@app.route("/api/buchungen")
+@login_required
+def api_buchungen():
+    try:
+        filter_ = buchungsliste.parse_filter(request.args)
+        nach = buchungsliste.parse_nach(request.args.get("nach", "").strip())
+        limit = listen.parse_limit(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        rows, naechste = buchungsliste.seite(filter_, nach, limit)
+        anzahl = buchungsliste.anzahl(filter_)
+    except Exception as e:
+        logging.error(f"Fehler bei api_buchungen: {e}")
+        return jsonify({"error": "Fehler beim Laden der Buchungen."}), 500
+    return jsonify({"eintraege": listen.als_json(rows), "naechste": naechste, "anzahl": anzahl})
+
 
 # get_wartungsarbeiter
 @app.route("/get_wartungsarbeiter/<int:wid>")
 @login_required
 def get_wartungsarbeiter(wid):
     try:
-        arbeiter = db_read("SELECT * FROM wartungsarbeiter WHERE wid=%s", (wid,), single=True)
-        if not arbeiter:
-            return jsonify({"exists": False})
-        return jsonify({
-            "exists": True,
-            "wid": arbeiter["wid"],
-            "vorname": arbeiter["vorname"] or "",
-            "nachname": arbeiter["nachname"] or "",
-            "geburtsdatum": str(arbeiter["geburtsdatum"]) if arbeiter.get("geburtsdatum") else ""
-        })
+        return jsonify(nachschlagen.lade("wartungsarbeiter", [wid])[wid])
     except Exception as e:
         logging.error(f"Fehler bei get_wartungsarbeiter: {e}")
         return jsonify({"exists": False, "error": str(e)})
 
 
+# Batch-Varianten: /api/nutzer?ids=1,2,3 usw., eine IN (...)-Abfrage für alle IDs
+def batch_antwort(art):
+    try:
+        ids = nachschlagen.parse_ids(request.args.get("ids", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        ergebnis = nachschlagen.lade(art, ids)
+    except Exception as e:
+        logging.error(f"Fehler bei batch_antwort({art}): {e}")
+        return jsonify({"error": "Fehler beim Laden der Daten."}), 500
+
+    response = jsonify({str(id_): eintrag for id_, eintrag in ergebnis.items()})
+    # Browser darf die Antwort kurz wiederverwenden (wiederholte Eingaben beim Tippen)
+    response.headers["Cache-Control"] = f"private, max-age={nachschlagen.MEMO_TTL}"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route("/api/nutzer")
+@login_required
+def api_nutzer():
+    return batch_antwort("nutzer")
+
+
+@app.route("/api/tennisplaetze")
+@login_required
+def api_tennisplaetze():
+    return batch_antwort("tennisplatz")
+
+
+@app.route("/api/wartungsarbeiter")
+@login_required
+def api_wartungsarbeiter():
+    return batch_antwort("wartungsarbeiter")
+
+
 # wartungsarbeiter  
 @app.route("/wartungsarbeiter", methods=["GET", "POST"])
 @login_required
@@ -1243,70 +1662,90 @@ def wartungsarbeiter():
                 fehler = "Bitte alle Pflichtfelder ausfüllen (Vorname, Nachname, Geburtsdatum)."
             else:
                 try:
-                    # Prüfen ob Arbeiter bereits existiert
-                    existiert = db_read(
-                        "SELECT * FROM wartungsarbeiter WHERE vorname=%s AND nachname=%s AND geburtsdatum=%s",
-                        (vorname, nachname, geburtsdatum),
-                        single=True
+                    # Doppelte Arbeiter verhindert uq_wartungsarbeiter_person
+                    db_write(
+                        "INSERT INTO wartungsarbeiter (vorname, nachname, geburtsdatum) VALUES (%s,%s,%s)",
+                        (vorname, nachname, geburtsdatum)
                     )
-                    
-                    if existiert:
-                        fehler = f"Wartungsarbeiter '{vorname} {nachname}' mit diesem Geburtsdatum existiert bereits."
-                    else:
-                        db_write(
-                            "INSERT INTO wartungsarbeiter (vorname, nachname, geburtsdatum) VALUES (%s,%s,%s)",
-                            (vorname, nachname, geburtsdatum)
-                        )
-                        erfolg = f"Wartungsarbeiter '{vorname} {nachname}' wurde erfolgreich hinzugefügt."
+                    nachschlagen.invalidiere("wartungsarbeiter")
+                    erfolg = f"Wartungsarbeiter '{vorname} {nachname}' wurde erfolgreich hinzugefügt."
                         
                 except Exception as e:
-                    logging.error(f"Fehler beim Hinzufügen des Wartungsarbeiters: {e}")
-                    fehler = f"Fehler beim Hinzufügen des Wartungsarbeiters: {str(e)}"
+                    if ist_duplikat(e):
+                        fehler = f"Wartungsarbeiter '{vorname} {nachname}' mit diesem Geburtsdatum existiert bereits."
+                    else:
+                        logging.error(f"Fehler beim Hinzufügen des Wartungsarbeiters: {e}")
+                        fehler = f"Fehler beim Hinzufügen des Wartungsarbeiters: {str(e)}"
         
         # Wartungsarbeiter löschen
         elif aktion == "loeschen":
             arbeiter_id = request.form.get("arbeiter_id", "").strip()
+            nachfolger_id = request.form.get("nachfolger_id", "").strip()
             
             if not arbeiter_id:
                 fehler = "Bitte Wartungsarbeiter-ID eingeben."
             else:
                 try:
                     wid = int(arbeiter_id)
+                    nach_wid = int(nachfolger_id) if nachfolger_id else None
                     
-                    # Prüfen ob Arbeiter existiert
-                    arbeiter = db_read("SELECT * FROM wartungsarbeiter WHERE wid=%s", (wid,), single=True)
+                    # tennisplatz.wid ist NOT NULL: Plätze zuerst übertragen, dann löschen (eine Transaktion)
+                    arbeiter, anzahl, fehler = wartung.loesche_arbeiter(wid, nach_wid)
                     
-                    if not arbeiter:
-                        fehler = f"Wartungsarbeiter mit ID {wid} existiert nicht."
-                    else:
-                        # WICHTIG: Erst Foreign Key Constraint entfernen, dann löschen
-                        # Schritt 1: Alle Tennisplätze auf NULL setzen
-                        plaetze_anzahl = db_read("SELECT COUNT(*) as anzahl FROM tennisplatz WHERE wid=%s", (wid,), single=True)
-                        anzahl = plaetze_anzahl['anzahl'] if plaetze_anzahl else 0
-                        
-                        db_write("UPDATE tennisplatz SET wid=NULL WHERE wid=%s", (wid,))
-                        
-                        # Schritt 2: Wartungsarbeiter löschen
-                        db_write("DELETE FROM wartungsarbeiter WHERE wid=%s", (wid,))
-                        
+                    if not fehler:
+                        nachschlagen.invalidiere("wartungsarbeiter")
                         if anzahl > 0:
-                            erfolg = f"Wartungsarbeiter '{arbeiter['vorname']} {arbeiter['nachname']}' (ID: {wid}) wurde erfolgreich gelöscht. {anzahl} Tennisplatz/Tennisplätze wurde(n) aktualisiert."
+                            katalog.invalidiere()
+                            nachschlagen.invalidiere("tennisplatz")
+                            erfolg = f"Wartungsarbeiter '{arbeiter['vorname']} {arbeiter['nachname']}' (ID: {wid}) wurde erfolgreich gelöscht. {anzahl} Tennisplatz/Tennisplätze wurde(n) an ID {nach_wid} übertragen."
                         else:
                             erfolg = f"Wartungsarbeiter '{arbeiter['vorname']} {arbeiter['nachname']}' (ID: {wid}) wurde erfolgreich gelöscht."
                             
                 except ValueError:
-                    fehler = "Wartungsarbeiter-ID muss eine Zahl sein."
+                    fehler = "Wartungsarbeiter-IDs müssen Zahlen sein."
                 except Exception as e:
                     logging.error(f"Fehler beim Löschen des Wartungsarbeiters: {e}")
                     fehler = f"Fehler beim Löschen des Wartungsarbeiters: {str(e)}"
+        
+        # Wartungsarbeiter aus CSV-Datei importieren
+        elif aktion == "importieren":
+            datei = request.files.get("datei")
+            
+            if not datei or not datei.filename:
+                fehler = "Bitte eine CSV-Datei auswählen."
+            else:
+                try:
+                    bericht = csv_daten.importiere_wartungsarbeiter(datei)
+                    if bericht.eingefuegt:
+                        nachschlagen.invalidiere("wartungsarbeiter")
+                    erfolg = f"{bericht.eingefuegt} Wartungsarbeiter importiert, {bericht.duplikate} bereits vorhanden (übersprungen)."
+                    if bericht.fehler:
+                        fehler = "Nicht importiert: " + "; ".join(bericht.fehler)
+                except ValueError as e:
+                    fehler = f"Die CSV-Datei konnte nicht gelesen werden: {str(e)}"
+                except Exception as e:
+                    if ist_duplikat(e):
+                        fehler = "Import abgebrochen: Die Datei enthält einen Wartungsarbeiter, der bereits existiert (Schreibweise prüfen). Es wurde nichts importiert."
+                    else:
+                        logging.error(f"Fehler beim Import der Wartungsarbeiter: {e}")
+                        fehler = f"Fehler beim Import der Wartungsarbeiter: {str(e)}"
     
-    # Alle Wartungsarbeiter für die Übersicht laden - sortiert nach ID
+    # Wartungsarbeiter für die Übersicht seitenweise laden - sortiert nach ID
+    name_filter = request.args.get("name", "").strip()
+    naechste_url = None
     try:
-        alle_arbeiter = db_read("SELECT wid, vorname, nachname, geburtsdatum FROM wartungsarbeiter ORDER BY wid")
-        if not alle_arbeiter:
-            alle_arbeiter = []
+        nach, limit = listen.parse_seite(request.args)
+    except ValueError:
+        fehler = fehler or "Ungültige Seitenangabe."
+        nach, limit = None, listen.SEITE_STANDARD
+    try:
+        alle_arbeiter, naechste = listen.wartungsarbeiter(nach, limit, name_filter)
+        if naechste is not None:
+            naechste_url = url_for("wartungsarbeiter", name=name_filter or None,
+                                   limit=request.args.get("limit") or None, nach=naechste)
     except Exception as e:
         logging.error(f"Fehler beim Laden der Wartungsarbeiter: {e}")
         alle_arbeiter = []
     
-    return render_template("wartungsarbeiter.html", fehler=fehler, erfolg=erfolg, alle_arbeiter=alle_arbeiter)
\ No newline at end of file
+    return render_template("wartungsarbeiter.html", fehler=fehler, erfolg=erfolg, alle_arbeiter=alle_arbeiter,
+                           name_filter=name_filter, erste_seite=nach is None, naechste_url=naechste_url)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+from cache import TTLCache
+from db import db_read
+
+# Platzkatalog: ändert sich nur über tennisplätze(), wird aber bei jedem
+# Aufruf von /buchen und /stornieren gebraucht.
+_katalog = TTLCache("katalog", maxsize=1, ttl=int(os.getenv("KATALOG_CACHE_TTL", "300")))
+
+
+def _lade_katalog():
+    plaetze = db_read("SELECT * FROM tennisplatz ORDER BY tennisanlage, platznummer") or []
+    return {
+        "version": _katalog.version,
+        "plaetze": plaetze,
+        "anlagen": sorted({p["tennisanlage"] for p in plaetze}),
+        "tid_nach_platz": {(p["tennisanlage"], p["platznummer"]): p["tid"] for p in plaetze},
+        "nach_tid": {p["tid"]: p for p in plaetze},
+    }
+
+
+def get_katalog():
+    """dict mit plaetze, anlagen, tid_nach_platz und nach_tid (nur lesen!)"""
+    return _katalog.get_or_load("katalog", _lade_katalog)
+
+
+def finde_platz(tennisanlage, platznummer):
+    """Tennisplatz-Zeile zu (Anlage, Platznummer) oder None."""
+    katalog = get_katalog()
+    tid = katalog["tid_nach_platz"].get((tennisanlage, platznummer))
+    if tid is not None:
+        return katalog["nach_tid"][tid]
+    # Nicht im Cache: evtl. gerade von einem anderen Worker angelegt
+    return db_read(
+        "SELECT * FROM tennisplatz WHERE tennisanlage=%s AND platznummer=%s",
+        (tennisanlage, platznummer),
+        single=True
+    )
+
+
+def invalidiere():
+    """Nach jedem Schreiben auf tennisplatz aufrufen."""
+    _katalog.invalidate()
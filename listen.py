@@ -0,0 +1,108 @@
+"""
+Seitenweise Listen für die Verwaltung (Tennisplätze, Wartungsarbeiter).
+
+Keyset-Pagination statt OFFSET: die Seite endet mit der ID des letzten Eintrags,
+die nächste Seite beginnt mit WHERE id > letzte_id ORDER BY id LIMIT n.
+Jede Seite kostet damit gleich viel, egal wie weit hinten sie liegt.
+"""
+import os
+from datetime import timedelta
+from db import db_read
+import verfuegbarkeit
+
+SEITE_STANDARD = int(os.getenv("LISTE_SEITE", "50"))
+SEITE_MAX = 200
+
+BELAEGE = ["hart", "sand", "rasen", "teppich"]
+
+
+def parse_limit(args):
+    limit = args.get("limit", "").strip()
+    limit = int(limit) if limit else SEITE_STANDARD
+    if limit < 1 or limit > SEITE_MAX:
+        raise ValueError(f"limit muss zwischen 1 und {SEITE_MAX} liegen.")
+    return limit
+
+
+def parse_seite(args):
+    """(nach, limit) aus den Query-Parametern; ValueError bei ungültigen Werten."""
+    nach = args.get("nach", "").strip()
+    return int(nach) if nach else None, parse_limit(args)
+
+
+def _seite(sql, bedingungen, params, schluessel, nach, limit):
+    """
+    Führt sql mit den Bedingungen aus und liefert (rows, naechste).
+    naechste ist der Wert für ?nach= der folgenden Seite oder None auf der letzten Seite.
+    Es wird eine Zeile mehr geladen, um das zu erkennen (ohne COUNT(*)).
+    """
+    bedingungen = list(bedingungen)
+    params = list(params)
+    if nach is not None:
+        bedingungen.append(f"{schluessel} > %s")
+        params.append(nach)
+    if bedingungen:
+        sql += " WHERE " + " AND ".join(bedingungen)
+    sql += f" ORDER BY {schluessel} LIMIT %s"
+    params.append(limit + 1)
+
+    rows = db_read(sql, tuple(params)) or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][schluessel.split(".")[-1]]
+    return rows, None
+
+
+def tennisplaetze(nach=None, limit=SEITE_STANDARD, anlage=None, belag=None):
+    bedingungen = []
+    params = []
+    if anlage:
+        bedingungen.append("t.tennisanlage = %s")
+        params.append(anlage)
+    if belag:
+        bedingungen.append("t.belag = %s")
+        params.append(belag)
+
+    rows, naechste = _seite(
+        """SELECT t.tid, t.tennisanlage, t.platznummer, t.belag,
+                  t.datum_der_wartung AS wartung, t.wid,
+                  w.vorname AS w_vorname, w.nachname AS w_nachname
+           FROM tennisplatz t
+           LEFT JOIN wartungsarbeiter w ON t.wid = w.wid""",
+        bedingungen, params, "t.tid", nach, limit
+    )
+    for row in rows:
+        vorname = row.pop("w_vorname")
+        nachname = row.pop("w_nachname")
+        row["wartungsarbeiter_name"] = f"{vorname} {nachname}" if vorname or nachname else None
+    return rows, naechste
+
+
+def wartungsarbeiter(nach=None, limit=SEITE_STANDARD, name=None):
+    bedingungen = []
+    params = []
+    if name:
+        # Präfixsuche auf dem Nachnamen
+        # "!" als Escape-Zeichen, weil MySQL und SQLite Backslashes verschieden behandeln
+        bedingungen.append("nachname LIKE %s ESCAPE '!'")
+        params.append(name.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%")
+
+    return _seite(
+        "SELECT wid, vorname, nachname, geburtsdatum FROM wartungsarbeiter",
+        bedingungen, params, "wid", nach, limit
+    )
+
+
+def _json_wert(wert):
+    # TIME-Spalten kommen als timedelta
+    if isinstance(wert, timedelta):
+        minuten = verfuegbarkeit.zeit_in_minuten(wert)
+        return f"{minuten // 60:02d}:{minuten % 60:02d}"
+    if hasattr(wert, "isoformat"):
+        return wert.isoformat()
+    return wert
+
+
+def als_json(rows):
+    """Datumswerte als ISO-String, damit jsonify sie nicht als HTTP-Datum ausgibt."""
+    return [{k: _json_wert(v) for k, v in row.items()} for row in rows]
@@ -0,0 +1,333 @@
+"""
+Metriken im Prometheus-Textformat für /metrics, ohne zusätzliche Abhängigkeit.
+
+Gezählt wird pro Prozess: Dauer der Requests pro Flask-Endpoint, Dauer der
+Abfragen pro SQL-Fingerprint (über add_query_listener in db.py), Wartezeit
+auf den Pool und Logins. Jeder Prozess schreibt seinen Stand regelmäßig als
+<pid>.json nach METRIKEN_VERZEICHNIS, zusammen mit pool_stats() und den
+Trefferzahlen aus cache.CACHES. /metrics liest alle Dateien und summiert sie,
+egal welcher Worker den Scrape beantwortet.
+
+Zähler beendeter Worker bleiben erhalten (Dateien werden nicht gelöscht),
+Pool-Werte wie belegte Verbindungen zählen nur für laufende Prozesse. Beim
+Neustart der App kann das Verzeichnis geleert werden.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from flask import Response, g, request
+import cache
+import db
+
+logger = logging.getLogger(__name__)
+
+VERZEICHNIS = os.getenv(
+    "METRIKEN_VERZEICHNIS", os.path.join(tempfile.gettempdir(), "court_metriken")
+)
+# Spätestens nach so vielen Sekunden schreibt ein Prozess seinen Stand
+INTERVALL = float(os.getenv("METRIKEN_INTERVALL", "5"))
+# Wenn gesetzt, nur mit "Authorization: Bearer <token>" abrufbar
+TOKEN = os.getenv("METRIKEN_TOKEN", "")
+
+# Grenzen in Sekunden
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# name -> (typ, hilfe, buckets)
+METRIKEN = {
+    "court_http_requests_total": (
+        "counter", "Requests pro Endpoint, Methode und Status", None),
+    "court_http_request_dauer_sekunden": (
+        "histogram", "Dauer der Requests pro Endpoint", REQUEST_BUCKETS),
+    "court_db_abfrage_dauer_sekunden": (
+        "histogram", "Dauer der Abfragen pro SQL-Fingerprint (art=read|write)", DB_BUCKETS),
+    "court_db_pool_wartezeit_sekunden": (
+        "histogram", "Wartezeit auf eine Verbindung aus dem Pool", DB_BUCKETS),
+    "court_login_total": (
+        "counter", "Login-Versuche über auth.authenticate nach Ergebnis", None),
+}
+
+_lock = threading.Lock()
+_zaehler = {}       # (name, labels) -> Wert
+_histogramme = {}   # (name, labels) -> [zähler pro bucket..., +Inf, summe]
+_speichern_lock = threading.Lock()
+_gespeichert = 0.0
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def erhoehen(name, wert=1, **labels):
+    with _lock:
+        schluessel = (name, _labels(**labels))
+        _zaehler[schluessel] = _zaehler.get(schluessel, 0) + wert
+    _vielleicht_speichern()
+
+
+def beobachten(name, sekunden, **labels):
+    buckets = METRIKEN[name][2]
+    with _lock:
+        schluessel = (name, _labels(**labels))
+        werte = _histogramme.get(schluessel)
+        if werte is None:
+            werte = _histogramme[schluessel] = [0] * (len(buckets) + 1) + [0.0]
+        for i, grenze in enumerate(buckets):
+            if sekunden <= grenze:
+                werte[i] += 1
+                break
+        else:
+            werte[len(buckets)] += 1
+        werte[-1] += sekunden
+    _vielleicht_speichern()
+
+
+def login(erfolg, grund=None):
+    """Von auth.authenticate aufgerufen."""
+    erhoehen("court_login_total", ergebnis="erfolg" if erfolg else grund or "fehlschlag")
+
+
+# Speichern pro Prozess
+
+def _datei(pid):
+    return os.path.join(VERZEICHNIS, f"{pid}.json")
+
+
+def _stand():
+    with _lock:
+        stand = {
+            "pid": os.getpid(),
+            "zeit": time.time(),
+            "zaehler": [[name, list(labels), wert] for (name, labels), wert in _zaehler.items()],
+            "histogramme": [[name, list(labels), werte] for (name, labels), werte in _histogramme.items()],
+        }
+    stand["pool"] = db.pool_stats()
+    stand["caches"] = {name: c.stats() for name, c in cache.CACHES.items()}
+    return stand
+
+
+def speichern():
+    """Stand dieses Prozesses schreiben (atomar über eine temporäre Datei)."""
+    global _gespeichert
+    with _speichern_lock:
+        _gespeichert = time.monotonic()
+        try:
+            os.makedirs(VERZEICHNIS, exist_ok=True)
+            ziel = _datei(os.getpid())
+            tmp = f"{ziel}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(_stand(), f)
+            os.replace(tmp, ziel)
+        except Exception as e:
+            logger.warning("Metriken konnten nicht gespeichert werden: %s", e)
+
+
+def _vielleicht_speichern():
+    # Schreibt gerade ein anderer Thread, reicht dessen Stand
+    if time.monotonic() - _gespeichert >= INTERVALL and not _speichern_lock.locked():
+        speichern()
+
+
+def _laeuft(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _alle_staende():
+    speichern()
+    staende = []
+    for datei in sorted(os.listdir(VERZEICHNIS)):
+        if not datei.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(VERZEICHNIS, datei), encoding="utf-8") as f:
+                staende.append(json.load(f))
+        except (OSError, ValueError) as e:
+            # z.B. gerade von einem anderen Prozess ersetzt
+            logger.warning("Metriken aus %s nicht lesbar: %s", datei, e)
+    return staende
+
+
+# Ausgabe im Textformat
+
+def _wert(wert):
+    if isinstance(wert, float):
+        if math.isinf(wert):
+            return "+Inf"
+        return repr(wert)
+    return str(wert)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    teile = []
+    for name, wert in labels:
+        wert = str(wert).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        teile.append(f'{name}="{wert}"')
+    return "{" + ",".join(teile) + "}"
+
+
+def _kopf(zeilen, name, typ, hilfe):
+    zeilen.append(f"# HELP {name} {hilfe}")
+    zeilen.append(f"# TYPE {name} {typ}")
+
+
+def _einfach(zeilen, name, typ, hilfe, werte):
+    """werte: {labels: wert}"""
+    _kopf(zeilen, name, typ, hilfe)
+    for labels, wert in sorted(werte.items()):
+        zeilen.append(f"{name}{_label_text(labels)} {_wert(wert)}")
+
+
+def ausgabe():
+    """Alle Prozesse zusammengefasst als Prometheus-Text."""
+    staende = _alle_staende()
+    zaehler = {}
+    histogramme = {}
+    pool_zaehler = {}
+    pool_aktuell = {}
+    caches = {}
+    prozesse = 0
+
+    for stand in staende:
+        for name, labels, wert in stand.get("zaehler", []):
+            schluessel = (name, tuple(map(tuple, labels)))
+            zaehler[schluessel] = zaehler.get(schluessel, 0) + wert
+        for name, labels, werte in stand.get("histogramme", []):
+            schluessel = (name, tuple(map(tuple, labels)))
+            bisher = histogramme.get(schluessel)
+            histogramme[schluessel] = werte if bisher is None else [a + b for a, b in zip(bisher, werte)]
+
+        pool = stand.get("pool", {})
+        for feld in ("acquired", "exhausted", "created", "replaced", "wait_time_total"):
+            pool_zaehler[feld] = pool_zaehler.get(feld, 0) + pool.get(feld, 0)
+        for name, werte in stand.get("caches", {}).items():
+            summe = caches.setdefault(name, {"hits": 0, "misses": 0, "size": 0})
+            summe["hits"] += werte.get("hits", 0)
+            summe["misses"] += werte.get("misses", 0)
+
+        if not _laeuft(stand["pid"]):
+            continue
+        prozesse += 1
+        for feld in ("in_use", "idle", "size"):
+            pool_aktuell[feld] = pool_aktuell.get(feld, 0) + pool.get(feld, 0)
+        for name, werte in stand.get("caches", {}).items():
+            caches[name]["size"] += werte.get("size", 0)
+
+    zeilen = []
+    for name, (typ, hilfe, buckets) in METRIKEN.items():
+        if typ == "counter":
+            _einfach(zeilen, name, typ, hilfe, {
+                labels: wert for (n, labels), wert in zaehler.items() if n == name
+            })
+            continue
+        _kopf(zeilen, name, typ, hilfe)
+        for (n, labels), werte in sorted(histogramme.items()):
+            if n != name:
+                continue
+            kumuliert = 0
+            for grenze, anzahl in zip(buckets + (math.inf,), werte):
+                kumuliert += anzahl
+                zeilen.append(f"{name}_bucket{_label_text(labels + (('le', _wert(float(grenze))),))} {kumuliert}")
+            zeilen.append(f"{name}_sum{_label_text(labels)} {_wert(werte[-1])}")
+            zeilen.append(f"{name}_count{_label_text(labels)} {kumuliert}")
+
+    _einfach(zeilen, "court_prozesse", "gauge", "Laufende Prozesse mit Metriken", {(): prozesse})
+    _einfach(zeilen, "court_db_pool_verbindungen", "gauge",
+             "Verbindungen im Pool aller laufenden Prozesse (zustand=belegt|frei|groesse)", {
+                 (("zustand", "belegt"),): pool_aktuell.get("in_use", 0),
+                 (("zustand", "frei"),): pool_aktuell.get("idle", 0),
+                 (("zustand", "groesse"),): pool_aktuell.get("size", 0),
+             })
+    _einfach(zeilen, "court_db_pool_ausgaben_total", "counter",
+             "Aus dem Pool ausgegebene Verbindungen", {(): pool_zaehler.get("acquired", 0)})
+    _einfach(zeilen, "court_db_pool_erschoepft_total", "counter",
+             "Pool nach Timeout erschöpft (PoolTimeout)", {(): pool_zaehler.get("exhausted", 0)})
+    _einfach(zeilen, "court_db_pool_ersetzt_total", "counter",
+             "Ersetzte Verbindungen (kaputt oder zu alt)", {(): pool_zaehler.get("replaced", 0)})
+    _einfach(zeilen, "court_cache_treffer_total", "counter", "Cache-Treffer pro Cache", {
+        (("cache", name),): werte["hits"] for name, werte in caches.items()
+    })
+    _einfach(zeilen, "court_cache_fehlschlaege_total", "counter", "Cache-Fehlschläge pro Cache", {
+        (("cache", name),): werte["misses"] for name, werte in caches.items()
+    })
+    _einfach(zeilen, "court_cache_eintraege", "gauge", "Einträge pro Cache in laufenden Prozessen", {
+        (("cache", name),): werte["size"] for name, werte in caches.items()
+    })
+
+    try:
+        # Aus der Datenbank, daher nicht pro Prozess
+        import benachrichtigungen
+        outbox = benachrichtigungen.stats()
+    except Exception as e:
+        logger.warning("Outbox-Zahlen nicht verfügbar: %s", e)
+    else:
+        _einfach(zeilen, "court_benachrichtigungen", "gauge", "Einträge in der Outbox pro Status", {
+            (("status", status),): anzahl for status, anzahl in outbox.items()
+        })
+
+    return "\n".join(zeilen) + "\n"
+
+
+# Flask
+
+def _abfrage(sql, dauer_ms, zeilen):
+    verb = sql.split(None, 1)[0].upper() if sql.strip() else ""
+    art = "read" if verb in ("SELECT", "SHOW", "WITH") else "write"
+    beobachten("court_db_abfrage_dauer_sekunden", dauer_ms / 1000,
+               fingerprint=db.fingerprint(sql), art=art)
+
+
+def _pool_wartezeit(wartezeit_ms):
+    beobachten("court_db_pool_wartezeit_sekunden", wartezeit_ms / 1000)
+
+
+def _beginnen():
+    g.metriken_start = time.perf_counter()
+
+
+def _request(status):
+    start = g.pop("metriken_start", None)
+    if start is None:
+        return
+    endpoint = request.endpoint or "unbekannt"
+    erhoehen("court_http_requests_total", endpoint=endpoint, methode=request.method, status=status)
+    beobachten("court_http_request_dauer_sekunden", time.perf_counter() - start, endpoint=endpoint)
+
+
+def _auswerten(response):
+    _request(response.status_code)
+    return response
+
+
+def _beenden(exc=None):
+    # Nur noch gesetzt, wenn after_request wegen einer Exception nicht lief
+    if exc is not None:
+        _request(500)
+
+
+def antwort():
+    """Antwort für die Route /metrics in flask_app.py."""
+    if TOKEN and request.headers.get("Authorization", "") != f"Bearer {TOKEN}":
+        return Response("Nicht erlaubt\n", status=401, mimetype="text/plain")
+    return Response(ausgabe(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_app(app):
+    db.add_query_listener(_abfrage)
+    db.add_pool_listener(_pool_wartezeit)
+    app.before_request(_beginnen)
+    app.after_request(_auswerten)
+    app.teardown_request(_beenden)
+    atexit.register(speichern)
@@ -0,0 +1,102 @@
+"""
+Wendet die SQL-Migrationen aus db/migrations/ der Reihe nach an.
+
+    python migrate.py            alle ausstehenden Migrationen anwenden
+    python migrate.py --status   angewendete und ausstehende Migrationen anzeigen
+
+Angewendete Versionen stehen in der Tabelle schema_migrations.
+
+Mit DB_BACKEND=sqlite legt db.py das vollständige Schema aus db/sqlite.sql
+an; hier werden dann nur die Versionen als angewendet eingetragen.
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+import db
+from db import get_conn
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "migrations")
+
+# Fehler, die bedeuten, dass das Objekt schon existiert bzw. schon entfernt ist
+# (z.B. Migration von Hand ausgeführt)
+_SCHON_VORHANDEN = {"ER_DUP_KEYNAME", "ER_TABLE_EXISTS_ERROR", "ER_DUP_FIELDNAME", "ER_CANT_DROP_FIELD_OR_KEY"}
+
+
+def migrationen():
+    """Liste von (version, pfad), sortiert nach Version (Präfix des Dateinamens)."""
+    dateien = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f.split("_", 1)[0], os.path.join(MIGRATIONS_DIR, f)) for f in dateien]
+
+
+def statements(pfad):
+    """SQL-Datei in einzelne Statements zerlegen (Kommentarzeilen mit -- werden entfernt)."""
+    with open(pfad, encoding="utf-8") as f:
+        zeilen = [z for z in f if not z.strip().startswith("--")]
+    return [s.strip() for s in "".join(zeilen).split(";") if s.strip()]
+
+
+def _angewendet(cur):
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+               version VARCHAR(50) PRIMARY KEY,
+               angewendet_am DATETIME NOT NULL
+           )"""
+    )
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate():
+    if db.DB_BACKEND == "mysql":
+        from mysql.connector import errors, errorcode
+        schon_vorhanden = {getattr(errorcode, name) for name in _SCHON_VORHANDEN}
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        erledigt = _angewendet(cur)
+        for version, pfad in migrationen():
+            if version in erledigt:
+                continue
+            logger.info("Migration %s: %s", version, os.path.basename(pfad))
+            if db.DB_BACKEND == "mysql":
+                for sql in statements(pfad):
+                    try:
+                        cur.execute(sql)
+                    except errors.DatabaseError as e:
+                        if e.errno not in schon_vorhanden:
+                            raise
+                        logger.warning("Migration %s: übersprungen, bereits erledigt (%s)", version, e.msg)
+            # DDL committet in MySQL implizit, daher Version pro Datei festhalten
+            cur.execute(
+                "INSERT INTO schema_migrations (version, angewendet_am) VALUES (%s, %s)",
+                (version, datetime.now())
+            )
+            conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+
+
+def status():
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        erledigt = _angewendet(cur)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    for version, pfad in migrationen():
+        markierung = "x" if version in erledigt else " "
+        print(f"[{markierung}] {os.path.basename(pfad)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if "--status" in sys.argv[1:]:
+        status()
+    else:
+        migrate()
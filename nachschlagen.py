@@ -0,0 +1,106 @@
+"""
+Nachschlagen von Nutzern, Tennisplätzen und Wartungsarbeitern per ID, für die
+JSON-Endpunkte der Formulare. Mehrere IDs werden mit einer IN (...)-Abfrage
+geladen, einzelne Ergebnisse kurz im Prozess gemerkt (Eingabe beim Tippen).
+"""
+import os
+from cache import TTLCache
+from db import db_read
+
+MAX_IDS = 100
+MEMO_TTL = int(os.getenv("LOOKUP_MEMO_TTL", "10"))
+
+
+def _nutzer(row):
+    return {
+        "exists": True,
+        "vorname": row["vorname"] or "",
+        "nachname": row["nachname"] or "",
+        "geburtsdatum": str(row["geburtsdatum"]) if row.get("geburtsdatum") else "",
+        "email": row["email"] or ""
+    }
+
+
+def _tennisplatz(row):
+    return {
+        "exists": True,
+        "tid": row["tid"],
+        "tennisanlage": row["tennisanlage"] or "",
+        "platznummer": row["platznummer"] or "",
+        "belag": row["belag"] or "",
+        "wid": row["wid"] or "",
+        "wartung": str(row["datum_der_wartung"]) if row.get("datum_der_wartung") else ""
+    }
+
+
+def _wartungsarbeiter(row):
+    return {
+        "exists": True,
+        "wid": row["wid"],
+        "vorname": row["vorname"] or "",
+        "nachname": row["nachname"] or "",
+        "geburtsdatum": str(row["geburtsdatum"]) if row.get("geburtsdatum") else ""
+    }
+
+
+# art -> (ID-Spalte, SQL mit {} für die Platzhalter, Formatierung einer Zeile)
+ARTEN = {
+    "nutzer": (
+        "nid",
+        "SELECT nid, vorname, nachname, geburtsdatum, email FROM nutzer WHERE nid IN ({})",
+        _nutzer,
+    ),
+    "tennisplatz": (
+        "tid",
+        "SELECT tid, tennisanlage, platznummer, belag, wid, datum_der_wartung FROM tennisplatz WHERE tid IN ({})",
+        _tennisplatz,
+    ),
+    "wartungsarbeiter": (
+        "wid",
+        "SELECT wid, vorname, nachname, geburtsdatum FROM wartungsarbeiter WHERE wid IN ({})",
+        _wartungsarbeiter,
+    ),
+}
+
+_memo = {art: TTLCache(f"lookup_{art}", maxsize=1024, ttl=MEMO_TTL) for art in ARTEN}
+
+
+def lade(art, ids):
+    """{id: {"exists": True, ...} oder {"exists": False}} für alle ids."""
+    spalte, sql, formatieren = ARTEN[art]
+    memo = _memo[art]
+
+    ergebnis = {}
+    fehlend = []
+    for id_ in ids:
+        eintrag = memo.get(id_)
+        if eintrag is None:
+            fehlend.append(id_)
+        else:
+            ergebnis[id_] = eintrag
+
+    if fehlend:
+        version = memo.version
+        rows = db_read(sql.format(",".join(["%s"] * len(fehlend))), tuple(fehlend))
+        gefunden = {row[spalte]: formatieren(row) for row in rows or []}
+        for id_ in fehlend:
+            eintrag = gefunden.get(id_, {"exists": False})
+            memo.set(id_, eintrag, version=version)
+            ergebnis[id_] = eintrag
+    return ergebnis
+
+
+def parse_ids(text):
+    """"1,2,3" -> [1, 2, 3] (ohne Duplikate); ValueError bei ungültiger Eingabe."""
+    ids = list(dict.fromkeys(int(teil) for teil in text.split(",") if teil.strip()))
+    if not ids or len(ids) > MAX_IDS:
+        raise ValueError(f"Es sind 1 bis {MAX_IDS} IDs erlaubt.")
+    return ids
+
+
+def invalidiere(art, id_=None):
+    """Nach Schreibzugriffen auf die Tabelle aufrufen (mit id_: nur diese Zeile)."""
+    if id_ is None:
+        _memo[art].invalidate()
+    else:
+        _memo[art].invalidate(int(id_))
@@ -0,0 +1,176 @@
+"""
+Bestätigungen als PDF, serverseitig erzeugt (ersetzt jsPDF im Browser).
+
+Minimaler PDF-Schreiber ohne zusätzliche Abhängigkeit: eine A4-Seite, die
+Standardschriften Helvetica/Helvetica-Bold mit WinAnsiEncoding (Umlaute),
+Text und Linien. Koordinaten in mm von oben links wie bei jsPDF.
+
+Buchungsbestätigungen werden pro Buchungsnummer und Version (Hash der Daten
+und des Layouts) im Prozess gemerkt; die Version ist auch das ETag.
+"""
+import hashlib
+import os
+from datetime import date
+from cache import TTLCache
+import verfuegbarkeit
+
+# Bei Änderungen am Layout erhöhen, damit Cache und ETags nicht mehr passen
+LAYOUT_VERSION = 2
+
+_cache = TTLCache(
+    "pdf",
+    maxsize=int(os.getenv("PDF_CACHE_SIZE", "256")),
+    ttl=int(os.getenv("PDF_CACHE_TTL", "3600")),
+)
+
+_MM = 72 / 25.4
+_HOEHE = 842  # A4 in Punkt
+_BREITE = 595
+
+
+def _pdf_text(text):
+    text = str(text).encode("cp1252", errors="replace")
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class Dokument:
+    def __init__(self):
+        self._inhalt = []
+
+    def text(self, x, y, text, groesse=10, fett=False, grau=0.0, zentriert=False):
+        if zentriert:
+            # Helvetica ist im Mittel etwa eine halbe Schriftgröße breit
+            x -= len(str(text)) * groesse * 0.5 / _MM / 2
+        schrift = "F2" if fett else "F1"
+        self._inhalt.append(
+            b"BT /%s %d Tf %.2f g %.2f %.2f Td (%s) Tj ET"
+            % (schrift.encode(), groesse, grau, x * _MM, _HOEHE - y * _MM, _pdf_text(text))
+        )
+
+    def linie(self, x1, y1, x2, y2, grau=0.78):
+        self._inhalt.append(
+            b"%.2f G %.2f %.2f m %.2f %.2f l S"
+            % (grau, x1 * _MM, _HOEHE - y1 * _MM, x2 * _MM, _HOEHE - y2 * _MM)
+        )
+
+    def als_bytes(self):
+        inhalt = b"\n".join(self._inhalt)
+        objekte = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>" % (_BREITE, _HOEHE),
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(inhalt) + 1, inhalt),
+        ]
+        daten = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for nr, objekt in enumerate(objekte, 1):
+            offsets.append(len(daten))
+            daten += b"%d 0 obj\n%s\nendobj\n" % (nr, objekt)
+        xref = len(daten)
+        daten += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objekte) + 1)
+        for offset in offsets:
+            daten += b"%010d 00000 n \n" % offset
+        daten += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objekte) + 1, xref)
+        return bytes(daten)
+
+
+def _datum(wert):
+    # der Session-Store der Stornierung hält das Spieldatum als "YYYY-MM-DD"
+    if isinstance(wert, str):
+        wert = date.fromisoformat(wert)
+    return wert.strftime("%d.%m.%Y")
+
+
+def _uhrzeit(wert):
+    minuten = verfuegbarkeit.zeit_in_minuten(wert)
+    return f"{minuten // 60:02d}:{minuten % 60:02d}"
+
+
+def _bestaetigung(titel, abschnitt, daten, zeitpunkt_titel=None, zeitpunkt=None):
+    """Gemeinsames Layout von Buchungs- und Stornierungsbestätigung (wie bisher mit jsPDF)."""
+    doc = Dokument()
+    doc.text(105, 25, "cour+", groesse=20, fett=True, zentriert=True)
+    doc.text(105, 32, "Tennisplatz-Buchungssystem", zentriert=True)
+    doc.linie(20, 38, 190, 38)
+    doc.text(20, 50, titel, groesse=16, fett=True)
+    doc.text(20, 58, f"Buchungsnummer: {daten['buchungsnummer']}", groesse=11, fett=True)
+
+    y = 73
+    doc.text(20, y, "Personalien", fett=True)
+    y += 9
+    personalien = [
+        ("Name:", f"{daten['vorname']} {daten['nachname']}"),
+        ("Nutzer-ID:", daten["nid"]),
+        ("E-Mail:", daten["email"] or ""),
+    ]
+    if daten.get("geburtsdatum"):
+        personalien.append(("Geburtsdatum:", _datum(daten["geburtsdatum"])))
+    for label, wert in personalien:
+        doc.text(25, y, label)
+        doc.text(75, y, wert)
+        y += 7
+
+    y += 7
+    doc.text(20, y, abschnitt, fett=True)
+    y += 9
+    for label, wert in [
+        ("Tennisanlage:", daten["tennisanlage"]),
+        ("Platznummer:", f"Platz {daten['platznummer']}"),
+        ("Spieldatum:", _datum(daten["spieldatum"])),
+        ("Spielzeit:", f"{_uhrzeit(daten['spielbeginn'])} - {_uhrzeit(daten['spielende'])} Uhr"),
+    ]:
+        doc.text(25, y, label)
+        doc.text(75, y, wert)
+        y += 7
+
+    if zeitpunkt:
+        y += 7
+        doc.text(20, y, zeitpunkt_titel, fett=True)
+        doc.text(25, y + 9, zeitpunkt)
+
+    doc.text(105, 280, "Tennisverein Musterstadt · Musterstraße 1 · 12345 Musterstadt",
+             groesse=8, grau=0.4, zentriert=True)
+    return doc.als_bytes()
+
+
+# zeitpunkt (Zeitpunkt der Buchung) steht nicht in der DB, sondern kommt aus dem
+# Session-Store der Bestätigungsseite; fehlt er, entfällt der Abschnitt
+BUCHUNG_FELDER = [
+    "buchungsnummer", "nid", "vorname", "nachname", "email", "geburtsdatum",
+    "tennisanlage", "platznummer", "spieldatum", "spielbeginn", "spielende", "zeitpunkt",
+]
+
+
+def version(buchung):
+    """Kurzer Hash über die angezeigten Daten und das Layout."""
+    teile = [str(LAYOUT_VERSION)] + [str(buchung.get(feld)) for feld in BUCHUNG_FELDER]
+    return hashlib.sha1("|".join(teile).encode("utf-8")).hexdigest()[:16]
+
+
+def buchungsbestaetigung(buchung):
+    """
+    PDF-Bytes für eine Buchung (Zeile mit BUCHUNG_FELDER).
+    Rückgabe: (bytes, version); gleiche Version -> Bytes aus dem Cache.
+    """
+    v = version(buchung)
+    eintrag = _cache.get(buchung["buchungsnummer"])
+    if eintrag and eintrag[0] == v:
+        return eintrag[1], v
+    daten = _bestaetigung("Buchungsbestätigung", "Buchungsdetails", buchung,
+                          "Zeitpunkt der Buchung", buchung.get("zeitpunkt"))
+    _cache.set(buchung["buchungsnummer"], (v, daten))
+    return daten, v
+
+
+def stornierungsbestaetigung(daten, zeitpunkt=None):
+    """PDF-Bytes aus den Bestätigungsdaten im Session-Store (wird nicht gecacht)."""
+    return _bestaetigung("Stornierungsbestätigung", "Stornierte Buchung", daten,
+                         "Zeitpunkt der Stornierung", zeitpunkt)
+
+
+def invalidiere(buchungsnummer):
+    """Nach dem Stornieren einer Buchung aufrufen."""
+    _cache.invalidate(int(buchungsnummer))
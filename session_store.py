@@ -0,0 +1,108 @@
+"""
+Serverseitiger Speicher für Bestätigungsdaten (Buchung, Stornierung).
+In der Cookie-Session liegt nur noch ein zufälliges Token.
+
+Backend über .env wählbar: SESSION_STORE=mysql (Standard, Tabelle session_store
+über db.py, also auch mit DB_BACKEND=sqlite) oder memory. "memory" gilt nur pro
+Worker-Prozess und taugt nur, wenn die App in einem einzigen Prozess läuft.
+
+Die Daten bleiben bis zum Ablauf erhalten, weil die PDF-Downloads auf den
+Bestätigungsseiten sie noch brauchen.
+"""
+import json
+import logging
+import os
+import random
+import secrets
+from datetime import datetime, timedelta
+from cache import TTLCache
+from db import db_read, db_write
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE = os.getenv("SESSION_STORE", "mysql")
+SESSION_STORE_TTL = int(os.getenv("SESSION_STORE_TTL", "3600"))
+
+
+class MemoryStore:
+    """LRU im Prozess, Einträge verfallen nach ttl Sekunden."""
+
+    def __init__(self, ttl, name="session_store"):
+        self._cache = TTLCache(
+            name,
+            maxsize=int(os.getenv("SESSION_STORE_SIZE", "1024")),
+            ttl=ttl,
+        )
+
+    def put(self, token, daten):
+        self._cache.set(token, daten)
+
+    def get(self, token):
+        return self._cache.get(token)
+
+
+class MySQLStore:
+    """Tabelle session_store (siehe db/migrations/003_session_store.sql)."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def put(self, token, daten):
+        jetzt = datetime.now()
+        db_write(
+            "INSERT INTO session_store (token, daten, ablauf) VALUES (%s, %s, %s)",
+            (token, json.dumps(daten), jetzt + timedelta(seconds=self.ttl))
+        )
+        # Abgelaufene Einträge gelegentlich aufräumen statt bei jedem Schreiben
+        if random.random() < 0.01:
+            db_write("DELETE FROM session_store WHERE ablauf < %s", (jetzt,))
+
+    def get(self, token):
+        row = db_read(
+            "SELECT daten FROM session_store WHERE token = %s AND ablauf > %s",
+            (token, datetime.now()),
+            single=True
+        )
+        return json.loads(row["daten"]) if row else None
+
+
+BACKENDS = {
+    "memory": MemoryStore,
+    "mysql": MySQLStore,
+}
+
+store = BACKENDS[SESSION_STORE](SESSION_STORE_TTL)
+
+# Nur wenn store.put fehlschlägt: dann ist die Bestätigung wenigstens in diesem Prozess abrufbar
+_notfall = None
+
+
+def speichern(daten):
+    """
+    Speichert daten (JSON-fähig) und liefert das Token dafür.
+    Aufgerufen nach dem Commit der Buchung, darf also nicht mit einer Exception enden.
+    """
+    global _notfall
+    token = secrets.token_urlsafe(32)
+    try:
+        store.put(token, daten)
+    except Exception:
+        logger.exception("Fehler beim Speichern im Session-Store, Daten nur in diesem Prozess")
+        if _notfall is None:
+            _notfall = MemoryStore(SESSION_STORE_TTL, name="session_store_notfall")
+        _notfall.put(token, daten)
+    return token
+
+
+def laden(token):
+    """Daten zum Token oder None (unbekannt oder abgelaufen)."""
+    if not token:
+        return None
+    try:
+        daten = store.get(token)
+    except Exception:
+        logger.exception("Fehler beim Laden aus dem Session-Store")
+        daten = None
+    if daten is None and _notfall is not None:
+        daten = _notfall.get(token)
+    return daten
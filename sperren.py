@@ -0,0 +1,149 @@
+"""
+Wartungssperren (Tabelle wartungssperre): Zeiträume, in denen ein Platz nicht
+gebucht werden kann.
+
+Alle laufenden und künftigen Sperren werden einmal geladen und pro Platz als
+Intervall-Index im Prozess gehalten, buchen() und die Verfügbarkeit fragen
+also nur den Speicher. Änderungen in tennisplätze() rufen invalidiere() auf;
+andere Worker-Prozesse sehen sie spätestens nach SPERREN_CACHE_TTL Sekunden.
+"""
+import os
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from cache import TTLCache
+from db import db_read, db_write
+import verfuegbarkeit
+
+_kalender = TTLCache("sperren", maxsize=1, ttl=int(os.getenv("SPERREN_CACHE_TTL", "60")))
+
+
+class Intervalle:
+    """
+    Sperren eines Platzes, sortiert nach Beginn, dazu das laufende Maximum der
+    Enden. Alle Sperren mit Beginn < bis liegen links von bisect_left(bis); von
+    dort rückwärts kann abgebrochen werden, sobald kein früheres Ende mehr nach
+    von liegt. Abfrage in O(log n + Treffer).
+    """
+
+    def __init__(self, sperren):
+        self._sperren = sorted(sperren, key=lambda s: s["von"])
+        self._von = [s["von"] for s in self._sperren]
+        self._max_bis = []
+        maximum = None
+        for s in self._sperren:
+            maximum = s["bis"] if maximum is None or s["bis"] > maximum else maximum
+            self._max_bis.append(maximum)
+
+    def ueberschneidungen(self, von, bis):
+        """Alle Sperren, die [von, bis) überschneiden, nach Beginn sortiert."""
+        treffer = []
+        i = bisect_left(self._von, bis)
+        while i > 0:
+            i -= 1
+            if self._max_bis[i] <= von:
+                break
+            if self._sperren[i]["bis"] > von:
+                treffer.append(self._sperren[i])
+        treffer.reverse()
+        return treffer
+
+    def __len__(self):
+        return len(self._sperren)
+
+
+def _lade_kalender():
+    rows = db_read(
+        "SELECT sid, tid, von, bis, grund FROM wartungssperre WHERE bis > %s",
+        (datetime.now(),)
+    ) or []
+    nach_tid = {}
+    for row in rows:
+        nach_tid.setdefault(row["tid"], []).append(row)
+    return {tid: Intervalle(sperren) for tid, sperren in nach_tid.items()}
+
+
+def kalender():
+    """{tid: Intervalle} aller laufenden und künftigen Sperren"""
+    return _kalender.get_or_load("kalender", _lade_kalender)
+
+
+def _als_datum(spieldatum):
+    return date.fromisoformat(spieldatum) if isinstance(spieldatum, str) else spieldatum
+
+
+def _zeitpunkt(spieldatum, zeit):
+    minuten = verfuegbarkeit.zeit_in_minuten(zeit)
+    return datetime.combine(_als_datum(spieldatum), time()) + timedelta(minutes=minuten)
+
+
+def sperre_fuer(tid, spieldatum, beginn, ende):
+    """Erste Sperre, die die Buchung tid/spieldatum/beginn-ende verhindert, sonst None."""
+    intervalle = kalender().get(int(tid))
+    if not intervalle:
+        return None
+    treffer = intervalle.ueberschneidungen(_zeitpunkt(spieldatum, beginn), _zeitpunkt(spieldatum, ende))
+    return treffer[0] if treffer else None
+
+
+def maske(tid, spieldatum):
+    """Bitmaske der gesperrten Slots (wie verfuegbarkeit.belegung) eines Platzes an einem Tag."""
+    intervalle = kalender().get(int(tid))
+    if not intervalle:
+        return 0
+    tag_beginn = datetime.combine(_als_datum(spieldatum), time())
+    tag_ende = tag_beginn + timedelta(days=1)
+    ergebnis = 0
+    for sperre in intervalle.ueberschneidungen(tag_beginn, tag_ende):
+        von = max(sperre["von"], tag_beginn) - tag_beginn
+        bis = min(sperre["bis"], tag_ende) - tag_beginn
+        ergebnis |= verfuegbarkeit.slot_maske(von, bis)
+    return ergebnis
+
+
+def liste():
+    """Laufende und künftige Sperren mit Platzangaben, für die Verwaltung."""
+    return db_read(
+        """SELECT s.sid, s.tid, s.von, s.bis, s.grund, t.tennisanlage, t.platznummer
+           FROM wartungssperre s
+           JOIN tennisplatz t ON s.tid = t.tid
+           WHERE s.bis > %s
+           ORDER BY s.von, s.sid""",
+        (datetime.now(),)
+    ) or []
+
+
+def betroffene_buchungen(tid, von, bis):
+    """Bestehende Buchungen des Platzes, die in [von, bis) liegen."""
+    rows = db_read(
+        """SELECT buchungsnummer, spieldatum, spielbeginn, spielende FROM buchung
+           WHERE tid = %s AND spieldatum BETWEEN %s AND %s""",
+        (tid, von.date(), bis.date())
+    ) or []
+    return [
+        row for row in rows
+        if _zeitpunkt(row["spieldatum"], row["spielbeginn"]) < bis
+        and _zeitpunkt(row["spieldatum"], row["spielende"]) > von
+    ]
+
+
+def anlegen(tid, von, bis, grund):
+    sid = db_write(
+        "INSERT INTO wartungssperre (tid, von, bis, grund) VALUES (%s, %s, %s, %s)",
+        (tid, von, bis, grund or None)
+    )
+    invalidiere()
+    return sid
+
+
+def aufheben(sid):
+    row = db_read("SELECT sid FROM wartungssperre WHERE sid = %s", (sid,), single=True)
+    if not row:
+        return False
+    db_write("DELETE FROM wartungssperre WHERE sid = %s", (sid,))
+    invalidiere()
+    return True
+
+
+def invalidiere():
+    """Nach jeder Änderung an wartungssperre oder tennisplatz aufrufen."""
+    _kalender.invalidate()
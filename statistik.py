@@ -0,0 +1,247 @@
+"""
+Auslastung aus der Tabelle buchung_tagesstatistik (pro Platz, Tag und Stunde).
+
+Die Tabelle wird von buchungen.py in derselben Transaktion wie die Buchung
+bzw. Stornierung fortgeschrieben. Die Auswertungen lesen nur die Aggregate,
+nie die einzelnen Buchungen.
+
+    python statistik.py --neu-aufbauen                  alles aus buchung neu berechnen
+    python statistik.py --neu-aufbauen 2025-01-01 2025-12-31   nur diesen Zeitraum
+"""
+import logging
+import sys
+from collections import defaultdict
+from itertools import groupby
+from datetime import date, timedelta
+from db import db_read, db_stream, db_transaction
+import katalog
+import verfuegbarkeit
+
+logger = logging.getLogger(__name__)
+
+STUNDEN = list(range(verfuegbarkeit.OEFFNUNG_MINUTEN // 60, verfuegbarkeit.SCHLIESSUNG_MINUTEN // 60))
+MINUTEN_PRO_TAG = verfuegbarkeit.SCHLIESSUNG_MINUTEN - verfuegbarkeit.OEFFNUNG_MINUTEN
+MAX_TAGE = 366
+NEU_AUFBAUEN_BATCH = 5000
+
+_STATISTIK_INSERT = (
+    "INSERT INTO buchung_tagesstatistik (tid, spieldatum, stunde, buchungen, minuten) VALUES (%s,%s,%s,%s,%s)"
+)
+
+
+def stundenanteile(beginn, ende):
+    """{stunde: belegte Minuten} für eine Buchung, z.B. 9:30-10:30 -> {9: 30, 10: 30}"""
+    von = verfuegbarkeit.zeit_in_minuten(beginn)
+    bis = verfuegbarkeit.zeit_in_minuten(ende)
+    anteile = {}
+    while von < bis:
+        stunde = von // 60
+        naechste = min((stunde + 1) * 60, bis)
+        anteile[stunde] = naechste - von
+        von = naechste
+    return anteile
+
+
+def _deltas(termine, beginn, ende, faktor):
+    """{(datum, stunde): (buchungen, minuten)}; die Buchung zählt in ihrer Startstunde."""
+    anteile = stundenanteile(beginn, ende)
+    start = verfuegbarkeit.zeit_in_minuten(beginn) // 60
+    deltas = {}
+    for datum in termine:
+        for stunde, minuten in anteile.items():
+            deltas[(datum, stunde)] = (faktor if stunde == start else 0, faktor * minuten)
+    return deltas
+
+
+def _aendern(tx, tid, deltas):
+    """
+    Addiert deltas auf die Zeilen eines Platzes. Vorhandene Zeilen werden mit
+    UPDATE fortgeschrieben, fehlende mit INSERT angelegt. Der Aufrufer hält die
+    Sperre auf den Platz, parallele Änderungen derselben Zeilen gibt es nicht.
+    """
+    if not deltas:
+        return
+    daten = sorted({datum for datum, _ in deltas})
+    vorhanden = {
+        (str(row["spieldatum"]), row["stunde"])
+        for row in tx.read(
+            """SELECT spieldatum, stunde FROM buchung_tagesstatistik
+               WHERE tid = %s AND spieldatum BETWEEN %s AND %s""",
+            (tid, daten[0], daten[-1])
+        )
+    }
+    updates = []
+    inserts = []
+    for (datum, stunde), (anzahl, minuten) in deltas.items():
+        if (str(datum), stunde) in vorhanden:
+            updates.append((anzahl, minuten, tid, datum, stunde))
+        else:
+            inserts.append((tid, datum, stunde, anzahl, minuten))
+    tx.write_many(
+        """UPDATE buchung_tagesstatistik SET buchungen = buchungen + %s, minuten = minuten + %s
+           WHERE tid = %s AND spieldatum = %s AND stunde = %s""",
+        updates
+    )
+    tx.write_many(_STATISTIK_INSERT, inserts)
+
+
+def erfasse(tx, tid, termine, beginn, ende):
+    """Neue Buchung(en) desselben Platzes und derselben Zeit an termine (Liste von date) zählen."""
+    _aendern(tx, tid, _deltas(termine, beginn, ende, 1))
+
+
+def entferne(tx, tid, spieldatum, beginn, ende):
+    """Stornierte Buchung abziehen."""
+    _aendern(tx, tid, _deltas([spieldatum], beginn, ende, -1))
+
+
+def neu_aufbauen(von=None, bis=None):
+    """
+    Berechnet die Statistik für von..bis (ohne Angabe: alles) aus buchung neu.
+    Die Buchungen werden nach Platz und Tag sortiert gestreamt (Index
+    idx_buchung_verfuegbarkeit), im Speicher liegt nur ein Platz-Tag und ein
+    Block von NEU_AUFBAUEN_BATCH Zeilen; so geht das auch bei Millionen Buchungen.
+
+    Zuerst werden alle Platzzeilen gesperrt, wie es buche() und die Stornierung
+    für ihren Platz tun (_aendern). Buchungen und Stornierungen warten also, bis
+    der Neuaufbau committet ist, und zählen danach auf die neuen Zeilen; der
+    Stream liest erst nach der Sperre und sieht damit alle vorher committeten
+    Buchungen. Dauert ein Neuaufbau länger als der Lock-Timeout der Datenbank
+    (MySQL: innodb_lock_wait_timeout), schlagen wartende Buchungen fehl: große
+    Neuaufbauten außerhalb der Buchungszeiten oder pro Zeitraum laufen lassen.
+    """
+    bedingungen = []
+    params = []
+    if von:
+        bedingungen.append("spieldatum >= %s")
+        params.append(von)
+    if bis:
+        bedingungen.append("spieldatum <= %s")
+        params.append(bis)
+    where = " WHERE " + " AND ".join(bedingungen) if bedingungen else ""
+
+    zeilen = 0
+    with db_transaction() as tx:
+        tx.read("SELECT tid FROM tennisplatz ORDER BY tid FOR UPDATE")
+        tx.write(f"DELETE FROM buchung_tagesstatistik{where}", tuple(params))
+        block = []
+        buchungen = db_stream(
+            f"SELECT tid, spieldatum, spielbeginn, spielende FROM buchung{where} ORDER BY tid, spieldatum",
+            tuple(params)
+        )
+        for (tid, _), gruppe in groupby(buchungen, key=lambda row: (row["tid"], row["spieldatum"])):
+            summen = defaultdict(lambda: [0, 0])
+            for row in gruppe:
+                for (datum, stunde), (anzahl, minuten) in _deltas(
+                    [row["spieldatum"]], row["spielbeginn"], row["spielende"], 1
+                ).items():
+                    eintrag = summen[(datum, stunde)]
+                    eintrag[0] += anzahl
+                    eintrag[1] += minuten
+            block.extend((tid, datum, stunde, anzahl, minuten) for (datum, stunde), (anzahl, minuten) in summen.items())
+            if len(block) >= NEU_AUFBAUEN_BATCH:
+                zeilen += tx.write_many(_STATISTIK_INSERT, block)
+                block = []
+        zeilen += tx.write_many(_STATISTIK_INSERT, block)
+    logger.info("Statistik neu aufgebaut: %s Zeilen", zeilen)
+    return zeilen
+
+
+def _anteil(minuten, kapazitaet):
+    return round(minuten / kapazitaet, 4) if kapazitaet else 0.0
+
+
+def auswertung(von, bis, anlage=None):
+    """
+    Auslastung im Zeitraum von..bis (date, inklusive), optional nur eine Anlage.
+    Auslastung = belegte Minuten / verfügbare Minuten (7-20 Uhr pro Platz und Tag).
+    """
+    tage = (bis - von).days + 1
+    plaetze = [p for p in katalog.get_katalog()["plaetze"] if not anlage or p["tennisanlage"] == anlage]
+    tids = [p["tid"] for p in plaetze]
+    if not tids:
+        return {"von": von.isoformat(), "bis": bis.isoformat(), "plaetze": [], "anlagen": [], "stunden": [], "heatmap": []}
+    platzhalter = ",".join(["%s"] * len(tids))
+
+    pro_platz = {
+        row["tid"]: row
+        for row in db_read(
+            f"""SELECT tid, SUM(buchungen) AS buchungen, SUM(minuten) AS minuten
+                FROM buchung_tagesstatistik
+                WHERE tid IN ({platzhalter}) AND spieldatum BETWEEN %s AND %s
+                GROUP BY tid""",
+            (*tids, von, bis)
+        ) or []
+    }
+    # pro Tag und Stunde summiert, den Wochentag rechnen wir hier aus (portabel, max. 366 * 13 Zeilen)
+    pro_tag_stunde = db_read(
+        f"""SELECT spieldatum, stunde, SUM(minuten) AS minuten
+            FROM buchung_tagesstatistik
+            WHERE tid IN ({platzhalter}) AND spieldatum BETWEEN %s AND %s
+            GROUP BY spieldatum, stunde""",
+        (*tids, von, bis)
+    ) or []
+
+    ergebnis_plaetze = []
+    anlagen = {}
+    for p in plaetze:
+        row = pro_platz.get(p["tid"], {})
+        buchungen = int(row.get("buchungen") or 0)
+        minuten = int(row.get("minuten") or 0)
+        ergebnis_plaetze.append({
+            "tid": p["tid"],
+            "tennisanlage": p["tennisanlage"],
+            "platznummer": p["platznummer"],
+            "buchungen": buchungen,
+            "minuten": minuten,
+            "auslastung": _anteil(minuten, tage * MINUTEN_PRO_TAG),
+        })
+        summe = anlagen.setdefault(p["tennisanlage"], {"tennisanlage": p["tennisanlage"], "plaetze": 0, "buchungen": 0, "minuten": 0})
+        summe["plaetze"] += 1
+        summe["buchungen"] += buchungen
+        summe["minuten"] += minuten
+    for summe in anlagen.values():
+        summe["auslastung"] = _anteil(summe["minuten"], summe["plaetze"] * tage * MINUTEN_PRO_TAG)
+
+    # Anzahl jedes Wochentags im Zeitraum (Kapazität der Heatmap-Zellen)
+    wochentage = [0] * 7
+    for i in range(tage):
+        wochentage[(von + timedelta(days=i)).weekday()] += 1
+
+    pro_stunde = dict.fromkeys(STUNDEN, 0)
+    heatmap = [dict.fromkeys(STUNDEN, 0) for _ in range(7)]
+    for row in pro_tag_stunde:
+        datum = row["spieldatum"]
+        if isinstance(datum, str):
+            datum = date.fromisoformat(datum)
+        stunde = int(row["stunde"])
+        if stunde not in pro_stunde:
+            continue
+        pro_stunde[stunde] += int(row["minuten"])
+        heatmap[datum.weekday()][stunde] += int(row["minuten"])
+
+    return {
+        "von": von.isoformat(),
+        "bis": bis.isoformat(),
+        "plaetze": ergebnis_plaetze,
+        "anlagen": sorted(anlagen.values(), key=lambda a: a["tennisanlage"]),
+        "stunden": [
+            {"stunde": s, "minuten": m, "auslastung": _anteil(m, tage * len(tids) * 60)}
+            for s, m in pro_stunde.items()
+        ],
+        "heatmap": [
+            [_anteil(heatmap[w][s], wochentage[w] * len(tids) * 60) for s in STUNDEN]
+            for w in range(7)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    argumente = sys.argv[1:]
+    if not argumente or argumente[0] != "--neu-aufbauen":
+        print(__doc__)
+        sys.exit(1)
+    von = date.fromisoformat(argumente[1]) if len(argumente) > 1 else None
+    bis = date.fromisoformat(argumente[2]) if len(argumente) > 2 else None
+    neu_aufbauen(von, bis)
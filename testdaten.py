@@ -0,0 +1,336 @@
+"""
+Erzeugt große, realistische Testdatenmengen (deterministisch über --seed).
+
+    python testdaten.py --leeren                       Skala 1: ~30 Anlagen, ~240 Plätze,
+                                                       200 000 Nutzer, 2 Mio. Buchungen
+    python testdaten.py --leeren --skala 0.01          klein, für die Entwicklung
+    python testdaten.py --leeren --nutzer 500000 --buchungen 5000000 --load-data
+
+Gleicher Seed, gleiche Parameter und gleicher --stichtag ergeben dieselben
+Daten. Buchungen liegen von --tage-zurueck Tagen vor bis --tage-voraus Tage
+nach dem Stichtag, überschneiden sich pro Platz nicht und häufen sich wie
+im echten Betrieb: werktags am Abend, am Wochenende über Mittag, in der
+Zukunft immer weniger.
+
+Geschrieben wird mit mehrzeiligen INSERTs (--batch Zeilen pro Statement und
+Transaktion), mit --load-data für Nutzer und Buchungen per LOAD DATA LOCAL
+INFILE (nur MySQL, local_infile muss am Server erlaubt sein). Danach wird
+buchung_tagesstatistik neu aufgebaut.
+
+--leeren löscht vorher alle Nutzer, Wartungsarbeiter, Plätze, Buchungen,
+Sperren, Statistik und Benachrichtigungen (die Logins in users bleiben).
+"""
+import argparse
+import csv
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+import db
+from db import db_read, db_stream, db_transaction
+import statistik
+import verfuegbarkeit
+
+logger = logging.getLogger(__name__)
+
+# Mengen bei --skala 1
+SKALA_1 = {
+    "anlagen": 30,
+    "wartungsarbeiter": 40,
+    "nutzer": 200_000,
+    "buchungen": 2_000_000,
+}
+PLAETZE_PRO_ANLAGE = (4, 12)
+EMAIL_DOMAIN = "testdaten.example"
+
+VORNAMEN = [
+    "Anna", "Ben", "Clara", "David", "Elena", "Felix", "Greta", "Hannes", "Ida", "Jonas",
+    "Katharina", "Lukas", "Mia", "Noah", "Olivia", "Paul", "Quirin", "Rosa", "Simon", "Tina",
+    "Ulrich", "Vera", "Walter", "Xenia", "Yannik", "Zoe", "Lea", "Luca", "Nina", "Tim",
+    "Sophie", "Leon", "Marie", "Finn", "Laura", "Elias", "Julia", "Max", "Sarah", "Jan",
+]
+NACHNAMEN = [
+    "Müller", "Meier", "Schmid", "Keller", "Weber", "Huber", "Schneider", "Meyer", "Steiner", "Fischer",
+    "Gerber", "Brunner", "Baumann", "Frei", "Zimmermann", "Moser", "Widmer", "Wyss", "Graf", "Roth",
+    "Suter", "Baumgartner", "Bachmann", "Studer", "Berger", "Kälin", "Hofmann", "Lehmann", "Schwarz", "Sonne",
+]
+ORTE = [
+    "Kleinberg", "Tannwald", "Seefeld", "Birkenau", "Eichbühl", "Lindenhof", "Rosental", "Bergli",
+    "Mühlbach", "Sonnenberg", "Wiesental", "Buchholz", "Steinach", "Erlen", "Grünau", "Hasliberg",
+    "Kirchberg", "Moosbrunn", "Oberwil", "Riedikon", "Schönau", "Talacker", "Unterdorf", "Waldegg",
+    "Ahornweg", "Brühl", "Dornach", "Felsenau", "Horw", "Ittingen",
+]
+ANLAGEN_ARTEN = ["Tennis Club", "Tennisclub", "TC", "Tennisanlage", "Sportzentrum"]
+BELAEGE = [("Sand", 50), ("hart", 25), ("Kunstrasen", 15), ("Rasen", 5), ("Teppich", 5)]
+
+# Beliebtheit der Startzeiten pro 30-Minuten-Slot ab 7:00 (26 Slots bis 20:00)
+_WERKTAG = [2, 2, 2, 2, 2, 2, 3, 3, 5, 5, 6, 6, 4, 4, 3, 3, 4, 4, 7, 7, 10, 10, 10, 10, 8, 8]
+_WOCHENENDE = [1, 1, 3, 3, 6, 6, 9, 9, 10, 10, 9, 9, 8, 8, 8, 8, 7, 7, 6, 6, 4, 4, 3, 3, 2, 2]
+# Relative Auslastung Mo..So
+_WOCHENTAG_FAKTOR = [0.8, 0.85, 0.9, 0.9, 1.0, 1.3, 1.2]
+
+
+def _kumuliert(gewichte):
+    summe = 0
+    ergebnis = []
+    for g in gewichte:
+        summe += g
+        ergebnis.append(summe)
+    return ergebnis
+
+
+# Lader
+class InsertLader:
+    """Mehrzeilige INSERTs über Transaktion.write_many, eine Transaktion pro Block."""
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    def laden(self, tabelle, spalten, zeilen):
+        sql = f"INSERT INTO {tabelle} ({', '.join(spalten)}) VALUES ({', '.join(['%s'] * len(spalten))})"
+        anzahl = 0
+        block = []
+        for zeile in zeilen:
+            block.append(zeile)
+            if len(block) >= self.batch:
+                anzahl += self._schreiben(sql, block)
+                block = []
+                if anzahl % (self.batch * 50) == 0:
+                    logger.info("%s: %s Zeilen", tabelle, anzahl)
+        anzahl += self._schreiben(sql, block)
+        return anzahl
+
+    def _schreiben(self, sql, block):
+        if not block:
+            return 0
+        with db_transaction() as tx:
+            tx.write_many(sql, block)
+        return len(block)
+
+
+class LoadDataLader(InsertLader):
+    """LOAD DATA LOCAL INFILE über eine CSV-Datei pro Block (nur MySQL)."""
+
+    def laden(self, tabelle, spalten, zeilen):
+        anzahl = 0
+        block = []
+        for zeile in zeilen:
+            block.append(zeile)
+            if len(block) >= self.batch:
+                anzahl += self._datei_laden(tabelle, spalten, block)
+                block = []
+                logger.info("%s: %s Zeilen", tabelle, anzahl)
+        if block:
+            anzahl += self._datei_laden(tabelle, spalten, block)
+        return anzahl
+
+    def _datei_laden(self, tabelle, spalten, block):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False) as f:
+            writer = csv.writer(f, lineterminator="\n")
+            for zeile in block:
+                writer.writerow(["\\N" if wert is None else wert for wert in zeile])
+            pfad = f.name
+        try:
+            # Eigene Verbindung: local_infile muss beim Verbinden erlaubt werden
+            import mysql.connector
+            conn = mysql.connector.connect(**db.DB_CONFIG, allow_local_infile=True)
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    f"""LOAD DATA LOCAL INFILE %s INTO TABLE {tabelle}
+                        CHARACTER SET utf8mb4
+                        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                        LINES TERMINATED BY '\\n'
+                        ({', '.join(spalten)})""",
+                    (pfad,)
+                )
+                conn.commit()
+                cur.close()
+            finally:
+                conn.close()
+        finally:
+            os.remove(pfad)
+        return len(block)
+
+
+# Erzeugung
+class Generator:
+    def __init__(self, seed, stichtag, tage_zurueck, tage_voraus):
+        self.rng = random.Random(seed)
+        self.stichtag = stichtag
+        self.erster_tag = stichtag - timedelta(days=tage_zurueck)
+        self.letzter_tag = stichtag + timedelta(days=tage_voraus)
+
+    def _geburtsdatum(self, min_alter, max_alter):
+        tage = self.rng.randint(min_alter * 365, max_alter * 365)
+        return self.stichtag - timedelta(days=tage)
+
+    def wartungsarbeiter(self, anzahl):
+        gesehen = set()
+        while len(gesehen) < anzahl:
+            person = (self.rng.choice(VORNAMEN), self.rng.choice(NACHNAMEN), self._geburtsdatum(20, 64))
+            if person not in gesehen:
+                gesehen.add(person)
+                yield person
+
+    def anlagen(self, anzahl):
+        namen = []
+        for i in range(anzahl):
+            ort = ORTE[i % len(ORTE)]
+            art = ANLAGEN_ARTEN[self.rng.randrange(len(ANLAGEN_ARTEN))]
+            runde = i // len(ORTE)
+            namen.append(f"{art} {ort}" + (f" {runde + 1}" if runde else ""))
+        return namen
+
+    def tennisplaetze(self, anlagen, wids):
+        belaege = [b for b, _ in BELAEGE]
+        gewichte = [g for _, g in BELAEGE]
+        for anlage in anlagen:
+            wid = self.rng.choice(wids)
+            belag = self.rng.choices(belaege, gewichte)[0]
+            for nummer in range(1, self.rng.randint(*PLAETZE_PRO_ANLAGE) + 1):
+                # meist ein Belag und ein Wartungsarbeiter pro Anlage
+                yield (
+                    anlage,
+                    nummer,
+                    belag if self.rng.random() < 0.8 else self.rng.choices(belaege, gewichte)[0],
+                    wid if self.rng.random() < 0.9 else self.rng.choice(wids),
+                    self.stichtag - timedelta(days=self.rng.randint(0, 60)),
+                )
+
+    def nutzer(self, anzahl):
+        for i in range(1, anzahl + 1):
+            vorname = self.rng.choice(VORNAMEN)
+            nachname = self.rng.choice(NACHNAMEN)
+            geburtsdatum = self._geburtsdatum(16, 85) if self.rng.random() < 0.95 else None
+            lokal = f"{vorname}.{nachname}".lower()
+            for umlaut, ersatz in (("ä", "ae"), ("ö", "oe"), ("ü", "ue")):
+                lokal = lokal.replace(umlaut, ersatz)
+            yield vorname, nachname, geburtsdatum, f"{lokal}.{i}@{EMAIL_DOMAIN}"
+
+    def buchungen(self, tids, nids, anzahl):
+        """
+        Platz für Platz und Tag für Tag, ohne Überschneidungen. Die Zahl pro
+        Platz und Tag schwankt um den Mittelwert, der sich aus anzahl ergibt;
+        wenige Vielspieler buchen einen großen Teil.
+        """
+        tage = (self.letzter_tag - self.erster_tag).days + 1
+        mittel = anzahl / (len(tids) * tage) / (sum(_WOCHENTAG_FAKTOR) / 7)
+        werktag = _kumuliert(_WERKTAG)
+        wochenende = _kumuliert(_WOCHENENDE)
+        slots = list(range(verfuegbarkeit.ANZAHL_SLOTS))
+        zeiten = [
+            verfuegbarkeit.OEFFNUNG_MINUTEN + i * verfuegbarkeit.SLOT_MINUTEN
+            for i in range(verfuegbarkeit.ANZAHL_SLOTS + 1)
+        ]
+        zeiten = [f"{m // 60:02d}:{m % 60:02d}:00" for m in zeiten]
+
+        for tid in tids:
+            beliebtheit = self.rng.uniform(0.6, 1.4)
+            for t in range(tage):
+                tag = self.erster_tag + timedelta(days=t)
+                erwartet = mittel * beliebtheit * _WOCHENTAG_FAKTOR[tag.weekday()]
+                if tag > self.stichtag:
+                    # Zukunft: je weiter weg, desto weniger schon gebucht
+                    erwartet *= max(0.05, 1 - (tag - self.stichtag).days / 45)
+                ziel = int(erwartet) + (self.rng.random() < erwartet % 1)
+                gewichte = wochenende if tag.weekday() >= 5 else werktag
+                belegt = 0
+                versuche = 0
+                gebucht = 0
+                while gebucht < ziel and versuche < ziel * 4:
+                    versuche += 1
+                    start = self.rng.choices(slots, cum_weights=gewichte)[0]
+                    laenge = 2 if self.rng.random() < 0.8 else 1
+                    if start + laenge > verfuegbarkeit.ANZAHL_SLOTS:
+                        continue
+                    maske = ((1 << laenge) - 1) << start
+                    if belegt & maske:
+                        continue
+                    belegt |= maske
+                    gebucht += 1
+                    nid = nids[int(len(nids) * self.rng.random() ** 2)]
+                    yield nid, tid, tag, zeiten[start], zeiten[start + laenge]
+
+
+def leeren():
+    # Reihenfolge wegen der Fremdschlüssel
+    with db_transaction() as tx:
+        for tabelle in ["benachrichtigung", "buchung_tagesstatistik", "wartungssperre", "buchung",
+                        "tennisplatz", "wartungsarbeiter", "nutzer"]:
+            tx.write(f"DELETE FROM {tabelle}")
+            logger.info("%s geleert (%s Zeilen)", tabelle, tx.rowcount)
+
+
+def erzeugen(args):
+    mengen = {
+        name: max(1, round(wert * args.skala)) if getattr(args, name) is None else getattr(args, name)
+        for name, wert in SKALA_1.items()
+    }
+    if args.load_data and db.DB_BACKEND != "mysql":
+        raise SystemExit("--load-data geht nur mit DB_BACKEND=mysql.")
+    gen = Generator(args.seed, args.stichtag, args.tage_zurueck, args.tage_voraus)
+    lader = LoadDataLader(args.batch) if args.load_data else InsertLader(args.batch)
+    start = time.perf_counter()
+
+    if args.leeren:
+        leeren()
+    elif db_read("SELECT nid FROM nutzer WHERE email LIKE %s LIMIT 1", (f"%@{EMAIL_DOMAIN}",), single=True):
+        raise SystemExit("Es gibt bereits Testdaten, mit --leeren neu erzeugen.")
+
+    # Kleine Tabellen immer per INSERT, die IDs danach aus der DB lesen
+    insert = InsertLader(args.batch)
+    insert.laden("wartungsarbeiter", ["vorname", "nachname", "geburtsdatum"],
+                 gen.wartungsarbeiter(mengen["wartungsarbeiter"]))
+    wids = [row["wid"] for row in db_read(
+        "SELECT wid FROM wartungsarbeiter ORDER BY wid DESC LIMIT %s", (mengen["wartungsarbeiter"],)
+    )]
+    wids.sort()
+
+    anlagen = gen.anlagen(mengen["anlagen"])
+    plaetze = insert.laden("tennisplatz", ["tennisanlage", "platznummer", "belag", "wid", "datum_der_wartung"],
+                           gen.tennisplaetze(anlagen, wids))
+    tids = sorted(row["tid"] for row in db_read(
+        f"SELECT tid FROM tennisplatz WHERE tennisanlage IN ({', '.join(['%s'] * len(anlagen))})", tuple(anlagen)
+    ))
+    logger.info("%s Wartungsarbeiter, %s Anlagen, %s Plätze", len(wids), len(anlagen), plaetze)
+
+    lader.laden("nutzer", ["vorname", "nachname", "geburtsdatum", "email"], gen.nutzer(mengen["nutzer"]))
+    nids = [row["nid"] for row in db_stream(
+        "SELECT nid FROM nutzer WHERE email LIKE %s ORDER BY nid", (f"%@{EMAIL_DOMAIN}",)
+    )]
+    logger.info("%s Nutzer", len(nids))
+
+    anzahl = lader.laden("buchung", ["nid", "tid", "spieldatum", "spielbeginn", "spielende"],
+                         gen.buchungen(tids, nids, mengen["buchungen"]))
+    logger.info("%s Buchungen von %s bis %s", anzahl, gen.erster_tag, gen.letzter_tag)
+
+    if not args.ohne_statistik:
+        statistik.neu_aufbauen(gen.erster_tag, gen.letzter_tag)
+
+    logger.info("Fertig in %.1f s", time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Große Testdatenmengen erzeugen")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skala", type=float, default=1.0, help="Faktor für alle Mengen")
+    parser.add_argument("--anlagen", type=int, help="statt Skala")
+    parser.add_argument("--wartungsarbeiter", type=int, help="statt Skala")
+    parser.add_argument("--nutzer", type=int, help="statt Skala")
+    parser.add_argument("--buchungen", type=int, help="statt Skala (ungefähr, volle Tage begrenzen)")
+    parser.add_argument("--stichtag", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD")
+    parser.add_argument("--tage-zurueck", type=int, default=3 * 365)
+    parser.add_argument("--tage-voraus", type=int, default=60)
+    parser.add_argument("--batch", type=int, default=5000, help="Zeilen pro INSERT bzw. Datei")
+    parser.add_argument("--load-data", action="store_true", help="LOAD DATA LOCAL INFILE (nur MySQL)")
+    parser.add_argument("--leeren", action="store_true", help="vorher alle Daten außer users löschen")
+    parser.add_argument("--ohne-statistik", action="store_true", help="buchung_tagesstatistik nicht neu aufbauen")
+    erzeugen(parser.parse_args())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    main()
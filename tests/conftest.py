@@ -0,0 +1,93 @@
+"""
+Gemeinsame Fixtures. Die Tests laufen ohne MySQL-Server auf DB_BACKEND=sqlite
+mit einer temporären Datenbank pro Testlauf (DB_SQLITE_PFAD=:memory:).
+
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Vor dem ersten Import von db.py setzen
+_TMP = tempfile.mkdtemp(prefix="tennis-tests-")
+os.environ.update({
+    "DB_BACKEND": "sqlite",
+    "DB_SQLITE_PFAD": ":memory:",
+    "SESSION_STORE": "mysql",
+    "BENACHRICHTIGUNG_WORKER": "aus",
+    "BENACHRICHTIGUNG_TRANSPORT": "datei",
+    "BENACHRICHTIGUNG_DATEI": os.path.join(_TMP, "benachrichtigungen.log"),
+    "METRIKEN_VERZEICHNIS": os.path.join(_TMP, "metriken"),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import cache
+import db
+
+# Reihenfolge wegen der Fremdschlüssel
+TABELLEN = [
+    "benachrichtigung", "buchung_tagesstatistik", "wartungssperre", "buchung",
+    "tennisplatz", "wartungsarbeiter", "nutzer", "session_store", "users",
+]
+
+
+def caches_leeren():
+    for c in cache.CACHES.values():
+        c.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def leere_db():
+    """Jeder Test beginnt mit leeren Tabellen und leeren Caches."""
+    with db.db_transaction() as tx:
+        for tabelle in TABELLEN:
+            tx.write(f"DELETE FROM {tabelle}")
+    caches_leeren()
+    yield
+
+
+@pytest.fixture
+def arbeiter():
+    return db.db_write(
+        "INSERT INTO wartungsarbeiter (vorname, nachname, geburtsdatum) VALUES (%s, %s, %s)",
+        ("Willi", "Wartung", date(1980, 5, 1))
+    )
+
+
+@pytest.fixture
+def platz(arbeiter):
+    """Ein Tennisplatz als Zeile (tid, tennisanlage, platznummer, ...)"""
+    tid = db.db_write(
+        "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, wid, datum_der_wartung) VALUES (%s, %s, %s, %s, %s)",
+        ("TC Teststadt", 1, "sand", arbeiter, date(2024, 1, 1))
+    )
+    caches_leeren()
+    return db.db_read("SELECT * FROM tennisplatz WHERE tid = %s", (tid,), single=True)
+
+
+@pytest.fixture
+def nutzer():
+    nid = db.db_write(
+        "INSERT INTO nutzer (vorname, nachname, geburtsdatum, email) VALUES (%s, %s, %s, %s)",
+        ("Erika", "Muster", date(1990, 1, 1), "erika@example.org")
+    )
+    return db.db_read("SELECT * FROM nutzer WHERE nid = %s", (nid,), single=True)
+
+
+@pytest.fixture
+def morgen():
+    return date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def client():
+    """Test-Client der App, angemeldet als admin."""
+    import auth
+    from flask_app import app
+    auth.register_user("admin", "geheim123")
+    client = app.test_client()
+    antwort = client.post("/login", data={"username": "admin", "password": "geheim123"})
+    assert antwort.status_code == 302
+    return client
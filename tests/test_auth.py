@@ -0,0 +1,71 @@
+import time
+
+import pytest
+import auth
+import db
+from flask import session
+from flask_app import app
+
+
+@pytest.fixture
+def user_id():
+    assert auth.register_user("trainer", "geheim123")
+    return auth.User.get_by_username("trainer").id
+
+
+def _db_zugriffe(monkeypatch):
+    zugriffe = []
+    laden = auth.User.get_by_id
+
+    def zaehlen(user_id):
+        zugriffe.append(user_id)
+        return laden(user_id)
+
+    monkeypatch.setattr(auth.User, "get_by_id", staticmethod(zaehlen))
+    return zugriffe
+
+
+def test_snapshot_und_cache(user_id, monkeypatch):
+    zugriffe = _db_zugriffe(monkeypatch)
+    with app.test_request_context():
+        assert auth.load_user(str(user_id)).username == "trainer"
+        assert session["user_snapshot"]["id"] == user_id
+        assert auth.load_user(str(user_id)).username == "trainer"
+    assert zugriffe == [user_id]
+
+
+def test_cache_treffer_erneuert_snapshot_nicht(user_id, monkeypatch):
+    with app.test_request_context():
+        auth.load_user(user_id)
+        abgelaufen = time.time() - auth.USER_SNAPSHOT_MAX_AGE - 1
+        session["user_snapshot"]["ts"] = abgelaufen
+        # Treffer im User-Cache, der Snapshot bleibt abgelaufen
+        assert auth.load_user(user_id).username == "trainer"
+        assert session["user_snapshot"]["ts"] == abgelaufen
+
+
+def test_invalidate_user(user_id, monkeypatch):
+    zugriffe = _db_zugriffe(monkeypatch)
+    with app.test_request_context():
+        auth.load_user(user_id)
+        db.db_write("UPDATE users SET username = %s WHERE id = %s", ("trainerin", user_id))
+        auth.invalidate_user(user_id)
+        # Snapshot hat die alte Version, Cache ist leer: neu aus der DB
+        assert auth.load_user(user_id).username == "trainerin"
+        assert session["user_snapshot"]["username"] == "trainerin"
+        assert len(zugriffe) == 2
+
+        db.db_write("DELETE FROM users WHERE id = %s", (user_id,))
+        auth.invalidate_user(user_id)
+        assert auth.load_user(user_id) is None
+        assert "user_snapshot" not in session
+
+
+def test_change_password(user_id):
+    with app.test_request_context():
+        auth.load_user(user_id)
+        assert auth.change_password(user_id, "neu12345")
+        assert auth.user_cache.get(user_id) is None
+        assert session["user_snapshot"]["v"] != auth._user_version(user_id)
+    assert auth.authenticate("trainer", "neu12345")
+    assert not auth.authenticate("trainer", "geheim123")
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import benachrichtigungen as b
+import db
+
+
+def _vormerken():
+    with db.db_transaction() as tx:
+        b.vormerken(tx, "buchung", "erika@example.org", "Test", "Hallo")
+    return db.db_read("SELECT id FROM benachrichtigung", single=True)["id"]
+
+
+def _eintrag(id_):
+    return db.db_read("SELECT * FROM benachrichtigung WHERE id = %s", (id_,), single=True)
+
+
+def _lease_ablaufen_lassen(id_):
+    db.db_write("UPDATE benachrichtigung SET naechster_versuch = %s WHERE id = %s",
+                (datetime.now() - timedelta(seconds=1), id_))
+
+
+def test_abarbeiten_sendet():
+    id_ = _vormerken()
+    assert b.abarbeiten() == 1
+    eintrag = _eintrag(id_)
+    assert eintrag["status"] == "gesendet" and eintrag["versuche"] == 0
+    assert b.abarbeiten() == 0
+
+
+def test_abgelaufene_lease_zaehlt_als_versuch(monkeypatch):
+    monkeypatch.setattr(b, "MAX_VERSUCHE", 3)
+    id_ = _vormerken()
+
+    # Sender stürzt jedes Mal ab, bevor er das Ergebnis schreibt
+    assert [row["id"] for row in b._abholen(10)] == [id_]
+    assert b._abholen(10) == []  # Lease läuft noch
+    for versuch in (1, 2):
+        _lease_ablaufen_lassen(id_)
+        rows = b._abholen(10)
+        assert rows[0]["versuche"] == versuch
+        assert (_eintrag(id_)["status"], _eintrag(id_)["versuche"]) == ("in_arbeit", versuch)
+
+    _lease_ablaufen_lassen(id_)
+    assert b._abholen(10) == []
+    eintrag = _eintrag(id_)
+    assert (eintrag["status"], eintrag["versuche"]) == ("fehler", 3)
+    assert "Lease" in eintrag["letzter_fehler"]
@@ -0,0 +1,124 @@
+import threading
+from datetime import date, time, timedelta
+
+import buchungen
+import db
+
+
+def test_pruefe_zeitfenster():
+    assert buchungen.pruefe_zeitfenster("10:00", "11:00") is None
+    assert buchungen.pruefe_zeitfenster("19:00", "20:00") is None
+    assert "halben Stunden" in buchungen.pruefe_zeitfenster("10:15", "11:00")
+    assert "7:00 und 20:00" in buchungen.pruefe_zeitfenster("06:30", "07:30")
+    assert "7:00 und 20:00" in buchungen.pruefe_zeitfenster("19:30", "20:30")
+    assert "nach der Startzeit" in buchungen.pruefe_zeitfenster("11:00", "10:00")
+    assert "1 Stunde" in buchungen.pruefe_zeitfenster("10:00", "11:30")
+
+
+def test_serien_termine():
+    # 2025-03-03 ist ein Montag
+    von, bis = date(2025, 3, 1), date(2025, 3, 31)
+    assert buchungen.serien_termine(0, von, bis) == [date(2025, 3, d) for d in (3, 10, 17, 24, 31)]
+    assert buchungen.serien_termine(5, von, bis) == [date(2025, 3, d) for d in (1, 8, 15, 22, 29)]
+    assert buchungen.serien_termine(2, date(2025, 3, 3), date(2025, 3, 4)) == []
+
+
+def _buchungen_zaehlen():
+    return db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"]
+
+
+def test_buche_und_konflikt(platz, nutzer, morgen):
+    nummer, konflikt = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+    assert nummer and konflikt is None
+    gespeichert = db.db_read("SELECT * FROM buchung WHERE buchungsnummer = %s", (nummer,), single=True)
+    assert gespeichert["spielbeginn"] == timedelta(hours=10)
+    assert gespeichert["spielende"] == timedelta(hours=11)
+
+    # überschneidend
+    nummer2, konflikt = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:30", "11:30")
+    assert nummer2 is None
+    assert konflikt["buchungsnummer"] == nummer
+
+    # direkt anschließend ist frei, auch mit "H:MM" aus dem Formular
+    nummer3, konflikt = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "9:00", "10:00")
+    assert nummer3 and konflikt is None
+    assert _buchungen_zaehlen() == 2
+
+
+def test_buche_legt_statistik_und_benachrichtigung_an(platz, nutzer, morgen):
+    nummer, _ = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "10:30")
+    statistik = db.db_read("SELECT * FROM buchung_tagesstatistik", single=True)
+    assert (statistik["stunde"], statistik["buchungen"], statistik["minuten"]) == (10, 1, 30)
+    nachricht = db.db_read("SELECT * FROM benachrichtigung", single=True)
+    assert nachricht["empfaenger"] == "erika@example.org"
+    assert nachricht["status"] == "offen"
+    assert f"Buchungsnummer: {nummer}" in nachricht["inhalt"]
+    assert f"Datum: {morgen:%d.%m.%Y}" in nachricht["inhalt"]
+
+
+def test_parallele_buchungen_nur_eine_gewinnt(platz, nutzer, morgen):
+    ergebnisse = []
+
+    def buchen():
+        ergebnisse.append(buchungen.buche(nutzer["nid"], platz["tid"], morgen, "12:00", "13:00")[0])
+
+    threads = [threading.Thread(target=buchen) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(1 for nummer in ergebnisse if nummer) == 1
+    assert _buchungen_zaehlen() == 1
+
+
+def test_buche_serie(platz, nutzer, morgen):
+    termine = [morgen + timedelta(weeks=i) for i in range(3)]
+    besetzt, _ = buchungen.buche(nutzer["nid"], platz["tid"], termine[1], "18:30", "19:30")
+
+    bericht = buchungen.buche_serie(nutzer["nid"], platz["tid"], termine, "18:00", "19:00")
+    assert bericht[termine[0].isoformat()]["status"] == "gebucht"
+    assert bericht[termine[1].isoformat()] == {"status": "konflikt", "buchungsnummer": besetzt}
+    assert bericht[termine[2].isoformat()]["status"] == "gebucht"
+    nummern = {bericht[t.isoformat()]["buchungsnummer"] for t in (termine[0], termine[2])}
+    gespeichert = db.db_read(
+        "SELECT buchungsnummer FROM buchung WHERE spielbeginn = %s", (time(18, 0),)
+    )
+    assert {row["buchungsnummer"] for row in gespeichert} == nummern
+    assert buchungen.buche_serie(nutzer["nid"], platz["tid"], [], "18:00", "19:00") == {}
+
+
+def test_storniere_nach_buchungsnummer(platz, nutzer, morgen):
+    nummer, _ = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+
+    assert buchungen.storniere_nach_buchungsnummer(nummer, "falsch@example.org") == (None, None)
+    buchung, fehler = buchungen.storniere_nach_buchungsnummer(nummer, "erika@example.org")
+    assert fehler is None and buchung["buchungsnummer"] == nummer
+    assert _buchungen_zaehlen() == 0
+    assert db.db_read("SELECT buchungen FROM buchung_tagesstatistik", single=True)["buchungen"] == 0
+    arten = [row["art"] for row in db.db_read("SELECT art FROM benachrichtigung ORDER BY id")]
+    assert arten == ["buchung", "stornierung"]
+
+
+def test_storniere_nach_nid_und_personalien(platz, nutzer, morgen):
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "12:00", "13:00")
+
+    buchung, fehler = buchungen.storniere_nach_nid(nutzer["nid"], "erika@example.org", platz["tid"], morgen, "10:00")
+    assert fehler is None and buchung["spielbeginn"] == timedelta(hours=10)
+    buchung, fehler = buchungen.storniere_nach_personalien(
+        "Erika", "Muster", "erika@example.org", platz["tid"], morgen.isoformat(), "12:00"
+    )
+    assert fehler is None and buchung["spielbeginn"] == timedelta(hours=12)
+    assert _buchungen_zaehlen() == 0
+
+
+def test_vergangene_buchung_nicht_stornierbar(platz, nutzer):
+    gestern = date.today() - timedelta(days=1)
+    nummer = db.db_write(
+        "INSERT INTO buchung (nid, tid, spieldatum, spielbeginn, spielende) VALUES (%s, %s, %s, %s, %s)",
+        (nutzer["nid"], platz["tid"], gestern, time(10, 0), time(11, 0))
+    )
+    buchung, fehler = buchungen.storniere_nach_buchungsnummer(nummer, "erika@example.org")
+    assert buchung["buchungsnummer"] == nummer
+    assert "Vergangenheit" in fehler
+    assert _buchungen_zaehlen() == 1
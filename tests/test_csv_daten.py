@@ -0,0 +1,103 @@
+import io
+from datetime import timedelta
+
+from werkzeug.datastructures import FileStorage
+
+import buchungen
+import csv_daten
+import db
+
+
+def _datei(text):
+    return FileStorage(stream=io.BytesIO(text.encode("utf-8")), filename="import.csv")
+
+
+def test_wartungsarbeiter_import_und_export():
+    bericht = csv_daten.importiere_wartungsarbeiter(_datei(
+        "Vorname;Nachname;Geburtsdatum\n"
+        "Anna;Alt;1970-02-03\n"
+        "Bert;Berg;1985-12-24\n"
+        "anna;ALT;1970-02-03\n"
+        ";Leer;1990-01-01\n"
+        "Carl;Datum;03.02.1970\n"
+    ))
+    assert bericht.eingefuegt == 2
+    assert bericht.duplikate == 1
+    assert len(bericht.fehler) == 2
+
+    export = "".join(csv_daten.exportiere_wartungsarbeiter())
+    zeilen = export.splitlines()
+    assert zeilen[0] == "wid,vorname,nachname,geburtsdatum"
+    assert [z.split(",", 1)[1] for z in zeilen[1:]] == ["Anna,Alt,1970-02-03", "Bert,Berg,1985-12-24"]
+
+    # Export wieder importieren: alles Duplikate
+    bericht = csv_daten.importiere_wartungsarbeiter(_datei(export))
+    assert (bericht.eingefuegt, bericht.duplikate, bericht.fehler) == (0, 2, [])
+
+
+def test_tennisplaetze_import_und_export(arbeiter):
+    bericht = csv_daten.importiere_tennisplaetze(_datei(
+        "tennisanlage,platznummer,belag,wid,datum_der_wartung\n"
+        f"TC Nord,1,sand,{arbeiter},2024-04-01\n"
+        f"TC Nord,2,hart,{arbeiter},2024-04-01\n"
+        f"TC Nord,1,rasen,{arbeiter},2024-04-01\n"
+        "TC Nord,3,sand,9999,2024-04-01\n"
+        f"TC Nord,x,sand,{arbeiter},2024-04-01\n"
+    ))
+    assert bericht.eingefuegt == 2
+    assert bericht.duplikate == 1
+    assert len(bericht.fehler) == 2
+    assert any("9999" in f for f in bericht.fehler)
+
+    export = "".join(csv_daten.exportiere_tennisplaetze())
+    bericht = csv_daten.importiere_tennisplaetze(_datei(export))
+    assert (bericht.eingefuegt, bericht.duplikate, bericht.fehler) == (0, 2, [])
+
+
+def test_fehlende_spalten():
+    try:
+        csv_daten.importiere_wartungsarbeiter(_datei("vorname,nachname\nA,B\n"))
+    except ValueError as e:
+        assert "geburtsdatum" in str(e)
+    else:
+        raise AssertionError("ValueError erwartet")
+
+
+def test_buchungen_export_in_stuecken(platz, nutzer, morgen, monkeypatch):
+    monkeypatch.setattr(csv_daten, "EXPORT_BATCH", 2)
+    for tag in range(5):
+        buchungen.buche(nutzer["nid"], platz["tid"], morgen + timedelta(days=tag), "10:00", "11:00")
+
+    stuecke = list(csv_daten.exportiere_buchungen(["b.tid = %s"], [platz["tid"]]))
+    assert len(stuecke) == 3
+    zeilen = "".join(stuecke).splitlines()
+    assert zeilen[0] == ",".join(csv_daten.BUCHUNG_SPALTEN)
+    assert len(zeilen) == 6
+    assert f"{morgen.isoformat()},10:00,11:00,{platz['tid']},TC Teststadt,1,{nutzer['nid']},Erika,Muster" in zeilen[1]
+    assert db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"] == 5
+
+
+def test_duplikate_ohne_gross_kleinschreibung(arbeiter):
+    db.db_write(
+        "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, wid, datum_der_wartung) VALUES (%s, %s, %s, %s, %s)",
+        ("tennisclub nord", 1, "sand", arbeiter, "2024-01-01")
+    )
+    db.db_write(
+        "INSERT INTO wartungsarbeiter (vorname, nachname, geburtsdatum) VALUES (%s, %s, %s)",
+        ("JÜRGEN", "MÜLLER", "1970-01-01")
+    )
+
+    bericht = csv_daten.importiere_tennisplaetze(_datei(
+        "tennisanlage,platznummer,belag,wid,datum_der_wartung\n"
+        f"Tennisclub Nord,1,sand,{arbeiter},2024-04-01\n"
+        f"Tennisclub Nord,2,sand,{arbeiter},2024-04-01\n"
+    ))
+    assert (bericht.eingefuegt, bericht.duplikate, bericht.fehler) == (1, 1, [])
+
+    # auch Umlaute (SQLite-LOWER() kennt von sich aus nur ASCII)
+    bericht = csv_daten.importiere_wartungsarbeiter(_datei(
+        "vorname,nachname,geburtsdatum\n"
+        "jürgen,müller,1970-01-01\n"
+        "Jürgen,Müller,1980-01-01\n"
+    ))
+    assert (bericht.eingefuegt, bericht.duplikate, bericht.fehler) == (1, 1, [])
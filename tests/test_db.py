@@ -0,0 +1,73 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import db
+
+
+def test_sqlite_sql_uebersetzt_platzhalter_und_for_update():
+    assert db._sqlite_sql("SELECT * FROM t WHERE a = %s AND b = %s") == "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert db._sqlite_sql("SELECT tid FROM tennisplatz WHERE tid=%s FOR UPDATE") == "SELECT tid FROM tennisplatz WHERE tid=?"
+    assert db._sqlite_sql("SELECT id FROM b LIMIT %s\n   FOR UPDATE SKIP LOCKED") == "SELECT id FROM b LIMIT ?"
+    # nur am Ende, nicht mitten im Text
+    assert "FOR UPDATE" in db._sqlite_sql("SELECT 'FOR UPDATE' AS x")
+
+
+def test_sqlite_wert():
+    assert db._sqlite_wert(date(2025, 3, 1)) == "2025-03-01"
+    assert db._sqlite_wert(datetime(2025, 3, 1, 9, 5)) == "2025-03-01 09:05:00"
+    assert db._sqlite_wert(time(9, 30)) == "09:30:00"
+    assert db._sqlite_wert(timedelta(hours=9, minutes=30)) == "09:30:00"
+    # Texte bleiben unverändert, auch wenn sie wie eine Uhrzeit aussehen
+    assert db._sqlite_wert("9:30") == "9:30"
+    assert db._sqlite_wert(5) == 5
+
+
+def test_fingerprint():
+    assert db.fingerprint("SELECT *  FROM t WHERE a = 5 AND b = 'x' AND c IN (1, 2, 3)") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?+)"
+    assert db.fingerprint("SELECT * FROM t WHERE a = %s") == "SELECT * FROM t WHERE a = ?"
+
+
+def test_typen_wie_mysql(nutzer):
+    assert nutzer["geburtsdatum"] == date(1990, 1, 1)
+    nid = db.db_write(
+        "INSERT INTO nutzer (vorname, nachname, email) VALUES (%s, %s, %s)", ("9:30", "Zeit", "zeit@example.org")
+    )
+    assert db.db_read("SELECT vorname FROM nutzer WHERE nid = %s", (nid,), single=True)["vorname"] == "9:30"
+
+
+def test_transaktion_rollback_bei_fehler():
+    with pytest.raises(RuntimeError):
+        with db.db_transaction() as tx:
+            tx.write("INSERT INTO nutzer (vorname, email) VALUES (%s, %s)", ("A", "a@example.org"))
+            raise RuntimeError("abbrechen")
+    assert db.db_read("SELECT * FROM nutzer") == []
+
+
+def test_ist_duplikat(nutzer):
+    with pytest.raises(Exception) as info:
+        db.db_write("INSERT INTO nutzer (vorname, email) VALUES (%s, %s)", ("B", "ERIKA@example.org"))
+    assert db.ist_duplikat(info.value)
+
+
+def test_listener_zur_laufzeit():
+    aufrufe = []
+
+    def listener(sql, dauer_ms, zeilen):
+        aufrufe.append((sql, zeilen))
+
+    db.add_query_listener(listener)
+    try:
+        db.db_read("SELECT 1 AS x")
+    finally:
+        db.remove_query_listener(listener)
+    assert aufrufe == [("SELECT 1 AS x", 1)]
+
+
+def test_pool_timeout_meldet_tatsaechlichen_timeout(caplog):
+    pool = db.ConnectionPool(lambda: None, size=1, timeout=10, ping=False, max_lifetime=0, recycle=0)
+    verbindung = pool.acquire()
+    with pytest.raises(db.PoolTimeout):
+        pool.acquire(timeout=0.01)
+    assert "0.0 s" in caplog.text
+    verbindung.close()
@@ -0,0 +1,64 @@
+from datetime import datetime, time, timedelta
+
+import db
+import sperren
+
+
+def _formular(nutzer, platz, morgen, beginn, ende):
+    return {
+        "nid": str(nutzer["nid"]),
+        "tennisanlage": platz["tennisanlage"],
+        "platznummer": str(platz["platznummer"]),
+        "spieldatum": morgen.isoformat(),
+        "beginn": beginn,
+        "ende": ende,
+    }
+
+
+def test_buchen_bestaetigen_pdf_stornieren(client, nutzer, platz, morgen):
+    antwort = client.post("/buchen", data=_formular(nutzer, platz, morgen, "10:00", "11:00"))
+    assert antwort.status_code == 302 and antwort.location.endswith("/bbest%C3%A4tigt")
+    nummer = db.db_read("SELECT buchungsnummer FROM buchung", single=True)["buchungsnummer"]
+
+    seite = client.get("/bbestätigt").get_data(as_text=True)
+    assert str(nummer) in seite and "Erika" in seite
+
+    antwort = client.get(f"/buchung/{nummer}/pdf")
+    assert antwort.status_code == 200 and antwort.mimetype == "application/pdf"
+    assert client.get(f"/buchung/{nummer}/pdf", headers={"If-None-Match": antwort.headers["ETag"]}).status_code == 304
+
+    # zweite Buchung auf denselben Slot wird abgelehnt
+    seite = client.post("/buchen", data=_formular(nutzer, platz, morgen, "10:30", "11:30")).get_data(as_text=True)
+    assert "bereits eine Buchung" in seite
+    assert db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"] == 1
+
+    antwort = client.post("/stornieren", data={"buchungsnummer": str(nummer), "email": "erika@example.org"})
+    assert antwort.status_code == 302 and antwort.location.endswith("/sbest%C3%A4tigt")
+    assert db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"] == 0
+    assert client.get(f"/buchung/{nummer}/pdf").status_code == 404
+
+    antwort = client.get("/stornierung/pdf")
+    assert antwort.status_code == 200
+    assert f"({morgen:%d.%m.%Y})".encode() in antwort.data
+
+
+def test_buchen_gesperrter_platz(client, nutzer, platz, morgen):
+    von = datetime.combine(morgen, time(8, 0))
+    sperren.anlegen(platz["tid"], von, von + timedelta(hours=4), "Netz defekt")
+
+    antwort = client.post("/buchen", data=_formular(nutzer, platz, morgen, "10:00", "11:00"))
+    assert antwort.status_code == 200
+    assert "Netz defekt" in antwort.get_data(as_text=True)
+    assert db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"] == 0
+
+
+def test_serie_ueber_api(client, nutzer, platz, morgen):
+    antwort = client.post("/api/buchungen/serie", json={
+        "nid": nutzer["nid"], "tennisanlage": platz["tennisanlage"], "platznummer": platz["platznummer"],
+        "wochentag": morgen.weekday(), "beginn": "18:00", "ende": "19:00",
+        "von": morgen.isoformat(), "bis": (morgen + timedelta(weeks=2)).isoformat(),
+    })
+    assert antwort.status_code == 200
+    ergebnis = antwort.get_json()
+    assert ergebnis["gebucht"] == 3 and ergebnis["konflikte"] == 0
+    assert db.db_read("SELECT COUNT(*) AS n FROM buchung", single=True)["n"] == 3
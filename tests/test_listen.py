@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+import db
+import listen
+
+
+@pytest.fixture
+def plaetze(arbeiter):
+    with db.db_transaction() as tx:
+        tx.write_many(
+            "INSERT INTO tennisplatz (tennisanlage, platznummer, belag, wid, datum_der_wartung) VALUES (%s, %s, %s, %s, %s)",
+            [("Anlage A" if nr % 2 else "Anlage B", nr, "sand" if nr < 4 else "hart", arbeiter, date(2024, 1, 1))
+             for nr in range(1, 8)]
+        )
+
+
+def _alle_seiten(laden, **filter_):
+    seiten = []
+    nach = None
+    while True:
+        rows, nach = laden(nach=nach, **filter_)
+        seiten.append(rows)
+        if nach is None:
+            return seiten
+
+
+def test_tennisplaetze_keyset(plaetze):
+    seiten = _alle_seiten(listen.tennisplaetze, limit=3)
+    assert [len(seite) for seite in seiten] == [3, 3, 1]
+    tids = [row["tid"] for seite in seiten for row in seite]
+    assert tids == sorted(tids) and len(set(tids)) == 7
+    assert seiten[0][0]["wartungsarbeiter_name"] == "Willi Wartung"
+
+
+def test_tennisplaetze_volle_letzte_seite(plaetze):
+    # genau limit Zeilen übrig: keine leere Folgeseite
+    rows, naechste = listen.tennisplaetze(limit=7)
+    assert len(rows) == 7 and naechste is None
+
+
+def test_tennisplaetze_filter(plaetze):
+    rows, _ = listen.tennisplaetze(anlage="Anlage A", belag="sand")
+    assert [row["platznummer"] for row in rows] == [1, 3]
+
+
+def test_wartungsarbeiter_praefixsuche_mit_sonderzeichen():
+    for nachname in ["Meier", "Meister", "100%_Sicher", "100 Prozent", "Müller"]:
+        db.db_write("INSERT INTO wartungsarbeiter (vorname, nachname) VALUES (%s, %s)", ("X", nachname))
+
+    def namen(suche):
+        rows, _ = listen.wartungsarbeiter(name=suche)
+        return sorted(row["nachname"] for row in rows)
+
+    assert namen("mei") == ["Meier", "Meister"]
+    # % und _ sind keine Platzhalter
+    assert namen("100%") == ["100%_Sicher"]
+    assert namen("100_") == []
+
+
+def test_parse_seite():
+    assert listen.parse_seite({}) == (None, listen.SEITE_STANDARD)
+    assert listen.parse_seite({"nach": "17", "limit": "5"}) == (17, 5)
+    with pytest.raises(ValueError):
+        listen.parse_seite({"limit": str(listen.SEITE_MAX + 1)})
+    with pytest.raises(ValueError):
+        listen.parse_seite({"nach": "abc"})
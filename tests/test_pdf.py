@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+import pdf
+import session_store
+
+
+def test_stornierung_aus_session_store():
+    # so legt /stornieren den Eintrag an: Datum und Zeiten als Strings
+    token = session_store.speichern({
+        "buchungsnummer": 42, "nid": 7, "vorname": "Erika", "nachname": "Muster",
+        "email": "erika@example.org", "tennisanlage": "TC Teststadt", "platznummer": 3,
+        "spieldatum": "2026-10-20", "spielbeginn": "10:00:00", "spielende": "11:00:00",
+        "zeitpunkt": "18.10.2026 um 09:15 Uhr",
+    })
+    daten = session_store.laden(token)
+
+    inhalt = pdf.stornierungsbestaetigung(daten, daten["zeitpunkt"])
+    assert inhalt.startswith(b"%PDF-1.4")
+    assert b"(20.10.2026)" in inhalt
+    assert b"2026-10-20" not in inhalt
+    assert b"(10:00 - 11:00 Uhr)" in inhalt
+    assert b"(18.10.2026 um 09:15 Uhr)" in inhalt
+
+
+def test_buchung_mit_datumsobjekten():
+    buchung = {
+        "buchungsnummer": 43, "nid": 7, "vorname": "Erika", "nachname": "Muster",
+        "email": "erika@example.org", "geburtsdatum": date(1990, 1, 2),
+        "tennisanlage": "TC Teststadt", "platznummer": 3, "spieldatum": date(2026, 10, 20),
+        "spielbeginn": timedelta(hours=10), "spielende": timedelta(hours=11), "zeitpunkt": None,
+    }
+    inhalt, version = pdf.buchungsbestaetigung(buchung)
+    assert b"(20.10.2026)" in inhalt and b"(02.01.1990)" in inhalt
+    assert b"Zeitpunkt der Buchung" not in inhalt
+    assert pdf.buchungsbestaetigung(buchung) == (inhalt, version)
@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+
+import buchungen
+import sperren
+import verfuegbarkeit
+
+
+def _sperre(sid, von, bis):
+    return {"sid": sid, "von": datetime(2025, 3, 1, *von), "bis": datetime(2025, 3, 1, *bis)}
+
+
+def test_intervalle_ueberschneidungen():
+    intervalle = sperren.Intervalle([
+        _sperre(3, (14, 0), (16, 0)),
+        _sperre(1, (8, 0), (12, 0)),
+        _sperre(2, (9, 0), (10, 0)),
+    ])
+    assert len(intervalle) == 3
+
+    def sids(von, bis):
+        return [s["sid"] for s in intervalle.ueberschneidungen(datetime(2025, 3, 1, *von), datetime(2025, 3, 1, *bis))]
+
+    assert sids((9, 30), (9, 45)) == [1, 2]
+    assert sids((10, 0), (11, 0)) == [1]
+    # halboffen: Ende der einen = Beginn der anderen ist keine Überschneidung
+    assert sids((12, 0), (14, 0)) == []
+    assert sids((7, 0), (8, 0)) == []
+    assert sids((11, 0), (15, 0)) == [1, 3]
+    assert sids((0, 0), (23, 0)) == [1, 2, 3]
+
+
+def test_intervalle_langes_frueheres_intervall():
+    # das laufende Maximum findet auch eine frühe, lange Sperre hinter kurzen
+    intervalle = sperren.Intervalle([
+        _sperre(1, (7, 0), (20, 0)),
+        _sperre(2, (8, 0), (8, 30)),
+        _sperre(3, (9, 0), (9, 30)),
+    ])
+    treffer = intervalle.ueberschneidungen(datetime(2025, 3, 1, 18), datetime(2025, 3, 1, 19))
+    assert [s["sid"] for s in treffer] == [1]
+
+
+def test_sperre_verhindert_buchung(platz, morgen):
+    von = datetime.combine(morgen, time(9, 0))
+    sperren.anlegen(platz["tid"], von, von + timedelta(hours=3), "Linien neu")
+
+    sperre = sperren.sperre_fuer(platz["tid"], morgen, "10:00", "11:00")
+    assert sperre["grund"] == "Linien neu"
+    assert sperren.sperre_fuer(platz["tid"], morgen, "12:00", "13:00") is None
+    assert sperren.sperre_fuer(platz["tid"], morgen + timedelta(days=1), "10:00", "11:00") is None
+    assert sperren.maske(platz["tid"], morgen) == verfuegbarkeit.slot_maske("09:00", "12:00")
+
+
+def test_serie_laesst_gesperrte_termine_aus(platz, nutzer, morgen):
+    termine = [morgen, morgen + timedelta(weeks=1)]
+    von = datetime.combine(termine[1], time(0, 0))
+    sperren.anlegen(platz["tid"], von, von + timedelta(days=1), "")
+
+    bericht = buchungen.buche_serie(nutzer["nid"], platz["tid"], termine, "10:00", "11:00")
+    assert bericht[termine[0].isoformat()]["status"] == "gebucht"
+    assert bericht[termine[1].isoformat()]["status"] == "gesperrt"
+
+
+def test_betroffene_buchungen_und_aufheben(platz, nutzer, morgen):
+    nummer, _ = buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "15:00", "16:00")
+    von = datetime.combine(morgen, time(10, 30))
+    betroffen = sperren.betroffene_buchungen(platz["tid"], von, von + timedelta(hours=2))
+    assert [b["buchungsnummer"] for b in betroffen] == [nummer]
+
+    sid = sperren.anlegen(platz["tid"], von, von + timedelta(hours=2), None)
+    assert sperren.sperre_fuer(platz["tid"], morgen, "11:00", "12:00")
+    assert sperren.aufheben(sid)
+    assert sperren.sperre_fuer(platz["tid"], morgen, "11:00", "12:00") is None
+    assert not sperren.aufheben(sid)
@@ -0,0 +1,63 @@
+import threading
+import time
+from datetime import timedelta
+
+import buchungen
+import db
+import statistik
+
+
+def _tabelle():
+    return sorted(
+        (row["tid"], str(row["spieldatum"]), row["stunde"], row["buchungen"], row["minuten"])
+        for row in db.db_read("SELECT * FROM buchung_tagesstatistik")
+        if row["buchungen"] or row["minuten"]
+    )
+
+
+def test_stundenanteile():
+    assert statistik.stundenanteile("09:30", "10:30") == {9: 30, 10: 30}
+    assert statistik.stundenanteile("10:00", "11:00") == {10: 60}
+
+
+def test_neu_aufbauen_wie_fortgeschrieben(platz, nutzer, morgen):
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "09:30", "10:30")
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:30", "11:00")
+    nummer, _ = buchungen.buche(nutzer["nid"], platz["tid"], morgen + timedelta(days=1), "18:00", "19:00")
+    buchungen.storniere_nach_buchungsnummer(nummer, "erika@example.org")
+    fortgeschrieben = _tabelle()
+
+    statistik.neu_aufbauen()
+    assert _tabelle() == fortgeschrieben
+    assert statistik.neu_aufbauen(morgen, morgen) == 2
+    assert _tabelle() == fortgeschrieben
+
+
+def test_buchung_waehrend_neuaufbau(platz, nutzer, morgen, monkeypatch):
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+    stream = statistik.db_stream
+    gebucht = []
+
+    def buchen():
+        gebucht.append(buchungen.buche(nutzer["nid"], platz["tid"], morgen, "12:00", "13:00")[0])
+
+    def langsamer_stream(*args):
+        # Buchung startet, während der Neuaufbau die Plätze gesperrt hat
+        thread = threading.Thread(target=buchen)
+        thread.start()
+        time.sleep(0.2)
+        assert not gebucht
+        yield from stream(*args)
+        langsamer_stream.thread = thread
+
+    monkeypatch.setattr(statistik, "db_stream", langsamer_stream)
+    statistik.neu_aufbauen()
+    langsamer_stream.thread.join()
+    assert gebucht[0]
+
+    # weder doppelt noch verloren gezählt
+    zaehlung = _tabelle()
+    monkeypatch.setattr(statistik, "db_stream", stream)
+    statistik.neu_aufbauen()
+    assert _tabelle() == zaehlung
+    assert sum(row[3] for row in zaehlung) == 2
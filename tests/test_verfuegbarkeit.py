@@ -0,0 +1,62 @@
+from datetime import time, timedelta
+
+import pytest
+import buchungen
+import verfuegbarkeit as v
+
+
+def test_zeit_in_minuten():
+    assert v.zeit_in_minuten(time(9, 30)) == 570
+    assert v.zeit_in_minuten(timedelta(hours=9, minutes=30)) == 570
+    assert v.zeit_in_minuten("09:30") == 570
+    assert v.zeit_in_minuten("9:30") == 570
+    assert v.zeit_in_minuten("09:30:00") == 570
+    with pytest.raises(ValueError):
+        v.zeit_in_minuten("abc")
+
+
+def test_als_uhrzeit():
+    assert v.als_uhrzeit("9:30") == time(9, 30)
+    assert v.als_uhrzeit(timedelta(hours=14)) == time(14, 0)
+    assert v.als_uhrzeit(time(8, 0)) == time(8, 0)
+
+
+def test_slot_maske():
+    # Slot 0 = 7:00-7:30, Slot 1 = 7:30-8:00, ...
+    assert v.slot_maske("07:00", "07:30") == 0b1
+    assert v.slot_maske("07:00", "08:00") == 0b11
+    assert v.slot_maske("08:00", "09:00") == 0b1100
+    # angebrochene Slots zählen mit
+    assert v.slot_maske("07:15", "07:45") == 0b11
+    # ausserhalb der Öffnungszeiten abgeschnitten
+    assert v.slot_maske("06:00", "07:30") == 0b1
+    assert v.slot_maske("19:30", "21:00") == 1 << (v.ANZAHL_SLOTS - 1)
+    assert v.slot_maske("20:00", "21:00") == 0
+    assert v.slot_maske("10:00", "10:00") == 0
+
+
+def test_maske_als_text_und_slot_zeiten():
+    text = v.maske_als_text(v.slot_maske("08:00", "09:00"))
+    assert len(text) == v.ANZAHL_SLOTS
+    assert text.startswith("0011000")
+    zeiten = v.slot_zeiten()
+    assert zeiten[0] == "07:00" and zeiten[-1] == "19:30"
+    assert len(zeiten) == v.ANZAHL_SLOTS
+
+
+def test_belegung_nach_buchung(platz, nutzer, morgen):
+    assert v.belegung(platz["tid"], morgen) == 0
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "10:00", "11:00")
+    # buche() invalidiert den Eintrag, die nächste Abfrage sieht die Buchung
+    assert v.belegung(platz["tid"], morgen) == v.slot_maske("10:00", "11:00")
+
+
+def test_belegung_bereich(platz, nutzer, morgen):
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen, "07:00", "08:00")
+    buchungen.buche(nutzer["nid"], platz["tid"], morgen + timedelta(days=1), "19:00", "20:00")
+    ergebnis = v.belegung_bereich([platz["tid"]], morgen, morgen + timedelta(days=2))
+    assert ergebnis == {
+        (platz["tid"], morgen.isoformat()): v.slot_maske("07:00", "08:00"),
+        (platz["tid"], (morgen + timedelta(days=1)).isoformat()): v.slot_maske("19:00", "20:00"),
+        (platz["tid"], (morgen + timedelta(days=2)).isoformat()): 0,
+    }
@@ -0,0 +1,131 @@
+import os
+from datetime import date, time, timedelta
+from cache import TTLCache
+from db import db_read
+
+# Buchungsraster wie in buchen(): 30-Minuten-Slots von 7:00 bis 20:00
+SLOT_MINUTEN = 30
+OEFFNUNG_MINUTEN = 7 * 60
+SCHLIESSUNG_MINUTEN = 20 * 60
+ANZAHL_SLOTS = (SCHLIESSUNG_MINUTEN - OEFFNUNG_MINUTEN) // SLOT_MINUTEN
+
+# Maximaler Datumsbereich für /api/verfuegbarkeit
+MAX_TAGE = 31
+
+# Belegung pro (tid, spieldatum) als Bitmaske, Bit i = Slot i ist belegt.
+# Die TTL begrenzt, wie lange Buchungen anderer Worker-Prozesse unbemerkt bleiben.
+# Nur für die Anzeige (/api/verfuegbarkeit, Raster auf der Buchungsseite): ob ein
+# Platz frei ist, entscheidet allein die Prüfung in buchungen.buche() in der DB.
+_belegung = TTLCache(
+    "belegung",
+    maxsize=int(os.getenv("BELEGUNG_CACHE_SIZE", "4096")),
+    ttl=int(os.getenv("BELEGUNG_CACHE_TTL", "10")),
+)
+
+
+def zeit_in_minuten(wert):
+    """TIME-Werte kommen je nach Treiber als time, timedelta oder String."""
+    if isinstance(wert, timedelta):
+        return int(wert.total_seconds()) // 60
+    if isinstance(wert, str):
+        # auch "9:30", das time.fromisoformat ablehnt
+        wert = time(*(int(teil) for teil in wert.split(":")))
+    return wert.hour * 60 + wert.minute
+
+
+def als_uhrzeit(wert):
+    """Uhrzeit aus dem Formular ("14:00") als time, damit sie als TIME-Parameter in die DB geht."""
+    minuten = zeit_in_minuten(wert)
+    return time(minuten // 60, minuten % 60)
+
+
+def _datum_key(spieldatum):
+    if isinstance(spieldatum, date):
+        return spieldatum.isoformat()
+    return str(spieldatum)
+
+
+def slot_maske(beginn, ende):
+    """Bitmaske aller Slots, die das Intervall [beginn, ende) berührt."""
+    von = max(zeit_in_minuten(beginn), OEFFNUNG_MINUTEN)
+    bis = min(zeit_in_minuten(ende), SCHLIESSUNG_MINUTEN)
+    if bis <= von:
+        return 0
+    erster = (von - OEFFNUNG_MINUTEN) // SLOT_MINUTEN
+    letzter = (bis - OEFFNUNG_MINUTEN + SLOT_MINUTEN - 1) // SLOT_MINUTEN
+    return ((1 << (letzter - erster)) - 1) << erster
+
+
+def _lade_belegung(tid, spieldatum):
+    rows = db_read(
+        "SELECT spielbeginn, spielende FROM buchung WHERE tid=%s AND spieldatum=%s",
+        (tid, spieldatum)
+    )
+    maske = 0
+    for row in rows or []:
+        maske |= slot_maske(row["spielbeginn"], row["spielende"])
+    return maske
+
+
+def belegung(tid, spieldatum):
+    """Bitmaske der belegten Slots eines Platzes an einem Tag."""
+    key = (int(tid), _datum_key(spieldatum))
+    return _belegung.get_or_load(key, lambda: _lade_belegung(tid, key[1]))
+
+
+def belegung_bereich(tids, von, bis):
+    """
+    Belegung aller Plätze tids für jeden Tag von..bis (date, inklusive).
+    Rückgabe: {(tid, "YYYY-MM-DD"): maske}. Fehlt auch nur ein Tag im Cache,
+    wird der ganze Bereich mit einer Abfrage geladen und in den Cache geschrieben.
+    """
+    tage = [(von + timedelta(days=i)).isoformat() for i in range((bis - von).days + 1)]
+    keys = [(int(tid), tag) for tid in tids for tag in tage]
+    if not keys:
+        return {}
+
+    ergebnis = {}
+    for key in keys:
+        maske = _belegung.get(key)
+        if maske is None:
+            break
+        ergebnis[key] = maske
+    else:
+        return ergebnis
+
+    version = _belegung.version
+    platzhalter = ",".join(["%s"] * len(tids))
+    rows = db_read(
+        f"""SELECT tid, spieldatum, spielbeginn, spielende FROM buchung
+            WHERE tid IN ({platzhalter}) AND spieldatum BETWEEN %s AND %s""",
+        (*tids, von, bis)
+    )
+    ergebnis = dict.fromkeys(keys, 0)
+    for row in rows or []:
+        key = (row["tid"], _datum_key(row["spieldatum"]))
+        if key in ergebnis:
+            ergebnis[key] |= slot_maske(row["spielbeginn"], row["spielende"])
+    for key, maske in ergebnis.items():
+        _belegung.set(key, maske, version=version)
+    return ergebnis
+
+
+def maske_als_text(maske):
+    """z.B. "0011000..." mit einem Zeichen pro Slot, 1 = belegt"""
+    return "".join("1" if maske >> i & 1 else "0" for i in range(ANZAHL_SLOTS))
+
+
+def slot_zeiten():
+    """Startzeiten aller Slots als "HH:MM"."""
+    return [
+        f"{m // 60:02d}:{m % 60:02d}"
+        for m in range(OEFFNUNG_MINUTEN, SCHLIESSUNG_MINUTEN, SLOT_MINUTEN)
+    ]
+
+
+def invalidiere(tid=None, spieldatum=None):
+    """Nach jedem Schreiben auf buchung aufrufen (ohne Argumente: alles)."""
+    if tid is None or spieldatum is None:
+        _belegung.invalidate()
+    else:
+        _belegung.invalidate((int(tid), _datum_key(spieldatum)))
@@ -0,0 +1,117 @@
+"""
+Wartungsplanung: überfällige Plätze, Auslastung der Wartungsarbeiter und
+Massenänderungen (Plätze übertragen, Wartung als erledigt eintragen).
+"""
+import os
+from datetime import date, timedelta
+from db import db_read, db_transaction
+
+# Nach so vielen Tagen seit der letzten Wartung gilt ein Platz als überfällig
+WARTUNG_INTERVALL_TAGE = int(os.getenv("WARTUNG_INTERVALL_TAGE", "30"))
+
+
+def faellig_vor(stichtag=None):
+    """Plätze mit letzter Wartung vor diesem Datum sind überfällig."""
+    return (stichtag or date.today()) - timedelta(days=WARTUNG_INTERVALL_TAGE)
+
+
+def arbeitslast(stichtag=None):
+    """
+    Pro Wartungsarbeiter: Anzahl Plätze, davon überfällig, älteste Wartung.
+    Eine gruppierte Abfrage; die tennisplatz-Seite kommt aus idx_tennisplatz_wartung.
+    """
+    rows = db_read(
+        """SELECT w.wid, w.vorname, w.nachname,
+                  COUNT(t.tid) AS plaetze,
+                  SUM(CASE WHEN t.tid IS NOT NULL
+                            AND (t.datum_der_wartung IS NULL OR t.datum_der_wartung < %s)
+                           THEN 1 ELSE 0 END) AS ueberfaellig,
+                  MIN(t.datum_der_wartung) AS aelteste_wartung
+           FROM wartungsarbeiter w
+           LEFT JOIN tennisplatz t ON t.wid = w.wid
+           GROUP BY w.wid, w.vorname, w.nachname
+           ORDER BY ueberfaellig DESC, plaetze DESC, w.wid""",
+        (faellig_vor(stichtag),)
+    ) or []
+    for row in rows:
+        # SUM() kommt bei MySQL als Decimal
+        row["ueberfaellig"] = int(row["ueberfaellig"] or 0)
+    return rows
+
+
+def ueberfaellige_plaetze(stichtag=None):
+    return db_read(
+        """SELECT t.tid, t.tennisanlage, t.platznummer, t.belag, t.datum_der_wartung, t.wid,
+                  w.vorname, w.nachname
+           FROM tennisplatz t
+           JOIN wartungsarbeiter w ON t.wid = w.wid
+           WHERE t.datum_der_wartung IS NULL OR t.datum_der_wartung < %s
+           ORDER BY t.datum_der_wartung, t.tid""",
+        (faellig_vor(stichtag),)
+    ) or []
+
+
+def uebertragen(von_wid, nach_wid, nur_ueberfaellig=False):
+    """
+    Alle (oder nur die überfälligen) Plätze von von_wid auf nach_wid übertragen,
+    mit einem UPDATE in einer Transaktion.
+    Rückgabe: (anzahl, None) oder (0, fehler)
+    """
+    if von_wid == nach_wid:
+        return 0, "Bitte zwei verschiedene Wartungsarbeiter wählen."
+    with db_transaction() as tx:
+        # Ziel sperren, damit es nicht gleichzeitig gelöscht wird
+        ziel = tx.read("SELECT wid FROM wartungsarbeiter WHERE wid=%s FOR UPDATE", (nach_wid,), single=True)
+        if not ziel:
+            return 0, f"Wartungsarbeiter mit ID {nach_wid} existiert nicht."
+        if nur_ueberfaellig:
+            tx.write(
+                """UPDATE tennisplatz SET wid=%s
+                   WHERE wid=%s AND (datum_der_wartung IS NULL OR datum_der_wartung < %s)""",
+                (nach_wid, von_wid, faellig_vor())
+            )
+        else:
+            tx.write("UPDATE tennisplatz SET wid=%s WHERE wid=%s", (nach_wid, von_wid))
+        return tx.rowcount, None
+
+
+def wartung_erledigt(tids, datum):
+    """Wartungsdatum für mehrere Plätze auf einmal setzen; Rückgabe: Anzahl Plätze."""
+    if not tids:
+        return 0
+    with db_transaction() as tx:
+        tx.write(
+            f"UPDATE tennisplatz SET datum_der_wartung=%s WHERE tid IN ({','.join(['%s'] * len(tids))})",
+            (datum, *tids)
+        )
+        return tx.rowcount
+
+
+def loesche_arbeiter(wid, nach_wid=None):
+    """
+    Löscht einen Wartungsarbeiter. tennisplatz.wid ist NOT NULL, seine Plätze
+    müssen also vorher einem anderen Arbeiter (nach_wid) übertragen werden.
+    Rückgabe: (arbeiter, anzahl_uebertragen, fehler)
+    """
+    with db_transaction() as tx:
+        arbeiter = tx.read("SELECT * FROM wartungsarbeiter WHERE wid=%s FOR UPDATE", (wid,), single=True)
+        if not arbeiter:
+            return None, 0, f"Wartungsarbeiter mit ID {wid} existiert nicht."
+
+        row = tx.read("SELECT COUNT(*) AS anzahl FROM tennisplatz WHERE wid=%s", (wid,), single=True)
+        anzahl = row["anzahl"] if row else 0
+        if anzahl:
+            if nach_wid is None:
+                return arbeiter, 0, (
+                    f"Wartungsarbeiter '{arbeiter['vorname']} {arbeiter['nachname']}' betreut noch {anzahl} "
+                    f"Tennisplatz/Tennisplätze. Bitte einen Wartungsarbeiter angeben, der sie übernimmt."
+                )
+            if nach_wid == wid:
+                return arbeiter, 0, "Die Plätze können nicht an denselben Wartungsarbeiter übertragen werden."
+            ziel = tx.read("SELECT wid FROM wartungsarbeiter WHERE wid=%s FOR UPDATE", (nach_wid,), single=True)
+            if not ziel:
+                return arbeiter, 0, f"Wartungsarbeiter mit ID {nach_wid} existiert nicht."
+            tx.write("UPDATE tennisplatz SET wid=%s WHERE wid=%s", (nach_wid, wid))
+
+        tx.write("DELETE FROM wartungsarbeiter WHERE wid=%s", (wid,))
+        return arbeiter, anzahl, None